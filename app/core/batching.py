@@ -0,0 +1,140 @@
+import time
+import asyncio
+import logging
+from typing import Callable, List, Optional, Set, Tuple
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from .metrics import StageMetrics
+from .vector_store import search_by_vectors
+
+# Logger
+logger = logging.getLogger(__name__)
+
+
+class _PendingQuery:
+    __slots__ = ("text", "k", "future")
+
+    def __init__(self, text: str, k: int, future: asyncio.Future):
+        self.text = text
+        self.k = k
+        self.future = future
+
+
+class QueryBatcher:
+    """
+    Coalesces the query embeddings and vector searches of concurrent requests
+    Queries arriving within max_wait seconds of the first one (or until
+    max_batch_size are waiting) are embedded with one embed_documents call and
+    searched with one FAISS search over the resulting matrix, then each request
+    gets its own vector and documents back
+    The embeddings and the vector store are read at flush time, so swapping
+    them (index reloads) takes effect on the next batch
+    Batch times are recorded in the optional StageMetrics as embedding and
+    vector_search
+    """
+
+    def __init__(
+        self,
+        embeddings: Callable[[], Embeddings],
+        vector_store: Callable[[], FAISS],
+        max_batch_size: int = 16,
+        max_wait: float = 0.005,
+        metrics: Optional[StageMetrics] = None,
+    ):
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self.queries = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+        self._pending: List[_PendingQuery] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def search(self, text: str, k: int) -> Tuple[List[float], List[Document]]:
+        """
+        Embed the query and return its vector with its k nearest documents
+        """
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pending queries of a closed event loop can never complete
+            self._timer = None
+            self._pending = []
+            self._loop = loop
+
+        future = loop.create_future()
+        self._pending.append(_PendingQuery(text, k, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)  # Keep a reference until the batch is done
+            task.add_done_callback(self._tasks.discard)
+
+    def _observe(self, stage: str, start: float) -> None:
+        if self.metrics is not None:
+            self.metrics.observe(stage, time.perf_counter() - start)
+
+    async def _run(self, batch: List[_PendingQuery]) -> None:
+        self.queries += len(batch)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        texts = list(dict.fromkeys(query.text for query in batch))
+        try:
+            start = time.perf_counter()
+            vectors = await self.embeddings().aembed_documents(texts)
+            self._observe("embedding", start)
+
+            start = time.perf_counter()
+            # The FAISS search and docstore reads would block other requests
+            results = await asyncio.to_thread(
+                search_by_vectors,
+                self.vector_store(),
+                vectors,
+                max(query.k for query in batch),
+            )
+            self._observe("vector_search", start)
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} queries failed: {str(e)}")
+            for query in batch:
+                if not query.future.done():
+                    query.future.set_exception(e)
+            return
+
+        logger.debug(f"Embedded and searched {len(texts)} queries in one batch")
+        found = dict(zip(texts, zip(vectors, results)))
+        for query in batch:
+            if not query.future.done():  # The request may have been cancelled
+                vector, documents = found[query.text]
+                query.future.set_result((vector, documents[: query.k]))
+
+    def stats(self) -> dict:
+        """
+        Batching counters for monitoring
+        """
+
+        return {
+            "queries": self.queries,
+            "batches": self.batches,
+            "mean_batch_size": (
+                round(self.queries / self.batches, 2) if self.batches else 0.0
+            ),
+            "largest_batch": self.largest_batch,
+        }
@@ -0,0 +1,373 @@
+import os
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .categorizer import remove_diacritics
+from .session_store import redis_client
+
+# Logger
+logger = logging.getLogger(__name__)
+
+
+class _CacheEntry:
+    """
+    Cached answer together with the context it was generated from
+    """
+
+    __slots__ = ("context_key", "answer", "created_at")
+
+    def __init__(self, context_key: str, answer: str):
+        self.context_key = context_key
+        self.answer = answer
+        self.created_at = time.monotonic()
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on query embeddings
+    A query hits the cache when a stored query lies within max_distance
+    (cosine) and the retrieved context is the same, entries are evicted
+    in LRU order and expire after ttl_seconds
+    """
+
+    def __init__(self, max_distance: float, max_entries: int, ttl_seconds: float):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._vectors: Optional[np.ndarray] = None  # Allocated on first store
+        self._active = np.zeros(max_entries, dtype=bool)
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()  # LRU order
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def context_key(documents: List[Document]) -> str:
+        """
+        Fingerprint of the retrieved context
+        """
+
+        fingerprint = hashlib.sha1()
+        for document in documents:
+            fingerprint.update(document.page_content.encode())
+            fingerprint.update(b"\x1f")
+        return fingerprint.hexdigest()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: List[float], context_key: str) -> Optional[str]:
+        """
+        Return the cached answer for a semantically equal query, if any
+        """
+
+        with self._lock:
+            answer = self._lookup(self._normalize(embedding), context_key)
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return answer
+
+    def _lookup(self, query: np.ndarray, context_key: str) -> Optional[str]:
+        if self._vectors is None or not self._entries:
+            return None
+
+        similarities = self._vectors @ query
+        similarities[~self._active] = -np.inf
+        now = time.monotonic()
+        for slot in np.argsort(-similarities):
+            if 1.0 - similarities[slot] > self.max_distance:
+                break
+            entry = self._entries[int(slot)]
+            if now - entry.created_at > self.ttl_seconds:
+                self._release(int(slot))
+                continue
+            if entry.context_key == context_key:
+                self._entries.move_to_end(int(slot))
+                return entry.answer
+        return None
+
+    def store(self, embedding: List[float], context_key: str, answer: str) -> None:
+        """
+        Cache the answer, evicting the least recently used entry when full
+        """
+
+        query = self._normalize(embedding)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(query)), np.float32)
+            if not self._free_slots:
+                self._release(next(iter(self._entries)))
+            slot = self._free_slots.pop()
+            self._vectors[slot] = query
+            self._active[slot] = True
+            self._entries[slot] = _CacheEntry(context_key, answer)
+
+    def _release(self, slot: int) -> None:
+        del self._entries[slot]
+        self._active[slot] = False
+        self._free_slots.append(slot)
+
+    def invalidate(self) -> int:
+        """
+        Drop all cached answers, e.g. after the knowledge base was rebuilt
+        """
+
+        with self._lock:
+            size = len(self._entries)
+            for slot in list(self._entries):
+                self._release(slot)
+        logger.info(f"Semantic cache invalidated - Removed {size} entries")
+        return size
+
+    def stats(self) -> dict:
+        """
+        Cache counters for monitoring
+        """
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+def normalize_question(question: str) -> str:
+    """
+    Question text compared by the response cache: lowercased, without
+    diacritics, repeated whitespace and trailing punctuation
+    """
+
+    return " ".join(remove_diacritics(question).split()).rstrip(" ?!.")
+
+
+class ResponseCache:
+    """
+    Exact-match answer cache for repeated first questions
+    Keyed on the normalized question and a version string naming the index
+    and the prompt the answer was generated with, so answers of a rebuilt
+    knowledge base or a changed prompt are never returned; entries are
+    evicted in LRU order and expire after ttl_seconds
+    The methods are async to share the interface of RedisResponseCache
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(question: str, version: str) -> str:
+        return f"{version}:{normalize_question(question)}"
+
+    def _fresh(self, entry: Optional[Tuple[str, float]], now: float) -> bool:
+        return entry is not None and now - entry[1] <= self.ttl_seconds
+
+    async def get(self, question: str, version: str) -> Optional[str]:
+        """
+        Return the cached answer of the question, if any
+        """
+
+        key = self.key(question, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not self._fresh(entry, time.monotonic()):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    async def store(self, question: str, version: str, answer: str) -> None:
+        """
+        Cache the answer, evicting the least recently used entry when full
+        """
+
+        key = self.key(question, version)
+        with self._lock:
+            self._entries[key] = (answer, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def missing(self, questions: Iterable[str], version: str) -> List[str]:
+        """
+        Questions without a cached answer, without counting lookups
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            return [
+                question
+                for question in questions
+                if not self._fresh(self._entries.get(self.key(question, version)), now)
+            ]
+
+    async def invalidate(self) -> int:
+        """
+        Drop all cached answers and return their number
+        """
+
+        with self._lock:
+            size = len(self._entries)
+            self._entries.clear()
+        logger.info(f"Response cache invalidated - Removed {size} entries")
+        return size
+
+    @asynccontextmanager
+    async def prewarm_lock(self) -> AsyncIterator[bool]:
+        """
+        Yields whether this process should pre-warm the cache, the cache of
+        a single process has no other writers
+        """
+
+        yield True
+
+    async def _size(self) -> int:
+        return len(self._entries)
+
+    async def stats(self) -> dict:
+        """
+        Cache counters for monitoring
+        """
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            "size": await self._size(),
+            "max_entries": self.max_entries,
+        }
+
+
+class RedisResponseCache(ResponseCache):
+    """
+    Response cache kept in Redis, shared by all workers and dynos, so a
+    pre-warmed answer or an invalidation applies everywhere
+    Entries expire after ttl_seconds, Redis maxmemory policy bounds the size
+    A sorted set of the keys scored by expiry time gives the size without
+    scanning the keyspace, entries evicted by Redis are counted until they
+    would have expired
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_entries: int,
+        ttl_seconds: float,
+        prefix: str = "answer:",
+        prewarm_timeout: int = 600,
+    ):
+        super().__init__(max_entries, ttl_seconds)
+        self.prefix = prefix
+        self.index_key = f"{prefix}index"
+        self.lock_key = f"lock:{prefix}prewarm"
+        self.prewarm_timeout = prewarm_timeout
+        self.client = redis_client(url)
+        logger.info(f"Response cache: Redis ({prefix}*)")
+
+    async def get(self, question: str, version: str) -> Optional[str]:
+        answer = await self.client.get(self.prefix + self.key(question, version))
+        if answer is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return answer.decode()
+
+    async def store(self, question: str, version: str, answer: str) -> None:
+        key = self.prefix + self.key(question, version)
+        async with self.client.pipeline() as pipeline:
+            pipeline.set(key, answer, ex=int(self.ttl_seconds))
+            pipeline.zadd(self.index_key, {key: time.time() + self.ttl_seconds})
+            await pipeline.execute()
+
+    async def missing(self, questions: Iterable[str], version: str) -> List[str]:
+        questions = list(questions)
+        async with self.client.pipeline() as pipeline:
+            for question in questions:
+                pipeline.exists(self.prefix + self.key(question, version))
+            found = await pipeline.execute()
+        return [q for q, exists in zip(questions, found) if not exists]
+
+    async def invalidate(self) -> int:
+        # Admin action, the scan also finds entries stored before the index
+        keys = [key async for key in self.client.scan_iter(f"{self.prefix}*")]
+        for start in range(0, len(keys), 500):
+            await self.client.delete(*keys[start : start + 500])
+        removed = sum(1 for key in keys if key.decode() != self.index_key)
+        logger.info(f"Response cache invalidated - Removed {removed} entries")
+        return removed
+
+    @asynccontextmanager
+    async def prewarm_lock(self) -> AsyncIterator[bool]:
+        """
+        Yields whether this worker took the pre-warm lock (SET NX), so only
+        one of the workers starting together calls the model
+        The lock expires after prewarm_timeout if the worker dies
+        """
+
+        token = uuid.uuid4().hex
+        acquired = await self.client.set(
+            self.lock_key, token, nx=True, ex=self.prewarm_timeout
+        )
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                await self._release_lock(token)
+
+    async def _release_lock(self, token: str) -> None:
+        from redis.exceptions import WatchError
+
+        # Delete the lock only if it is still ours, it may have expired
+        async with self.client.pipeline() as pipeline:
+            try:
+                await pipeline.watch(self.lock_key)
+                if await pipeline.get(self.lock_key) == token.encode():
+                    pipeline.multi()
+                    pipeline.delete(self.lock_key)
+                    await pipeline.execute()
+            except WatchError:
+                pass
+
+    async def _size(self) -> int:
+        async with self.client.pipeline() as pipeline:
+            pipeline.zremrangebyscore(self.index_key, "-inf", time.time())
+            pipeline.zcard(self.index_key)
+            _, size = await pipeline.execute()
+        return size
+
+
+def create_response_cache(max_entries: int, ttl_seconds: float) -> ResponseCache:
+    """
+    Redis cache when REDIS_URL is set, otherwise the in-process cache
+    """
+
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return RedisResponseCache(redis_url, max_entries, ttl_seconds)
+    return ResponseCache(max_entries, ttl_seconds)
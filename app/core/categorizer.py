@@ -0,0 +1,110 @@
+import re
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Czech diacritics folded to ASCII, applied after lowercasing
+# A string table indexed by code point translates ~3x faster than the dict
+# str.maketrans returns; characters beyond it are left unchanged
+_FOLDS = str.maketrans("áčďéěíňóřšťúůýž", "acdeeinorstuuyz")
+DIACRITICS = "".join(chr(_FOLDS.get(i, i)) for i in range(max(_FOLDS) + 1))
+
+# Categories in priority order: a message gets the first category with a
+# keyword contained in its normalized text
+CATEGORIES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    (
+        "hraci",
+        (
+            "hrac",
+            "hraci",
+            "hrace",
+            "strelec",
+            "strelci",
+            "strelce",
+            "tabulky",
+            "gamelog",
+            "trend",
+            "porovnani",
+        ),
+    ),
+    ("formace", ("formace", "formaci", "dvojice", "kombinace")),
+    (
+        "videomapy",
+        ("videomapy", "video", "strely", "heatmapa", "prihravky", "vhazovani"),
+    ),
+    ("brankari", ("brankar", "brankari", "mapa strel", "najezdy")),
+    ("zapasy", ("zapas", "zapasy", "vizualizace", "grafiky", "report")),
+    ("tymy", ("tym", "tymy")),
+)
+DEFAULT_CATEGORY = "ostatni"
+
+
+def remove_diacritics(text: str) -> str:
+    """
+    Lowercase Czech text and strip its diacritical marks
+    """
+
+    return text.lower().translate(DIACRITICS)
+
+
+def _minimal_keywords(keywords: Iterable[str]) -> List[str]:
+    """
+    Keywords without those containing a shorter one, which match whenever
+    the longer does ("hraci" is covered by "hrac")
+    """
+
+    keywords = sorted({remove_diacritics(keyword) for keyword in keywords}, key=len)
+    minimal = []
+    for keyword in keywords:
+        if not any(shorter in keyword for shorter in minimal):
+            minimal.append(keyword)
+    return minimal
+
+
+class Categorizer:
+    """
+    Keyword categorizer compiled once: one regex alternation per category,
+    tried in priority order on the normalized text
+    """
+
+    def __init__(
+        self,
+        categories: Sequence[Tuple[str, Sequence[str]]] = CATEGORIES,
+        default: str = DEFAULT_CATEGORY,
+    ):
+        self.default = default
+        self.patterns = [
+            (
+                category,
+                re.compile("|".join(map(re.escape, _minimal_keywords(keywords)))),
+            )
+            for category, keywords in categories
+        ]
+        # Identifies the keyword set, stored by re-categorization jobs
+        self.version = hashlib.sha1(
+            repr([(c, sorted(k)) for c, k in categories]).encode()
+        ).hexdigest()[:12]
+
+    def categorize(self, message: str) -> str:
+        normalized = remove_diacritics(message)
+        for category, pattern in self.patterns:
+            if pattern.search(normalized):
+                return category
+        return self.default
+
+    def categorize_many(self, messages: Iterable[str]) -> List[str]:
+        """
+        Categories of many messages, repeated messages are matched once
+        """
+
+        seen: Dict[str, str] = {}
+        categories = []
+        for message in messages:
+            category = seen.get(message)
+            if category is None:
+                category = seen[message] = self.categorize(message)
+            categories.append(category)
+        return categories
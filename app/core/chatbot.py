@@ -1,22 +1,50 @@
 import os
+import asyncio
+import hashlib
 import logging
+import threading
 import time
 import uuid
-from typing import List, Dict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 from dotenv import load_dotenv
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_retrieval_chain
 
+from .categorizer import Categorizer, remove_diacritics
+from .context import ContextBuilder
+from .metrics import StageMetrics
+from .session_store import create_session_store
+from .tokens import TokenCounter
+from .writer import InteractionWriter
 from ..database.db import db
-from ..schemas.models import ChatInteraction, Message
+from ..schemas.models import Message
 from dotenv import load_dotenv
 
+# langchain, openai, faiss and numpy load with the models in _warm_up,
+# importing this module stays cheap for the web process and admin scripts
+if TYPE_CHECKING:
+    from langchain.prompts import ChatPromptTemplate
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+    from langchain_core.prompt_values import PromptValue
+    from .lexical import BM25Index
+
 # Logger
 logger = logging.getLogger(__name__)
 
+# Longest greeting variant stripped from the start of answers
+GREETING_PREFIX = "Dobrý den, "
+
 
 class ChatbotConfig:
     """
@@ -49,6 +77,45 @@ class ChatbotConfig:
             3  # Number of similar chunks to retrieve from the vector store
         )
         self.max_history = 4  # Maximum number of conversation turns to remember
+        self.max_context_tokens = 1200  # Token budget of the retrieved chunks
+        self.max_history_tokens = 400  # Token budget of the chat history
+        self.history_recent_messages = 2  # Latest messages kept verbatim
+        self.history_summary_chars = 200  # Older messages shortened to this length
+        self.history_buffer_size = 20  # Messages kept per session (ring buffer)
+        self.session_ttl = 1800  # Seconds of inactivity before a session is evicted
+        self.max_sessions = 5000  # Maximum number of sessions kept in memory
+        self.max_history_chars = 5_000_000  # Memory cap for all stored messages
+        self.semantic_cache_max_distance = 0.05  # Cosine distance for a cache hit
+        self.semantic_cache_size = 1000  # Maximum number of cached answers
+        self.semantic_cache_ttl = 24 * 3600  # Seconds before a cached answer expires
+        self.response_cache_size = 500  # Exact-match first questions cached
+        self.response_cache_ttl = 24 * 3600  # Seconds before a cached answer expires
+        self.response_cache_prewarm = True  # Answer quick_questions on startup
+        # Preset questions of ui/src/components/QuickOptions.jsx, keep in sync
+        self.quick_questions = [
+            "Kde najdu nejlepší střelce v extralize?",
+            "Co znamená zkratka TOI v hokeji?",
+            "Jak mohu filtrovat hráče v tabulce podle různých kritérií?",
+        ]
+        self.vector_store_check_interval = 30  # Seconds between index change checks
+        self.vector_store_mmap = True  # Memory-map the index, shared between workers
+        self.vector_search_nprobe = 16  # IVF lists scanned per query (IVF indexes)
+        self.vector_search_ef = 64  # Candidate list size per query (HNSW indexes)
+        self.hybrid_search = True  # Fuse BM25 keyword results with vector results
+        self.hybrid_candidates = 10  # Results per retriever before fusion
+        self.rrf_k = 60  # Reciprocal rank fusion constant
+        self.lexical_max_terms = 2  # Longest query answered by BM25 alone
+        self.query_batch_size = 16  # Concurrent queries embedded and searched at once
+        self.query_batch_wait = 0.005  # Seconds a query waits for others to batch with
+        self.db_write_batch_size = 100  # Interactions per bulk insert
+        self.db_write_interval = 0.5  # Seconds a queued interaction waits at most
+        self.db_write_queue_size = 10_000  # Queued interactions before backpressure
+        self.embedding_model = "text-embedding-ada-002"
+        self.embedding_cache_path = "data/embedding_cache.sqlite"  # On-disk tier
+        self.embedding_cache_size = 10_000  # In-memory LRU tier (vectors)
+        self.embedding_cache_rows = 50_000  # Query vectors kept on disk, oldest dropped
+        # Bind the port first and load the models and index in the background
+        self.lazy_startup = os.getenv("LAZY_STARTUP", "true").lower() != "false"
 
         logger.info(
             f"Configuration loaded - Model: {self.model_name}, Temperature: {self.temperature}, "
@@ -65,93 +132,414 @@ class CoreChatbot:
 
     def __init__(self, config: ChatbotConfig):
         self.config = config
-        self.conversation_history: List[Dict[str, str]] = []
+        self.sessions = create_session_store(
+            max_messages=config.history_buffer_size,
+            ttl_seconds=config.session_ttl,
+            max_sessions=config.max_sessions,
+            max_chars=config.max_history_chars,
+        )
         self.db = db
+        self.metrics = StageMetrics()
+        self.categorizer = Categorizer()
+        self.writer = InteractionWriter(
+            db,
+            batch_size=config.db_write_batch_size,
+            flush_interval=config.db_write_interval,
+            max_queue=config.db_write_queue_size,
+            metrics=self.metrics,
+        )
+
+        self.token_counter = TokenCounter(config.model_name)
+        self.context_builder = ContextBuilder(
+            self.token_counter,
+            max_context_tokens=config.max_context_tokens,
+            max_history_tokens=config.max_history_tokens,
+            recent_messages=config.history_recent_messages,
+            summary_chars=config.history_summary_chars,
+        )
+        self.startup_phases: Dict[str, float] = {}  # Seconds per startup phase
+        self._warm_up_future: Optional[Future] = None
+        self._warm_up_lock = threading.Lock()
+        self._prewarm_task: Optional[asyncio.Task] = None
 
         logger.info("Initializing CoreChatbot")
+
+        # Models and the vector store load in the background in lazy mode
+        if not config.lazy_startup:
+            self.wait_ready()
+            logger.info("CoreChatbot initialization completed successfully")
+
+    @contextmanager
+    def _startup_phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_phases[name] = round(time.perf_counter() - start, 3)
+
+    def _warm_up(self) -> None:
+        """
+        Load the models, the vector store and the keyword index
+        """
+
+        with self._startup_phase("imports"):
+            from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+            from .batching import QueryBatcher
+            from .cache import SemanticCache, create_response_cache
+            from .embeddings import CachedEmbeddings
+            from .vector_store import VECTOR_STORE_PATH, index_version
+
+        config = self.config
         logger.info("Loading models and initializing components...")
+        self.semantic_cache = SemanticCache(
+            max_distance=config.semantic_cache_max_distance,
+            max_entries=config.semantic_cache_size,
+            ttl_seconds=config.semantic_cache_ttl,
+        )
+        self.response_cache = create_response_cache(
+            max_entries=config.response_cache_size,
+            ttl_seconds=config.response_cache_ttl,
+        )
+
+        # Set up conversation template
+        try:
+            self.prompt = self._create_prompt_template()
+            # Cached answers of another template or model are never served
+            self.prompt_version = hashlib.sha1(
+                f"{config.model_name}\x1f{config.temperature}\x1f{self.prompt.model_dump_json()}".encode()
+            ).hexdigest()[:12]
+            logger.info("Successfully created prompt template")
+        except Exception as e:
+            logger.error(f"Failed to create prompt template: {str(e)}")
+            raise
+
+        # May download the BPE file, done here so a preloading master loads
+        # it once for all workers and requests never wait for it
+        with self._startup_phase("tokenizer"):
+            self.token_counter.load()
 
         # Initialize embedding model for text vectorization
         try:
-            self.embeddings_model = OpenAIEmbeddings(
-                model="text-embedding-ada-002", openai_api_key=config.openai_api_key
+            with self._startup_phase("embedding_model"):
+                self.embeddings_model = CachedEmbeddings(
+                    OpenAIEmbeddings(
+                        model=config.embedding_model,
+                        openai_api_key=config.openai_api_key,
+                    ),
+                    cache_path=config.embedding_cache_path,
+                    namespace=config.embedding_model,
+                    memory_size=config.embedding_cache_size,
+                    # Apart from the knowledge base chunks of the index builder
+                    table="queries",
+                    max_rows=config.embedding_cache_rows,
+                )
+            logger.info(
+                f"Successfully loaded embedding model ({config.embedding_model}) with cache"
             )
-            logger.info("Successfully loaded embedding model (text-embedding-ada-002)")
         except Exception as e:
             logger.error(f"Failed to load embedding model: {str(e)}")
             raise
 
         # Set up the main language model for generating responses
         try:
-            self.chat_model = ChatOpenAI(
-                model=config.model_name,
-                temperature=config.temperature,
-                openai_api_key=config.openai_api_key,
-            )
+            with self._startup_phase("chat_model"):
+                self.chat_model = ChatOpenAI(
+                    model=config.model_name,
+                    temperature=config.temperature,
+                    openai_api_key=config.openai_api_key,
+                    stream_usage=True,  # Token usage in the last streamed chunk
+                )
             logger.info(f"Successfully loaded chat model: {config.model_name}")
         except Exception as e:
             logger.error(f"Failed to load chat model {config.model_name}: {str(e)}")
             raise
 
-        # Initialize vector store and retrieval system
+        # Initialize vector store for retrieval
         try:
-            self.vector_store = self._load_vector_store()
-            self.retriever = self.vector_store.as_retriever(
-                search_kwargs={"k": config.top_k_results}
+            with self._startup_phase("vector_store"):
+                self.vector_store_version = index_version(VECTOR_STORE_PATH)
+                self._version_checked_at = time.monotonic()
+                self.vector_store = self._load_vector_store()
+            with self._startup_phase("lexical_index"):
+                self.lexical_index = self._build_lexical_index(self.vector_store)
+            # Read the models and the store per batch, they are swapped on reload
+            self.query_batcher = QueryBatcher(
+                embeddings=lambda: self.embeddings_model,
+                vector_store=lambda: self.vector_store,
+                max_batch_size=config.query_batch_size,
+                max_wait=config.query_batch_wait,
+                metrics=self.metrics,
             )
             logger.info(
-                f"Successfully initialized vector store and retriever (top_k={config.top_k_results})"
+                f"Successfully initialized vector store {self.vector_store_version} (top_k={config.top_k_results})"
             )
         except Exception as e:
-            logger.error(f"Failed to initialize vector store or retriever: {str(e)}")
+            logger.error(f"Failed to initialize vector store: {str(e)}")
             raise
 
-        # Set up conversation template and processing chains
+    def _run_warm_up(self, future: Future) -> None:
         try:
-            self.prompt = self._create_prompt_template()
-            self.document_chain = create_stuff_documents_chain(
-                llm=self.chat_model,
-                prompt=self.prompt,
-                document_variable_name="context",
-            )
-            self.retrieval_chain = create_retrieval_chain(
-                self.retriever,
-                self.document_chain,
-            )
-            logger.info("Successfully created prompt template and processing chains")
+            with self._startup_phase("warm_up"):
+                self._warm_up()
+            logger.info(f"CoreChatbot ready, startup phases: {self.startup_phases}")
+            future.set_result(True)
         except Exception as e:
-            logger.error(
-                f"Failed to create prompt template or processing chains: {str(e)}"
-            )
-            raise
+            future.set_exception(e)
 
-        logger.info("CoreChatbot initialization completed successfully")
+    def start_warm_up(self) -> Future:
+        """
+        Start loading the models and the vector store in a background thread
+        Returns the future of the warm-up, a failed warm-up is retried
+        """
 
-    def _load_vector_store(self) -> FAISS:
+        with self._warm_up_lock:
+            future = self._warm_up_future
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._warm_up_future = Future()
+                threading.Thread(
+                    target=self._run_warm_up,
+                    args=(future,),
+                    name="chatbot-warm-up",
+                    daemon=True,
+                ).start()
+            return future
+
+    @property
+    def ready(self) -> bool:
+        future = self._warm_up_future
+        return future is not None and future.done() and future.exception() is None
+
+    def wait_ready(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until the chatbot can answer, raises if the warm-up failed
+        """
+
+        self.start_warm_up().result(timeout)
+
+    async def ensure_ready(self) -> None:
+        """
+        Wait for the warm-up without blocking the event loop
+        """
+
+        if not self.ready:
+            await asyncio.wrap_future(self.start_warm_up())
+
+    def startup_status(self) -> dict:
+        future = self._warm_up_future
+        if self.ready:
+            state = "ready"
+        elif future is not None and future.done():
+            state = "failed"
+        else:
+            state = "starting"
+        return {"state": state, "phases": dict(self.startup_phases)}
+
+    @property
+    def answer_version(self) -> str:
+        """
+        Index and prompt versions the response cache keys answers on
+        """
+
+        return f"{self.vector_store_version}:{self.prompt_version}"
+
+    def start_prewarm(self) -> None:
+        """
+        Answer the quick questions missing from the response cache in the
+        background, on startup and after the vector store was reloaded
+        """
+
+        if not self.config.response_cache_prewarm:
+            return
+        if self._prewarm_task is None or self._prewarm_task.done():
+            self._prewarm_task = asyncio.create_task(self.prewarm_response_cache())
+
+    async def prewarm_response_cache(self) -> int:
+        """
+        Generate and cache the answers of the quick questions not cached yet
+        With a shared cache only the worker holding the pre-warm lock does it
+        Returns the number of answers generated
+        """
+
+        await self.ensure_ready()
+        async with self.response_cache.prewarm_lock() as acquired:
+            if not acquired:
+                logger.info("Response cache is pre-warmed by another worker")
+                return 0
+            return await self._prewarm_missing()
+
+    async def _prewarm_missing(self) -> int:
+        generated = 0
+        for question in await self.response_cache.missing(
+            self.config.quick_questions, self.answer_version
+        ):
+            version = self.answer_version
+            try:
+                _, documents = await self._retrieve(question)
+                # An unused session id, the answer must not depend on any history
+                prompt_value = await self._build_prompt(
+                    documents, f"prewarm-{uuid.uuid4()}", question
+                )
+                usage = {}
+                raw_answer = "".join(
+                    [token async for token in self._generate(prompt_value, usage)]
+                )
+                answer = self._clean_answer(raw_answer)
+                if answer:
+                    await self.response_cache.store(question, version, answer)
+                    generated += 1
+                logger.info(
+                    f"Response cache pre-warmed: '{question[:50]}' "
+                    f"({usage.get('input_tokens')} + {usage.get('output_tokens')} tokens)"
+                )
+            except Exception as e:
+                logger.error(
+                    f"Failed to pre-warm answer of '{question[:50]}': {str(e)}"
+                )
+        return generated
+
+    async def _build_prompt(
+        self, documents: List["Document"], session_id: str, user_input: str
+    ) -> "PromptValue":
+        """
+        Fill the prompt template with the retrieved chunks and the history,
+        both cut to their token budgets
+        Formatted apart from the model call so its assembly can be timed
+        """
+
+        chat_history = await self.format_chat_history(session_id)
+        return self.prompt.invoke(
+            {
+                "context": self.context_builder.build_context(documents),
+                "chat_history": chat_history,
+                "input": user_input,
+            }
+        )
+
+    def _load_vector_store(self) -> "FAISS":
         """
         Load the FAISS vector store from data/vector_store
         Contains pre-processed knowledge base
         """
 
-        logger.debug("Attempting to load FAISS vector store from data/vector_store")
+        from .vector_store import VECTOR_STORE_PATH, load_vector_store
+
+        logger.debug(f"Attempting to load FAISS vector store from {VECTOR_STORE_PATH}")
         try:
-            vector_store = FAISS.load_local(
-                "data/vector_store",
+            vector_store = load_vector_store(
+                VECTOR_STORE_PATH,
                 self.embeddings_model,
-                allow_dangerous_deserialization=True,
+                mmap=self.config.vector_store_mmap,
+                nprobe=self.config.vector_search_nprobe,
+                ef_search=self.config.vector_search_ef,
             )
             return vector_store
         except Exception as e:
             logger.error(f"Error while loading the vector store: {str(e)}")
-            logger.error(f"Vector store path: data/vector_store")
+            logger.error(f"Vector store path: {VECTOR_STORE_PATH}")
             raise
 
-    def _create_prompt_template(self) -> ChatPromptTemplate:
+    async def _refresh_vector_store(self) -> None:
+        """
+        Reload the vector store and invalidate cached answers when the
+        knowledge base on disk was rebuilt
+        """
+
+        from .vector_store import VECTOR_STORE_PATH, index_version
+
+        now = time.monotonic()
+        if now - self._version_checked_at < self.config.vector_store_check_interval:
+            return
+        self._version_checked_at = now
+
+        version = await asyncio.to_thread(index_version, VECTOR_STORE_PATH)
+        if version == self.vector_store_version:
+            return
+
+        logger.info(
+            f"Vector store changed ({self.vector_store_version} -> {version}), reloading"
+        )
+        previous_version, self.vector_store_version = self.vector_store_version, version
+        try:
+            vector_store = await asyncio.to_thread(self._load_vector_store)
+            lexical_index = await asyncio.to_thread(
+                self._build_lexical_index, vector_store
+            )
+        except Exception as e:
+            # Keep serving the loaded store, the reload is retried at the next check
+            self.vector_store_version = previous_version
+            logger.error(f"Vector store reload failed, keeping the old one: {str(e)}")
+            return
+        self.vector_store, self.lexical_index = vector_store, lexical_index
+        self.semantic_cache.invalidate()
+        # Cached answers are keyed on the old version and no longer match
+        self.start_prewarm()
+
+    def _build_lexical_index(self, vector_store: "FAISS") -> Optional["BM25Index"]:
+        """
+        BM25 index over the chunks of the vector store
+        """
+
+        from .lexical import BM25Index
+        from .vector_store import iter_store_documents, store_document
+
+        if not self.config.hybrid_search:
+            return None
+        return BM25Index(
+            iter_store_documents(vector_store),
+            resolve=lambda position: store_document(vector_store, position),
+            normalize=remove_diacritics,
+        )
+
+    async def _retrieve(
+        self, user_input: str
+    ) -> Tuple[Optional[List[float]], List["Document"]]:
+        """
+        Find the chunks most relevant to the query
+        Keyword queries fully covered by BM25 are answered without embedding,
+        otherwise vector and BM25 results are merged by reciprocal rank fusion
+        The embedding and vector search are batched with concurrent requests
+        The query embedding is None when the embedding call was skipped
+        """
+
+        top_k = self.config.top_k_results
+        lexical = []
+        if self.lexical_index is not None:
+            with self.metrics.timer("lexical_search"):
+                lexical = self.lexical_index.search(
+                    user_input, k=max(top_k, self.config.hybrid_candidates)
+                )
+            if self.lexical_index.is_confident(
+                user_input, lexical, top_k, self.config.lexical_max_terms
+            ):
+                logger.debug(f"Keyword query answered by BM25: {user_input[:50]}")
+                return None, [document for document, _ in lexical[:top_k]]
+
+        query_embedding, vector_documents = await self.query_batcher.search(
+            user_input,
+            k=max(top_k, self.config.hybrid_candidates) if lexical else top_k,
+        )
+        if not lexical:
+            documents = vector_documents
+        else:
+            from .lexical import reciprocal_rank_fusion
+
+            documents = reciprocal_rank_fusion(
+                [vector_documents, [document for document, _ in lexical]],
+                k=top_k,
+                rrf_k=self.config.rrf_k,
+            )
+        logger.debug(f"Retrieved {len(documents)} documents")
+        return query_embedding, documents
+
+    def _create_prompt_template(self) -> "ChatPromptTemplate":
         """
         Create the conversation prompt template
         Defines the chatbot's personality
         """
 
+        from langchain.prompts import ChatPromptTemplate
+
         logger.debug("Creating prompt template for conversation")
         try:
             prompt = ChatPromptTemplate.from_messages(
@@ -210,188 +598,257 @@ class CoreChatbot:
             logger.error(f"Failed to create prompt template: {str(e)}")
             raise
 
-    def _remove_diacritics(self, text: str) -> str:
-        """
-        Remove diacritical marks from Czech
-        """
-
-        logger.debug(f"Removing diacritics from text: {text[:50]}...")
-        replacements = {
-            "á": "a",
-            "č": "c",
-            "ď": "d",
-            "é": "e",
-            "ě": "e",
-            "í": "i",
-            "ň": "n",
-            "ó": "o",
-            "ř": "r",
-            "š": "s",
-            "ť": "t",
-            "ú": "u",
-            "ů": "u",
-            "ý": "y",
-            "ž": "z",
-        }
-        result = "".join(replacements.get(c.lower(), c.lower()) for c in text)
-        logger.debug(f"Diacritics removed, result: {result[:50]}...")
-        return result
-
-    def _categorize_message(self, message: str) -> str:
-        """
-        Categorize the incoming message based on content
-        """
-
-        logger.debug(f"Categorizing message: {message[:50]}...")
-        categories = {
-            "hraci": [
-                "hrac",
-                "hraci",
-                "hrace",
-                "strelec",
-                "strelci",
-                "strelce",
-                "tabulky",
-                "gamelog",
-                "trend",
-                "porovnani",
-            ],
-            "formace": ["formace", "formaci", "dvojice", "kombinace"],
-            "videomapy": [
-                "videomapy",
-                "video",
-                "strely",
-                "heatmapa",
-                "prihravky",
-                "vhazovani",
-            ],
-            "brankari": ["brankar", "brankari", "mapa strel", "najezdy"],
-            "zapasy": ["zapas", "zapasy", "vizualizace", "grafiky", "report"],
-            "tymy": ["tym", "tymy"],
-        }
-
-        message_normalized = self._remove_diacritics(message).lower()
-        for category, keywords in categories.items():
-            if any(keyword in message_normalized for keyword in keywords):
-                logger.debug(f"Message categorized as: {category}")
-                return category
-
-        logger.debug("Message categorized as: ostatni")
-        return "ostatni"
-
-    def format_chat_history(self) -> str:
-        """
-        Format the conversation history for context inclusion
-        """
-
-        history_length = len(self.conversation_history)
+    async def format_chat_history(self, session_id: str = "") -> str:
+        """
+        Format the session's conversation history for context inclusion
+        Older messages are shortened to keep it within max_history_tokens
+        """
+
+        conversation_history = await self.sessions.get(session_id)
+        history_length = len(conversation_history)
         max_history = self.config.max_history
         logger.debug(
             f"Formatting chat history: {history_length} messages, showing last {max_history}"
         )
 
-        formatted_history = "\n".join(
-            [
-                f"{'Uživatel' if msg['role'] == 'user' else 'Asistent'}: {msg['content']}"
-                for msg in self.conversation_history[-max_history:]
-            ]
+        formatted_history = self.context_builder.build_history(
+            conversation_history[-max_history:]
         )
         logger.debug(f"Formatted history length: {len(formatted_history)} characters")
         return formatted_history
 
-    def get_response(self, user_input: str, session_id: str = "") -> tuple[str, int]:
+    def _clean_answer(self, answer: str) -> str:
         """
-        Generate a response to user input using the language model
+        Post-process the raw model answer before it is returned and stored
+        """
+
+        # Remove any "Dobrý den" variations from the answer
+        answer = answer.replace("Dobrý den, ", "")
+        answer = answer.replace("Dobrý den.", "")
+        answer = answer.replace("Dobrý den!", "")
+        answer = answer.replace("Dobrý den", "")  # Catch any remaining variants
+
+        # Capitalize first letter of remaining text
+        answer = answer.strip()  # Remove any leading/trailing whitespace
+        if answer:  # Check if answer is not empty
+            answer = (
+                answer[0].upper() + answer[1:] if len(answer) > 1 else answer.upper()
+            )
+        return answer
+
+    def _clean_stream_prefix(self, text: str) -> str:
+        """
+        Clean the first streamed characters like _clean_answer, keeping the
+        trailing whitespace that separates them from the next token
+        """
+
+        # Greeting variants are matched on the raw text, "Dobrý den, " included
+        cleaned = self._clean_answer(text)
+        return cleaned + text[len(text.rstrip()) :] if cleaned else ""
+
+    async def _save_interaction(
+        self,
+        session_id: str,
+        user_message: str,
+        bot_response: str,
+        response_time: float,
+        category: str,
+        prompt_tokens: Optional[int],
+        completion_tokens: Optional[int],
+        error_occurred: int,
+    ) -> str:
+        """
+        Queue a chat interaction for the write-behind writer
+        Returns its message UUID, the row reaches the database shortly after
+        """
+
+        tokens_used = (
+            prompt_tokens + completion_tokens
+            if prompt_tokens is not None and completion_tokens is not None
+            else None
+        )
+
+        return await self.writer.submit(
+            {
+                "session_id": session_id,
+                "timestamp": datetime.utcnow(),
+                "user_message": user_message,
+                "bot_response": bot_response,
+                "response_time": response_time,
+                "category": category,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "tokens_used": tokens_used,
+                "error_occurred": error_occurred,
+            }
+        )
+
+    async def stream_response(
+        self, user_input: str, session_id: str = ""
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Generate a response to user input and stream it as it is produced
+        Yields ("token", text) events followed by a single ("done", result) event
+        with the post-processed answer and its message_id
         """
 
         # DB values
         start_time = time.time()
+        request_start = time.perf_counter()
         error_occurred = 0
-        tokens_used = 0
+        usage = {}
 
         logger.info(
             f"Processing user input - Session: {session_id}, Input: '{user_input[:100]}'"
         )
 
         try:
+            await self.ensure_ready()
+            await self._refresh_vector_store()
+
+            # Answers to follow-up questions depend on the history, cache first turns only
+            first_turn = not await self.sessions.get(session_id)
+
             # Updating history
-            self.conversation_history.append({"role": "user", "content": user_input})
-            logger.debug(
-                f"Added user message to conversation history. Total messages: {len(self.conversation_history)}"
-            )
+            await self.sessions.append(session_id, "user", user_input)
+            logger.debug(f"Added user message to conversation history of {session_id}")
 
-            # Getting answer
-            logger.debug("Invoking retrieval chain...")
+            # Exact repeats of first questions skip retrieval and the model
             chain_start_time = time.time()
-            response = self.retrieval_chain.invoke(
-                {
-                    "chat_history": self.format_chat_history(),
-                    "input": user_input,
-                }
+            answer_version = self.answer_version
+            cacheable = False
+            cached_answer = (
+                await self.response_cache.get(user_input, answer_version)
+                if first_turn
+                else None
             )
-            chain_time = time.time() - chain_start_time
-            logger.debug(f"Retrieval chain completed in {chain_time:.2f}s")
+            if cached_answer is not None:
+                logger.info(f"Response cache hit - Session: {session_id}")
+            else:
+                # Retrieving context
+                query_embedding, documents = await self._retrieve(user_input)
+                context_key = self.semantic_cache.context_key(documents)
+
+                # Keyword queries answered by BM25 have no embedding to match on
+                cacheable = first_turn and query_embedding is not None
+                if cacheable:
+                    cached_answer = self.semantic_cache.lookup(
+                        query_embedding, context_key
+                    )
+                if cached_answer is not None:
+                    logger.info(f"Semantic cache hit - Session: {session_id}")
 
-            answer = response["answer"]
+            # Getting answer
+            if cached_answer is not None:
+                answer_stream = self._replay(cached_answer)
+            else:
+                with self.metrics.timer("prompt"):
+                    prompt_value = await self._build_prompt(
+                        documents, session_id, user_input
+                    )
+                logger.debug("Streaming chat model...")
+                answer_stream = self._generate(prompt_value, usage)
+
+            llm_start = time.perf_counter()
+
+            raw_parts = []
+            prefix_buffer = ""
+            prefix_pending = True
+            async for token in answer_stream:
+                if not token:
+                    continue
+                if not raw_parts:
+                    ttft = time.time() - chain_start_time
+                    logger.info(
+                        f"Time to first token: {ttft:.2f}s - Session: {session_id}"
+                    )
+                    if cached_answer is None:
+                        self.metrics.observe(
+                            "llm_first_token", time.perf_counter() - llm_start
+                        )
+                raw_parts.append(token)
+
+                # Hold the first characters back until the greeting can be stripped
+                if prefix_pending:
+                    prefix_buffer += token
+                    if len(prefix_buffer.lstrip()) < len(GREETING_PREFIX):
+                        continue
+                    token = self._clean_stream_prefix(prefix_buffer)
+                    if not token:
+                        # Only the greeting so far, clean what follows it too
+                        prefix_buffer = ""
+                        continue
+                    prefix_pending = False
+                yield "token", token
+
+            if prefix_pending and prefix_buffer:
+                token = self._clean_stream_prefix(prefix_buffer)
+                if token:
+                    yield "token", token
+
+            if cached_answer is None:
+                self.metrics.observe("llm_total", time.perf_counter() - llm_start)
+            raw_answer = "".join(raw_parts)
+            chain_time = time.time() - chain_start_time
+            logger.debug(f"Retrieval and generation completed in {chain_time:.2f}s")
+
+            with self.metrics.timer("postprocess"):
+                answer = self._clean_answer(raw_answer)
+                category = self.categorizer.categorize(user_input)
+                if cached_answer is None:
+                    prompt_tokens, completion_tokens = self._count_tokens(
+                        prompt_value, raw_answer, usage
+                    )
+                else:
+                    # No model call, kept out of the token usage averages
+                    prompt_tokens, completion_tokens = None, None
             logger.debug(
-                f"Raw response length: {len(response['answer'])}, Cleaned length: {len(answer)}"
+                f"Raw response length: {len(raw_answer)}, Cleaned length: {len(answer)}"
             )
 
-            # Remove any "Dobrý den" variations from the answer
-            answer = answer.replace("Dobrý den, ", "")
-            answer = answer.replace("Dobrý den.", "")
-            answer = answer.replace("Dobrý den!", "")
-            answer = answer.replace("Dobrý den", "")  # Catch any remaining variants
-
-            # Capitalize first letter of remaining text
-            answer = answer.strip()  # Remove any leading/trailing whitespace
-            if answer:  # Check if answer is not empty
-                answer = (
-                    answer[0].upper() + answer[1:]
-                    if len(answer) > 1
-                    else answer.upper()
-                )
-
             # DB commit
             response_time = time.time() - start_time
-            category = self._categorize_message(user_input)
-            tokens_used = len(response["answer"].split())
 
             logger.info(
                 f"Response generated successfully - Category: {category}, "
-                f"Response time: {response_time:.2f}s, Tokens: {tokens_used}"
+                f"Response time: {response_time:.2f}s, "
+                f"Tokens: {prompt_tokens} prompt + {completion_tokens} completion"
             )
 
             message_id = None
             try:
-                with next(self.db.get_session()) as session:
-                    interaction = ChatInteraction(
-                        session_id=session_id,
-                        user_message=user_input,
-                        bot_response=answer,
-                        response_time=response_time,
-                        category=category,
-                        tokens_used=tokens_used,
-                        error_occurred=error_occurred,
+                with self.metrics.timer("db_enqueue"):
+                    message_id = await self._save_interaction(
+                        session_id,
+                        user_input,
+                        answer,
+                        response_time,
+                        category,
+                        prompt_tokens,
+                        completion_tokens,
+                        error_occurred,
                     )
-                    session.add(interaction)
-                    session.commit()
-                    message_id = interaction.id
-                logger.debug("Interaction saved to database successfully")
+                logger.debug("Interaction queued for the database")
             except Exception as db_error:
                 logger.error(f"Failed to save interaction to database: {str(db_error)}")
                 # Don't fail the entire request if DB save fails
 
+            if first_turn and cached_answer is None and answer:
+                await self.response_cache.store(user_input, answer_version, answer)
+                if cacheable:
+                    self.semantic_cache.store(query_embedding, context_key, answer)
+
             # Updating of the history with the answer
-            self.conversation_history.append({"role": "assistant", "content": answer})
+            await self.sessions.append(session_id, "assistant", answer)
             logger.debug(
-                f"Added assistant response to conversation history. Total messages: {len(self.conversation_history)}"
+                f"Added assistant response to conversation history of {session_id}"
             )
 
             logger.info(
                 f"Successful response for input: '{user_input[:100]}' -> '{answer[:50]}...'"
             )
-            return answer, message_id
+            self.metrics.observe("total", time.perf_counter() - request_start)
+            yield "done", {"response": answer, "message_id": message_id}
 
         except Exception as e:
             error_occurred = 1
@@ -404,46 +861,99 @@ class CoreChatbot:
             logger.error(f"Error type: {type(e).__name__}")
             logger.error(f"Response time before error: {response_time:.2f}s")
 
+            # Keep the session transcript in line with what the user sees
+            await self.sessions.append(session_id, "assistant", error_msg)
+
             error_message_id = None
             try:
-                with next(self.db.get_session()) as session:
-                    interaction = ChatInteraction(
-                        session_id=session_id,
-                        user_message=user_input,
-                        bot_response=error_msg,
-                        response_time=response_time,
-                        category="error",
-                        tokens_used=0,
-                        error_occurred=error_occurred,
-                    )
-                    session.add(interaction)
-                    session.commit()
-                    error_message_id = interaction.id
-                logger.debug("Error interaction saved to database")
+                error_message_id = await self._save_interaction(
+                    session_id,
+                    user_input,
+                    error_msg,
+                    response_time,
+                    "error",
+                    usage.get("input_tokens"),  # Unknown unless the model finished
+                    usage.get("output_tokens"),
+                    error_occurred,
+                )
+                logger.debug("Error interaction queued for the database")
             except Exception as db_error:
                 logger.error(
                     f"Failed to save error interaction to database: {str(db_error)}"
                 )
 
-            return error_msg, error_message_id
+            yield "done", {"response": error_msg, "message_id": error_message_id}
 
-    def clear_conversation(self) -> None:
+    async def _generate(
+        self, prompt_value: "PromptValue", usage: dict
+    ) -> AsyncIterator[str]:
         """
-        Deleting the conversation history
+        Stream the model answer, adding the reported token usage to usage
         """
 
-        history_length = len(self.conversation_history)
-        self.conversation_history.clear()
-        logger.info(f"Conversation history cleared - Removed {history_length} messages")
+        async for chunk in self.chat_model.astream(prompt_value):
+            if chunk.usage_metadata:
+                for key in ("input_tokens", "output_tokens"):
+                    usage[key] = usage.get(key, 0) + chunk.usage_metadata.get(key, 0)
+            yield chunk.content
 
-    def get_conversation_history(self) -> List[Message]:
+    def _count_tokens(
+        self, prompt_value: "PromptValue", answer: str, usage: dict
+    ) -> Tuple[int, int]:
         """
-        Returns the conversation history in the format required by the API
+        Prompt and completion tokens of a model call, as reported by the API
+        or counted locally when the response had no usage metadata
         """
 
-        history_length = len(self.conversation_history)
-        logger.debug(f"Retrieving conversation history - {history_length} messages")
+        if "input_tokens" in usage:
+            return usage["input_tokens"], usage.get("output_tokens", 0)
+        logger.debug("No token usage in the model response, counting locally")
+        return (
+            self.token_counter.count_messages(prompt_value.to_messages()),
+            self.token_counter.count_text(answer),
+        )
+
+    async def _replay(self, answer: str) -> AsyncIterator[str]:
+        """
+        Stream a cached answer like a model response
+        """
+
+        yield answer
+
+    async def get_response(
+        self, user_input: str, session_id: str = ""
+    ) -> tuple[str, str]:
+        """
+        Generate a response to user input using the language model
+        Fully async so a single worker can serve many conversations at once
+        """
+
+        result = {}
+        async for event, data in self.stream_response(user_input, session_id):
+            if event == "done":
+                result = data
+        return result["response"], result["message_id"]
+
+    async def clear_conversation(self, session_id: str = "") -> None:
+        """
+        Deleting the conversation history of the session
+        """
+
+        history_length = await self.sessions.clear(session_id)
+        logger.info(
+            f"Conversation history cleared - Session: {session_id}, Removed {history_length} messages"
+        )
+
+    async def get_conversation_history(self, session_id: str = "") -> List[Message]:
+        """
+        Returns the session's conversation history in the format required by the API
+        """
+
+        conversation_history = await self.sessions.get(session_id)
+        logger.debug(
+            f"Retrieving conversation history - Session: {session_id}, {len(conversation_history)} messages"
+        )
         return [
             Message(role=msg["role"], content=msg["content"])
-            for msg in self.conversation_history
+            for msg in conversation_history
         ]
@@ -0,0 +1,23 @@
+import os
+import sqlite3
+from typing import Callable
+
+
+class ProcessLocalConnection:
+    """
+    SQLite connection reopened in every process that uses it
+    SQLite connections must not cross a fork (gunicorn preload), so a worker
+    opens its own from the connect callable on first use
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]):
+        self._connect = connect
+        self._pid = os.getpid()
+        self._connection = connect()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            self._connection = self._connect()
+            self._pid = os.getpid()
+        return self._connection
@@ -0,0 +1,174 @@
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+from .tokens import TokenCounter
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Shortest shared text treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 50
+# Longest overlap searched for, the knowledge base chunks overlap by 200
+MAX_OVERLAP_CHARS = 400
+# Remainders smaller than this are dropped instead of truncated
+MIN_CHUNK_TOKENS = 50
+
+ROLE_LABELS = {"user": "Uživatel", "assistant": "Asistent"}
+
+
+def _overlap(first: str, second: str) -> int:
+    """
+    Length of the longest suffix of first that is a prefix of second
+    """
+
+    tail = first[-MAX_OVERLAP_CHARS:]
+    probe = second[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = tail.find(probe)
+    while start != -1:
+        if second.startswith(tail[start:]):
+            return len(tail) - start
+        start = tail.find(probe, start + 1)
+    return 0
+
+
+def _truncate(text: str, ratio: float) -> str:
+    """
+    Keep the leading ratio of the text, cut at a word boundary
+    """
+
+    cut = text[: int(len(text) * ratio)]
+    if " " in cut:
+        cut = cut[: cut.rfind(" ")]
+    return cut.rstrip() + " …"
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    """
+    First sentence of a message, at most max_chars long
+    """
+
+    text = " ".join(text.split())
+    end = text.find(". ")
+    if 0 < end < max_chars:
+        return text[: end + 1]
+    return text if len(text) <= max_chars else _truncate(text[:max_chars], 1.0)
+
+
+class ContextBuilder:
+    """
+    Assembles the retrieved chunks and chat history under a token budget
+    Chunks arrive ranked best first: overlap with a higher ranked chunk is cut
+    out, then the lowest ranked chunks are truncated or dropped until the
+    context fits. The latest history messages are kept verbatim, older ones
+    are shortened to their first sentence and dropped oldest first
+    """
+
+    def __init__(
+        self,
+        token_counter: TokenCounter,
+        max_context_tokens: int,
+        max_history_tokens: int,
+        recent_messages: int,
+        summary_chars: int,
+    ):
+        self.token_counter = token_counter
+        self.max_context_tokens = max_context_tokens
+        self.max_history_tokens = max_history_tokens
+        self.recent_messages = recent_messages
+        self.summary_chars = summary_chars
+
+        self.overlap_chars = 0  # Duplicate characters cut from chunks
+        self.chunks_truncated = 0
+        self.chunks_dropped = 0
+        self._lock = threading.Lock()
+
+    def _deduplicate(self, texts: List[str]) -> Tuple[List[str], int]:
+        kept, removed = [], 0
+        for text in texts:
+            for previous in kept:
+                if text in previous:
+                    removed += len(text)
+                    text = ""
+                    break
+                head = _overlap(previous, text)  # text continues previous
+                tail = _overlap(text, previous)  # text precedes previous
+                if head or tail:
+                    removed += head + tail
+                    text = text[head : len(text) - tail]
+            if text.strip():
+                kept.append(text.strip())
+        return kept, removed
+
+    def build_context(self, documents: Sequence["Document"]) -> str:
+        """
+        Chunk texts for the prompt, at most max_context_tokens long
+        """
+
+        texts, removed = self._deduplicate(
+            [document.page_content for document in documents]
+        )
+
+        parts, used, truncated, dropped = [], 0, 0, 0
+        for i, text in enumerate(texts):
+            tokens = self.token_counter.count_text(text)
+            remaining = self.max_context_tokens - used
+            if tokens > remaining:
+                # The best chunk is always kept, even if only in part
+                if remaining < MIN_CHUNK_TOKENS and parts:
+                    dropped = len(texts) - i
+                    break
+                text = _truncate(text, remaining / tokens)
+                tokens = self.token_counter.count_text(text)
+                truncated += 1
+            parts.append(text)
+            used += tokens
+            if used >= self.max_context_tokens:
+                dropped = len(texts) - i - 1
+                break
+
+        with self._lock:
+            self.overlap_chars += removed
+            self.chunks_truncated += truncated
+            self.chunks_dropped += dropped
+        logger.debug(
+            f"Context: {len(parts)}/{len(documents)} chunks, {used} tokens, "
+            f"{removed} overlapping chars removed"
+        )
+        return "\n\n".join(parts)
+
+    def build_history(self, messages: Sequence[Dict[str, str]]) -> str:
+        """
+        Chat history for the prompt, at most max_history_tokens long
+        """
+
+        cutoff = len(messages) - self.recent_messages
+        lines = [
+            f"{ROLE_LABELS.get(message['role'], 'Asistent')}: "
+            + (
+                message["content"]
+                if i >= cutoff
+                else _shorten(message["content"], self.summary_chars)
+            )
+            for i, message in enumerate(messages)
+        ]
+
+        counts = [self.token_counter.count_text(line) for line in lines]
+        while len(lines) > 1 and sum(counts) > self.max_history_tokens:
+            lines.pop(0)
+            counts.pop(0)
+        if lines and counts[0] > self.max_history_tokens:
+            lines[0] = _truncate(lines[0], self.max_history_tokens / counts[0])
+        return "\n".join(lines)
+
+    def stats(self) -> dict:
+        return {
+            "overlap_chars_removed": self.overlap_chars,
+            "chunks_truncated": self.chunks_truncated,
+            "chunks_dropped": self.chunks_dropped,
+        }
@@ -0,0 +1,236 @@
+import os
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .connections import ProcessLocalConnection
+
+# Logger
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with a content-hash-keyed cache
+    Looks up vectors in an in-memory LRU tier, then in an on-disk SQLite tier,
+    and only sends texts that were never embedded before to the provider
+    The async methods read and write the disk tier in a worker thread
+    With max_rows the disk table keeps only the most recently stored vectors,
+    for user queries that would otherwise grow it forever
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache_path: str,
+        namespace: str,
+        memory_size: int = 10_000,
+        table: str = "embeddings",
+        max_rows: Optional[int] = None,
+    ):
+        self.embeddings = embeddings
+        self.cache_path = cache_path
+        self.namespace = namespace  # Model name, vectors of different models never mix
+        self.memory_size = memory_size
+        self.table = table
+        self.max_rows = max_rows
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()  # Memory tier, never held during disk I/O
+        self._disk_lock = threading.Lock()  # The SQLite connection
+        self._disk_rows = 0
+        self._sqlite = ProcessLocalConnection(self._connect)
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.cache_path, timeout=10, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        connection.commit()
+        if self.max_rows:
+            (self._disk_rows,) = connection.execute(
+                f"SELECT COUNT(*) FROM {self.table}"
+            ).fetchone()
+        logger.info(f"Embedding cache opened at {self.cache_path}")
+        return connection
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\x1f{text}".encode()).hexdigest()
+
+    def _lookup_memory(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+        return found
+
+    def _lookup_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._disk_lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                rows = self._sqlite.connection.execute(
+                    f"SELECT key, vector FROM {self.table} WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        with self._lock:
+            for key, vector in found.items():
+                self._remember(key, vector)
+            self.disk_hits += len(found)
+        return found
+
+    def _lookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = self._lookup_memory(keys)
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            found.update(self._lookup_disk(missing))
+        return found
+
+    async def _alookup(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = self._lookup_memory(keys)
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing:
+            found.update(await asyncio.to_thread(self._lookup_disk, missing))
+        return found
+
+    def _store(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+        with self._disk_lock:
+            self._sqlite.connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in vectors.items()],
+            )
+            if self.max_rows:
+                self._disk_rows += len(vectors)
+                if self._disk_rows > self.max_rows:
+                    self._prune()
+            self._sqlite.connection.commit()
+
+    def _prune(self) -> None:
+        # Replaced rows get a new rowid, so the lowest rowids were stored longest ago
+        keep = int(self.max_rows * 0.9)  # Prune in steps, not on every store
+        self._sqlite.connection.execute(
+            f"DELETE FROM {self.table} WHERE rowid IN "
+            f"(SELECT rowid FROM {self.table} ORDER BY rowid LIMIT "
+            f"max(0, (SELECT COUNT(*) FROM {self.table}) - ?))",
+            (keep,),
+        )
+        (self._disk_rows,) = self._sqlite.connection.execute(
+            f"SELECT COUNT(*) FROM {self.table}"
+        ).fetchone()
+        logger.debug(f"Embedding cache {self.table} pruned to {self._disk_rows} rows")
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _missing_texts(
+        self, texts: List[str], found: Dict[str, np.ndarray]
+    ) -> List[str]:
+        missing = {}
+        for text in texts:
+            key = self._key(text)
+            if key not in found:
+                missing[key] = text
+        self.misses += len(missing)
+        return list(missing.values())
+
+    def _assemble(
+        self, texts: List[str], found: Dict[str, np.ndarray]
+    ) -> List[List[float]]:
+        return [found[self._key(text)].tolist() for text in texts]
+
+    def _as_vectors(
+        self, texts: List[str], embedded: List[List[float]]
+    ) -> Dict[str, np.ndarray]:
+        return {
+            self._key(text): np.asarray(vector, dtype=np.float32)
+            for text, vector in zip(texts, embedded)
+        }
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        found = self._lookup([self._key(text) for text in texts])
+        missing = self._missing_texts(texts, found)
+        if missing:
+            logger.debug(f"Embedding {len(missing)} of {len(texts)} texts")
+            vectors = self._as_vectors(
+                missing, self.embeddings.embed_documents(missing)
+            )
+            self._store(vectors)
+            found.update(vectors)
+        return self._assemble(texts, found)
+
+    def embed_query(self, text: str) -> List[float]:
+        found = self._lookup([self._key(text)])
+        if not self._missing_texts([text], found):
+            return self._assemble([text], found)[0]
+        vectors = self._as_vectors([text], [self.embeddings.embed_query(text)])
+        self._store(vectors)
+        return self._assemble([text], vectors)[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        found = await self._alookup([self._key(text) for text in texts])
+        missing = self._missing_texts(texts, found)
+        if missing:
+            logger.debug(f"Embedding {len(missing)} of {len(texts)} texts")
+            embedded = await self.embeddings.aembed_documents(missing)
+            vectors = self._as_vectors(missing, embedded)
+            await asyncio.to_thread(self._store, vectors)
+            found.update(vectors)
+        return self._assemble(texts, found)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        found = await self._alookup([self._key(text)])
+        if not self._missing_texts([text], found):
+            return self._assemble([text], found)[0]
+        vectors = self._as_vectors([text], [await self.embeddings.aembed_query(text)])
+        await asyncio.to_thread(self._store, vectors)
+        return self._assemble([text], vectors)[0]
+
+    def missing(self, texts: List[str]) -> List[str]:
+        """
+        Texts without a cached vector, without calling the provider
+        """
+
+        found = self._lookup([self._key(text) for text in texts])
+        return list(
+            dict.fromkeys(text for text in texts if self._key(text) not in found)
+        )
+
+    def stats(self) -> dict:
+        """
+        Cache counters for monitoring
+        """
+
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_size": len(self._memory),
+        }
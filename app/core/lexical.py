@@ -0,0 +1,146 @@
+import re
+import math
+import logging
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+# Logger
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Czech case and number endings, longest first, stripped by the light stemmer
+SUFFIXES = sorted(
+    "ami ach ech ich ych emu ymi imi ove ovi ou em om um ym ho mi ch a e i o u y".split(),
+    key=len,
+    reverse=True,
+)
+MIN_STEM_LENGTH = 4
+
+
+def stem(token: str) -> str:
+    """
+    Light Czech stemmer, strips one inflectional ending
+    heatmapa, heatmapy and heatmapu all map to heatmap
+    """
+
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[: -len(suffix)]
+    return token
+
+
+class BM25Index:
+    """
+    In-memory inverted index scoring chunks with Okapi BM25
+    Text is lowercased, passed through normalize (diacritics removal) and
+    stemmed, so queries match regardless of accents and word endings
+    Only postings and lengths are kept, the top k chunks of a search are read
+    back by position through resolve, so the text stays in the docstore
+    """
+
+    def __init__(
+        self,
+        documents: Iterable[Document],
+        resolve: Callable[[int], Document],
+        normalize: Callable[[str], str] = lambda text: text,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.normalize = normalize
+        self.k1 = k1
+        self.b = b
+        self.resolve = resolve
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+
+        for position, document in enumerate(documents):
+            terms = Counter(self.tokenize(document.page_content))
+            self.doc_lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                self.postings[term].append((position, frequency))
+
+        count = len(self.doc_lengths)
+        self.avg_length = sum(self.doc_lengths) / count if count else 0.0
+        self.idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+        logger.info(f"BM25 index built over {count} chunks, {len(self.postings)} terms")
+
+    def tokenize(self, text: str) -> List[str]:
+        return [
+            stem(token) for token in TOKEN_PATTERN.findall(self.normalize(text.lower()))
+        ]
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """
+        Top k chunks for the query with their BM25 scores
+        """
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(self.tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, frequency in self.postings[term]:
+                length_norm = (
+                    1
+                    - self.b
+                    + self.b * self.doc_lengths[position] / (self.avg_length or 1)
+                )
+                scores[position] += (
+                    idf
+                    * frequency
+                    * (self.k1 + 1)
+                    / (frequency + self.k1 * length_norm)
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.resolve(position), score) for position, score in ranked]
+
+    def is_confident(
+        self,
+        query: str,
+        results: Sequence[Tuple[Document, float]],
+        k: int,
+        max_terms: int,
+    ) -> bool:
+        """
+        Whether the lexical results alone answer a keyword query
+        The query must be short and each of the top k chunks must contain all
+        of its terms, so semantic search would not find anything more relevant
+        """
+
+        terms = set(self.tokenize(query))
+        if not terms or len(terms) > max_terms or len(results) < k:
+            return False
+        return all(
+            terms <= set(self.tokenize(document.page_content))
+            for document, _ in results[:k]
+        )
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Document]], k: int, rrf_k: int = 60
+) -> List[Document]:
+    """
+    Merge ranked document lists, scoring each document by sum(1 / (rrf_k + rank))
+    Documents are matched by chunk_id, or by content for stores built without IDs
+    """
+
+    scores: Dict[str, float] = defaultdict(float)
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking, start=1):
+            key = document.metadata.get("chunk_id") or document.page_content
+            scores[key] += 1 / (rrf_k + rank)
+            documents.setdefault(key, document)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in ranked]
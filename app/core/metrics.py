@@ -0,0 +1,164 @@
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Stages of a chat request, in pipeline order
+STAGES = (
+    "embedding",
+    "vector_search",
+    "lexical_search",
+    "prompt",
+    "llm_first_token",
+    "llm_total",
+    "postprocess",
+    "db_enqueue",
+    "db_write",
+    "total",
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def log_linear_bounds(
+    min_exponent: int = -4, max_exponent: int = 2, steps_per_decade: int = 18
+) -> List[float]:
+    """
+    Bucket upper bounds, linear within each power of ten
+    With 18 steps a decade is split at 1, 1.5, 2, ... 9.5, so the relative
+    bucket width, and the percentile error, stays under 50% and mostly ~5-10%
+    """
+
+    return [
+        round(10**exponent * (1 + 9 * step / steps_per_decade), 10)
+        for exponent in range(min_exponent, max_exponent + 1)
+        for step in range(steps_per_decade)
+    ] + [10 ** (max_exponent + 1)]
+
+
+class LogLinearHistogram:
+    """
+    Fixed-memory latency histogram with log-linear buckets, values in seconds
+    """
+
+    def __init__(self, bounds: Optional[List[float]] = None):
+        self.bounds = bounds or log_linear_bounds()
+        self.counts = [0] * (len(self.bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """
+        Value below which a fraction q of the observations fall
+        Interpolated linearly inside the bucket holding the rank
+        """
+
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            cumulative = 0
+            for i, count in enumerate(self.counts):
+                if count and cumulative + count >= rank:
+                    lower = self.bounds[i - 1] if i else 0.0
+                    upper = self.bounds[i] if i < len(self.bounds) else self.max
+                    value = lower + (upper - lower) * (rank - cumulative) / count
+                    return min(max(value, self.min), self.max)
+                cumulative += count
+            return self.max
+
+    def snapshot(self) -> dict:
+        summary = {
+            f"p{round(q * 100)}": round(self.percentile(q), 4) for q in QUANTILES
+        }
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 4) if self.count else 0.0,
+            **summary,
+            "max": round(self.max, 4),
+        }
+
+
+class StageMetrics:
+    """
+    Latency histograms per request stage, exported in Prometheus text format
+    """
+
+    def __init__(self, stages=STAGES):
+        self.histograms: Dict[str, LogLinearHistogram] = {
+            stage: LogLinearHistogram() for stage in stages
+        }
+
+    def observe(self, stage: str, seconds: float) -> None:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms.setdefault(stage, LogLinearHistogram())
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """
+        Time the enclosed block into the stage histogram
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, dict]:
+        return {
+            stage: histogram.snapshot()
+            for stage, histogram in self.histograms.items()
+            if histogram.count
+        }
+
+    def render_prometheus(self, prefix: str = "chatbot") -> str:
+        """
+        Prometheus text exposition: one histogram over all stages plus
+        precomputed p50/p95/p99 gauges for dashboards without histogram_quantile
+        """
+
+        name = f"{prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Duration of chat request stages",
+            f"# TYPE {name} histogram",
+        ]
+        quantiles = [
+            f"# HELP {name}_quantile Stage duration percentiles since start",
+            f"# TYPE {name}_quantile gauge",
+        ]
+        for stage, histogram in self.histograms.items():
+            with histogram._lock:
+                counts = list(histogram.counts)
+                total, count = histogram.sum, histogram.count
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.bounds, counts):
+                cumulative += bucket_count
+                lines.append(
+                    f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}'
+                )
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+            for q in QUANTILES:
+                quantiles.append(
+                    f'{name}_quantile{{stage="{stage}",quantile="{q}"}} {histogram.percentile(q)}'
+                )
+        return "\n".join(lines + quantiles) + "\n"
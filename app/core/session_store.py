@@ -0,0 +1,236 @@
+import os
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List
+
+# Logger
+logger = logging.getLogger(__name__)
+
+
+class _Session:
+    """
+    Conversation state of a single visitor
+    """
+
+    __slots__ = ("messages", "last_access", "size")
+
+    def __init__(self, max_messages: int):
+        self.messages: Deque[Dict[str, str]] = deque(maxlen=max_messages)
+        self.last_access = time.monotonic()
+        self.size = 0  # Stored characters, used for the memory cap
+
+
+class SessionStore:
+    """
+    Session-keyed conversation history store
+    Keeps a bounded ring buffer per session, evicts idle sessions after a TTL
+    and the least recently used sessions once the memory cap is reached
+    The methods are async to share the interface of RedisSessionStore
+    """
+
+    def __init__(
+        self, max_messages: int, ttl_seconds: float, max_sessions: int, max_chars: int
+    ):
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_chars = max_chars
+
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._total_chars = 0
+        self._lock = threading.Lock()
+
+    async def append(self, session_id: str, role: str, content: str) -> None:
+        """
+        Add a message to the session, dropping the oldest one when the buffer is full
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = _Session(self.max_messages)
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_access = now
+
+            if len(session.messages) == session.messages.maxlen:
+                dropped = session.messages[0]
+                session.size -= len(dropped["content"])
+                self._total_chars -= len(dropped["content"])
+            session.messages.append({"role": role, "content": content})
+            session.size += len(content)
+            self._total_chars += len(content)
+
+            self._enforce_limits(keep=session_id)
+
+    async def get(self, session_id: str) -> List[Dict[str, str]]:
+        """
+        Return a copy of the session's messages, oldest first
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            session.last_access = now
+            return list(session.messages)
+
+    async def clear(self, session_id: str) -> int:
+        """
+        Remove the session and return the number of dropped messages
+        """
+
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return 0
+            self._total_chars -= session.size
+            return len(session.messages)
+
+    async def active_count(self) -> int:
+        """
+        Number of sessions that have not expired yet
+        """
+
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            return len(self._sessions)
+
+    def _drop(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._total_chars -= session.size
+
+    def _evict_expired(self, now: float) -> None:
+        # Sessions are kept in LRU order, so expired ones are at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access < self.ttl_seconds:
+                break
+            self._drop(session_id)
+            logger.debug(f"Session {session_id} expired after {self.ttl_seconds}s idle")
+
+    def _enforce_limits(self, keep: str) -> None:
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions
+            or self._total_chars > self.max_chars
+        ):
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                break
+            self._drop(session_id)
+            logger.debug(f"Session {session_id} evicted to respect the memory cap")
+
+
+def redis_client(url: str):
+    """
+    Redis client for REDIS_URL, shared state of all worker processes
+    The asyncio client keeps slow round trips off the event loop
+    """
+
+    from redis.asyncio import Redis  # Optional dependency, only needed with REDIS_URL
+
+    options = {"socket_timeout": 2}
+    if url.startswith("rediss://"):
+        options["ssl_cert_reqs"] = None  # Heroku Redis uses self-signed certs
+    return Redis.from_url(url, **options)
+
+
+class RedisSessionStore:
+    """
+    Session history kept in Redis, shared by all worker processes
+    Each session is a capped list of JSON messages that expires after
+    ttl_seconds of inactivity, so any worker can serve any session
+    A sorted set of session ids scored by last access counts the active
+    sessions without scanning the keyspace
+    """
+
+    def __init__(
+        self, url: str, max_messages: int, ttl_seconds: float, prefix: str = "session:"
+    ):
+        self.max_messages = max_messages
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+        self.active_key = f"{prefix}active"
+        self.client = redis_client(url)
+        logger.info(f"Session store: Redis ({prefix}*)")
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    async def append(self, session_id: str, role: str, content: str) -> None:
+        """
+        Add a message to the session, dropping the oldest one when the list is full
+        """
+
+        key = self._key(session_id)
+        async with self.client.pipeline() as pipeline:
+            pipeline.rpush(key, json.dumps({"role": role, "content": content}))
+            pipeline.ltrim(key, -self.max_messages, -1)
+            pipeline.expire(key, self.ttl_seconds)
+            pipeline.zadd(self.active_key, {session_id: time.time()})
+            await pipeline.execute()
+
+    async def get(self, session_id: str) -> List[Dict[str, str]]:
+        """
+        Return the session's messages, oldest first
+        """
+
+        key = self._key(session_id)
+        async with self.client.pipeline() as pipeline:
+            pipeline.lrange(key, 0, -1)
+            pipeline.expire(key, self.ttl_seconds)
+            # Only refresh sessions already counted, reads never create one
+            pipeline.zadd(self.active_key, {session_id: time.time()}, xx=True)
+            messages, _, _ = await pipeline.execute()
+        return [json.loads(message) for message in messages]
+
+    async def clear(self, session_id: str) -> int:
+        """
+        Remove the session and return the number of dropped messages
+        """
+
+        key = self._key(session_id)
+        async with self.client.pipeline() as pipeline:
+            pipeline.llen(key)
+            pipeline.delete(key)
+            pipeline.zrem(self.active_key, session_id)
+            length, _, _ = await pipeline.execute()
+        return length
+
+    async def active_count(self) -> int:
+        """
+        Number of sessions that have not expired yet
+        """
+
+        async with self.client.pipeline() as pipeline:
+            pipeline.zremrangebyscore(
+                self.active_key, "-inf", time.time() - self.ttl_seconds
+            )
+            pipeline.zcard(self.active_key)
+            _, count = await pipeline.execute()
+        return count
+
+
+def create_session_store(
+    max_messages: int, ttl_seconds: float, max_sessions: int, max_chars: int
+):
+    """
+    Redis store when REDIS_URL is set (needed with several workers),
+    otherwise the in-process store
+    """
+
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return RedisSessionStore(redis_url, max_messages, ttl_seconds)
+    return SessionStore(max_messages, ttl_seconds, max_sessions, max_chars)
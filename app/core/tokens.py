@@ -0,0 +1,71 @@
+import logging
+import threading
+from typing import TYPE_CHECKING, Sequence
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Tokens OpenAI adds around every chat message and to prime the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+class TokenCounter:
+    """
+    Local token counts for when the API response carries no usage metadata
+    The tiktoken encoding is loaded by load() or on first use, without it
+    tokens are estimated from the text length
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load_encoding(self):
+        with self._lock:
+            if not self._loaded:
+                try:
+                    import tiktoken
+
+                    try:
+                        self._encoding = tiktoken.encoding_for_model(self.model_name)
+                    except KeyError:
+                        self._encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    logger.warning(f"tiktoken unavailable, estimating tokens: {str(e)}")
+                self._loaded = True
+        return self._encoding
+
+    def load(self) -> bool:
+        """
+        Load the encoding now, before the first count on the event loop
+        Returns False when tokens are estimated instead
+        """
+
+        return self._load_encoding() is not None
+
+    def count_text(self, text: str) -> int:
+        if not text:
+            return 0
+        encoding = self._encoding if self._loaded else self._load_encoding()
+        if encoding is None:
+            return len(text) // 4 + 1
+        return len(encoding.encode(text))
+
+    def count_messages(self, messages: Sequence["BaseMessage"]) -> int:
+        """
+        Prompt tokens of a chat request, counted like the OpenAI chat format
+        """
+
+        return (
+            sum(
+                TOKENS_PER_MESSAGE + self.count_text(str(message.content))
+                for message in messages
+            )
+            + TOKENS_PER_REPLY
+        )
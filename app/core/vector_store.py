@@ -0,0 +1,328 @@
+import os
+import json
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from typing import Iterator, List, Optional, Sequence, Union
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from .connections import ProcessLocalConnection
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Location of the knowledge base built by model/hokej_logic_load.py
+VECTOR_STORE_PATH = "data/vector_store"
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+LOAD_ATTEMPTS = 3  # Reads of an index and docstore pair being replaced
+
+
+def index_version(path: str = VECTOR_STORE_PATH) -> str:
+    """
+    Fingerprint of the vector store files on disk
+    Changes whenever the knowledge base is rebuilt
+    """
+
+    fingerprint = hashlib.sha1()
+    try:
+        for name in sorted(os.listdir(path)):
+            stat = os.stat(os.path.join(path, name))
+            fingerprint.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    except FileNotFoundError:
+        logger.warning(f"Vector store path not found: {path}")
+    return fingerprint.hexdigest()[:12]
+
+
+class SQLiteDocstore(Docstore):
+    """
+    Read-only docstore backed by docstore.sqlite
+    Documents are fetched by index position on demand, so nothing but the
+    connection is kept in memory and all workers share the OS page cache
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sqlite = ProcessLocalConnection(self._connect)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(
+            f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+        )
+
+    def search(self, search: Union[int, str]) -> Union[str, Document]:
+        with self._lock:
+            row = self._sqlite.connection.execute(
+                "SELECT id, content, metadata FROM documents WHERE position = ?",
+                (int(search),),
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=row[0], page_content=row[1], metadata=json.loads(row[2]))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._sqlite.connection.execute(
+                "SELECT COUNT(*) FROM documents"
+            ).fetchone()[0]
+
+    def meta(self, key: str) -> Optional[str]:
+        """
+        Value saved with the documents, None for stores saved without it
+        """
+
+        with self._lock:
+            try:
+                row = self._sqlite.connection.execute(
+                    "SELECT value FROM meta WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.OperationalError:  # No meta table
+                return None
+        return row[0] if row else None
+
+    def iter_documents(self) -> Iterator[Document]:
+        """
+        All documents in index order
+        """
+
+        with self._lock:
+            rows = self._sqlite.connection.execute(
+                "SELECT id, content, metadata FROM documents ORDER BY position"
+            ).fetchall()
+        for chunk_id, content, metadata in rows:
+            yield Document(
+                id=chunk_id, page_content=content, metadata=json.loads(metadata)
+            )
+
+
+class IndexPositions(Mapping):
+    """
+    Identity mapping from FAISS index positions to SQLiteDocstore keys
+    Replaces the pickled index_to_docstore_id dict
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def __getitem__(self, position: int) -> int:
+        if not 0 <= position < self.size:
+            raise KeyError(position)
+        return int(position)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.size))
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def store_document(vector_store: FAISS, position: int) -> Document:
+    """
+    Document stored at a position of the FAISS index
+    """
+
+    chunk_id = vector_store.index_to_docstore_id[position]
+    document = vector_store.docstore.search(chunk_id)
+    if not isinstance(document, Document):
+        raise ValueError(f"Could not find document for id {chunk_id}")
+    return document
+
+
+def iter_store_documents(vector_store: FAISS) -> Iterator[Document]:
+    """
+    All documents of a loaded vector store in index order
+    """
+
+    if isinstance(vector_store.docstore, SQLiteDocstore):
+        yield from vector_store.docstore.iter_documents()
+        return
+    for position in range(vector_store.index.ntotal):
+        yield store_document(vector_store, position)
+
+
+def file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_index(path: str, mmap: bool = True) -> faiss.Index:
+    """
+    Read the FAISS index, memory-mapped read-only when the index type supports it
+    """
+
+    if mmap:
+        flags = faiss.IO_FLAG_READ_ONLY | getattr(
+            faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP
+        )
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError as e:
+            logger.warning(
+                f"Memory-mapped index loading failed, reading to heap: {str(e)}"
+            )
+    return faiss.read_index(path)
+
+
+def set_search_params(
+    index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None
+) -> None:
+    """
+    Apply query-time accuracy/speed settings of approximate indexes
+    nprobe applies to IVF indexes, ef_search to HNSW, flat indexes ignore both
+    """
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and nprobe:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if hasattr(index, "hnsw") and ef_search:
+        index.hnsw.efSearch = ef_search
+
+
+def search_by_vectors(
+    vector_store: FAISS, vectors: Sequence[Sequence[float]], k: int
+) -> List[List[Document]]:
+    """
+    Nearest documents of several query vectors with a single FAISS search
+    Returns the same documents as similarity_search_by_vector for each vector
+    """
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if vector_store._normalize_L2:
+        faiss.normalize_L2(matrix)
+    _, positions = vector_store.index.search(matrix, k)
+
+    results = []
+    for row in positions:
+        documents = []
+        for position in row:
+            if position == -1:  # Fewer than k vectors in the index
+                continue
+            documents.append(store_document(vector_store, int(position)))
+        results.append(documents)
+    return results
+
+
+def load_vector_store(
+    path: str,
+    embeddings: Embeddings,
+    mmap: bool = True,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> FAISS:
+    """
+    Load the vector store for serving
+    Uses the memory-mapped index and the lazy SQLite docstore when the store was
+    built in that format, otherwise falls back to the pickled langchain format
+    The docstore records the checksum of its index, a pair caught in the middle
+    of save_vector_store is read again instead of returning the wrong chunks
+    """
+
+    docstore_path = os.path.join(path, DOCSTORE_FILE)
+    if not os.path.exists(docstore_path):
+        logger.warning(
+            f"{DOCSTORE_FILE} not found, loading the pickled docstore into memory"
+        )
+        return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+
+    index_path = os.path.join(path, INDEX_FILE)
+    for attempt in range(LOAD_ATTEMPTS):
+        # Opened first: save_vector_store replaces the index before the
+        # docstore, so the index read next is never older than it
+        docstore = SQLiteDocstore(docstore_path)
+        index = read_index(index_path, mmap=mmap)
+        expected = docstore.meta("index_sha1")
+        if expected is None or expected == file_sha1(index_path):
+            break
+        logger.warning("Index and docstore are from different builds, retrying")
+        time.sleep(0.5 * (attempt + 1))
+    else:
+        raise RuntimeError(f"Index and docstore in {path} do not match")
+
+    set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+    logger.info(
+        f"Loaded {index.ntotal} vectors ({type(index).__name__}, mmap={mmap}) with lazy docstore"
+    )
+    return FAISS(embeddings, index, docstore, IndexPositions(index.ntotal))
+
+
+def load_vector_store_for_update(path: str, embeddings: Embeddings) -> FAISS:
+    """
+    Load a writable in-memory copy of the vector store for the index builder
+    """
+
+    docstore_path = os.path.join(path, DOCSTORE_FILE)
+    if not os.path.exists(docstore_path):
+        return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+
+    index = faiss.read_index(os.path.join(path, INDEX_FILE))
+    documents = list(SQLiteDocstore(docstore_path).iter_documents())
+    docstore = InMemoryDocstore({document.id: document for document in documents})
+    index_to_docstore_id = {i: document.id for i, document in enumerate(documents)}
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def save_vector_store(vector_store: FAISS, path: str) -> None:
+    """
+    Write the index and the SQLite docstore, replacing the files atomically
+    The docstore records the index checksum, so a loader running between the
+    two replacements can tell the files apart
+    The pickled docstore of the legacy format is removed
+    """
+
+    os.makedirs(path, exist_ok=True)
+    index_path = os.path.join(path, INDEX_FILE)
+    docstore_path = os.path.join(path, DOCSTORE_FILE)
+
+    faiss.write_index(vector_store.index, f"{index_path}.tmp")
+
+    if os.path.exists(f"{docstore_path}.tmp"):
+        os.remove(f"{docstore_path}.tmp")
+    connection = sqlite3.connect(f"{docstore_path}.tmp")
+    connection.execute(
+        "CREATE TABLE documents (position INTEGER PRIMARY KEY, id TEXT NOT NULL, content TEXT NOT NULL, metadata TEXT NOT NULL)"
+    )
+    connection.executemany(
+        "INSERT INTO documents (position, id, content, metadata) VALUES (?, ?, ?, ?)",
+        (
+            (
+                position,
+                chunk_id,
+                document.page_content,
+                json.dumps(document.metadata, ensure_ascii=False),
+            )
+            for position, chunk_id in sorted(vector_store.index_to_docstore_id.items())
+            for document in [vector_store.docstore.search(chunk_id)]
+        ),
+    )
+    connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    connection.execute(
+        "INSERT INTO meta (key, value) VALUES ('index_sha1', ?)",
+        (file_sha1(f"{index_path}.tmp"),),
+    )
+    connection.commit()
+    connection.close()
+
+    # The index first, the order load_vector_store relies on
+    os.replace(f"{index_path}.tmp", index_path)
+    os.replace(f"{docstore_path}.tmp", docstore_path)
+
+    legacy_path = os.path.join(path, LEGACY_DOCSTORE_FILE)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+    logger.info(f"Saved {vector_store.index.ntotal} vectors to {path}")
@@ -0,0 +1,204 @@
+import os
+import time
+import uuid
+import queue
+import asyncio
+import logging
+import threading
+from typing import List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+
+from .metrics import StageMetrics
+from ..database.rollups import apply_deltas, interaction_deltas
+from ..schemas.models import ChatInteraction
+
+# Logger
+logger = logging.getLogger(__name__)
+
+
+class InteractionWriter:
+    """
+    Write-behind buffer for ChatInteraction rows
+    Requests only enqueue their row and get its UUID back, a background thread
+    bulk-inserts the queue every batch_size rows or flush_interval seconds,
+    so a burst of chats needs one database connection instead of one each
+    The stats rollups are updated in the same transaction
+    The queue is bounded: when the database falls behind, submit waits up to
+    put_timeout for room and then drops the row
+    Batch write times are recorded in the optional StageMetrics as db_write
+    """
+
+    def __init__(
+        self,
+        db,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        max_queue: int = 10_000,
+        put_timeout: float = 5.0,
+        max_retries: int = 3,
+        metrics: Optional[StageMetrics] = None,
+    ):
+        self.db = db
+        self.metrics = metrics
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        # Threads do not survive a fork, start one per worker process
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="interaction-writer", daemon=True
+            )
+            self._thread.start()
+            logger.info(
+                f"Interaction writer started (batch={self.batch_size}, interval={self.flush_interval}s)"
+            )
+
+    async def submit(self, row: dict) -> str:
+        """
+        Queue a ChatInteraction row and return its message UUID
+        """
+
+        self._ensure_started()
+        row = {**row, "message_uuid": row.get("message_uuid") or str(uuid.uuid4())}
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            logger.warning("Interaction queue full, waiting for the database")
+            try:
+                await asyncio.to_thread(self._queue.put, row, True, self.put_timeout)
+            except queue.Full:
+                self.dropped += 1
+                raise
+        return row["message_uuid"]
+
+    def _next_batch(self) -> List[dict]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, rows: List[dict]) -> None:
+        start = time.perf_counter()
+        with next(self.db.get_session()) as session:
+            session.execute(insert(ChatInteraction), rows)
+            apply_deltas(session, interaction_deltas(rows))
+            session.commit()
+        if self.metrics is not None:
+            self.metrics.observe("db_write", time.perf_counter() - start)
+        self.written += len(rows)
+        self.batches += 1
+
+    def _write(self, batch: List[dict]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._insert(batch)
+                logger.debug(f"Wrote {len(batch)} chat interactions")
+                return
+            except OperationalError as e:
+                # Lost connection, lock timeout, ... the same batch can succeed later
+                if attempt == self.max_retries:
+                    self.dropped += len(batch)
+                    logger.error(
+                        f"Failed to write {len(batch)} chat interactions: {str(e)}"
+                    )
+                    return
+                logger.warning(f"Interaction batch failed, retrying: {str(e)}")
+                time.sleep(0.5 * 2**attempt)
+            except Exception as e:
+                # A row the database rejects fails the whole batch, write the
+                # rows one by one so only that row is lost
+                logger.warning(
+                    f"Interaction batch rejected, writing rows one by one: {str(e)}"
+                )
+                self._write_rows(batch)
+                return
+
+    def _write_rows(self, rows: List[dict]) -> None:
+        for row in rows:
+            try:
+                self._insert([row])
+            except Exception as e:
+                self.dropped += 1
+                logger.error(
+                    f"Failed to write chat interaction {row['message_uuid']}: {str(e)}"
+                )
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued row is written, True if the queue drained in time
+        """
+
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.unfinished_tasks == 0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Flush the queue and stop the background thread
+        """
+
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive() or not self._queue.empty():
+            logger.error(
+                f"Interaction writer stopped with {self._queue.qsize()} rows unwritten"
+            )
+        else:
+            logger.info(f"Interaction writer stopped, {self.written} rows written")
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
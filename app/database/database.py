@@ -1,15 +1,39 @@
 import os
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
+# Logger
+logger = logging.getLogger(__name__)
+
 # Base initialization
 Base = declarative_base()
 
+# Local database used when JAWSDB_URL is not set
+SQLITE_URL = "sqlite:///app/database/chatbot.db"
+
+# Alembic configuration of the schema migrations
+ALEMBIC_INI = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "alembic.ini"
+)
+
+# Revision matching the tables create_all built before migrations existed
+BASELINE_REVISION = "0001"
+
+
+def database_url() -> str:
+    """
+    JawsDB MySQL on Heroku, SQLite locally
+    """
+
+    return os.getenv("JAWSDB_URL") or SQLITE_URL
+
 
 class Database:
     """
     Connect to the database
+    The schema is managed by Alembic migrations (migrations/), see upgrade()
     """
 
     def __init__(self):
@@ -28,11 +52,36 @@ class Database:
             )
         else:
             # We're local, use SQLite
-            self.engine = create_engine("sqlite:///app/database/chatbot.db")
+            self.engine = create_engine(SQLITE_URL)
 
-        Base.metadata.create_all(self.engine)
         self.SessionLocal = sessionmaker(bind=self.engine)
 
+    @property
+    def is_sqlite(self) -> bool:
+        return self.engine.dialect.name == "sqlite"
+
+    def upgrade(self, revision: str = "head") -> None:
+        """
+        Apply the schema migrations up to revision
+        Databases created by create_all before migrations existed are stamped
+        with the baseline revision first, so their tables are not recreated
+        """
+
+        from alembic import command
+        from alembic.config import Config
+
+        alembic_config = Config(ALEMBIC_INI)
+        with self.engine.begin() as connection:
+            # Picked up by migrations/env.py instead of opening its own engine
+            alembic_config.attributes["connection"] = connection
+            tables = inspect(connection).get_table_names()
+            if "chat_interactions" in tables and "alembic_version" not in tables:
+                logger.info(
+                    f"Stamping existing database with revision {BASELINE_REVISION}"
+                )
+                command.stamp(alembic_config, BASELINE_REVISION)
+            command.upgrade(alembic_config, revision)
+
     def get_session(self):
         session = self.SessionLocal()
         try:
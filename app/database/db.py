@@ -2,7 +2,7 @@
 from .database import Database
 
 # Models registration for tables creation
-from ..schemas.models import ChatInteraction
+from ..schemas.models import ChatInteraction, InteractionRollup
 
 # Create a global database instance
 db = Database()
@@ -0,0 +1,226 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Query, Session
+
+from ..schemas.models import ChatInteraction, StatsFilter
+from .rollups import summarize_rollups, token_usage_summary
+
+# Rows fetched per round trip when streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FIELDS = [
+    "id",
+    "message_uuid",
+    "session_id",
+    "timestamp",
+    "category",
+    "user_message",
+    "bot_response",
+    "response_time",
+    "tokens_used",
+    "prompt_tokens",
+    "completion_tokens",
+    "error_occurred",
+    "rating",
+]
+
+
+def apply_filters(query: Query, filters: StatsFilter) -> Query:
+    """
+    Restrict a ChatInteraction query to the requested filters
+    """
+
+    if filters.start is not None:
+        query = query.filter(ChatInteraction.timestamp >= filters.start)
+    if filters.end is not None:
+        query = query.filter(ChatInteraction.timestamp < filters.end)
+    if filters.category is not None:
+        query = query.filter(ChatInteraction.category == filters.category)
+    if filters.session_id is not None:
+        query = query.filter(ChatInteraction.session_id == filters.session_id)
+    if filters.rating is not None:
+        query = query.filter(ChatInteraction.rating == filters.rating)
+    if filters.error_occurred is not None:
+        query = query.filter(
+            ChatInteraction.error_occurred == int(filters.error_occurred)
+        )
+    return query
+
+
+def column_equals(column, value):
+    """
+    Condition matching a column value read earlier, NULL included
+    """
+
+    return column.is_(None) if value is None else column == value
+
+
+def summarize(session: Session, filters: StatsFilter) -> dict:
+    """
+    Aggregate metrics of the filtered interactions
+    Read from the rollup table when the filters allow it, otherwise computed
+    by the database over the matching rows
+    """
+
+    summary = summarize_rollups(session, filters)
+    if summary is not None:
+        return summary
+
+    total_interactions, avg_response_time, error_rate = apply_filters(
+        session.query(
+            func.count(ChatInteraction.id),
+            func.avg(ChatInteraction.response_time),
+            func.avg(ChatInteraction.error_occurred),
+        ),
+        filters,
+    ).one()
+
+    prompt_tokens, completion_tokens, tokens_count = apply_filters(
+        session.query(
+            func.sum(ChatInteraction.prompt_tokens),
+            func.sum(ChatInteraction.completion_tokens),
+            func.count(ChatInteraction.prompt_tokens),
+        ),
+        filters,
+    ).one()
+
+    rating_stats = (
+        apply_filters(
+            session.query(ChatInteraction.rating, func.count(ChatInteraction.id)),
+            filters,
+        )
+        .group_by(ChatInteraction.rating)
+        .all()
+    )
+
+    rating_distribution = {
+        "thumbs_up": 0,
+        "thumbs_down": 0,
+        "neutral": 0,
+        "no_rating": 0,
+    }
+
+    for rating, count in rating_stats:
+        if rating == 1:
+            rating_distribution["thumbs_up"] = count
+        elif rating == -1:
+            rating_distribution["thumbs_down"] = count
+        elif rating == 0:
+            rating_distribution["neutral"] = count
+        else:  # NULL or None
+            rating_distribution["no_rating"] = count
+
+    category_counts = (
+        apply_filters(
+            session.query(ChatInteraction.category, func.count(ChatInteraction.id)),
+            filters,
+        )
+        .group_by(ChatInteraction.category)
+        .all()
+    )
+
+    return {
+        "total_interactions": total_interactions,
+        "average_response_time": (
+            round(avg_response_time, 2) if avg_response_time else 0
+        ),
+        "error_rate": round(error_rate * 100, 2) if error_rate else 0,
+        "rating_distribution": rating_distribution,
+        "category_distribution": dict(category_counts),
+        "token_usage": token_usage_summary(
+            prompt_tokens, completion_tokens, tokens_count
+        ),
+    }
+
+
+def encode_cursor(interaction: ChatInteraction) -> str:
+    """
+    Opaque keyset cursor pointing just after the given row
+    """
+
+    raw = f"{interaction.timestamp.isoformat()}|{interaction.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Inverse of encode_cursor, raises ValueError for malformed cursors
+    """
+
+    try:
+        timestamp, row_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        )
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def list_conversations(
+    session: Session, filters: StatsFilter, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[ChatInteraction], Optional[str]]:
+    """
+    One page of interactions, newest first, and the cursor of the next page
+    Keyset pagination on (timestamp, id): every page costs the same however
+    deep the admin scrolls, unlike OFFSET
+    """
+
+    query = apply_filters(session.query(ChatInteraction), filters)
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        # The leading range on timestamp lets the index seek to the cursor
+        query = query.filter(
+            ChatInteraction.timestamp <= timestamp,
+            or_(ChatInteraction.timestamp < timestamp, ChatInteraction.id < row_id),
+        )
+
+    rows = (
+        query.order_by(ChatInteraction.timestamp.desc(), ChatInteraction.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def iter_conversations(
+    session: Session, filters: StatsFilter
+) -> Iterator[ChatInteraction]:
+    """
+    Stream all filtered interactions, newest first, EXPORT_BATCH_SIZE rows at a time
+    """
+
+    query = (
+        apply_filters(session.query(ChatInteraction), filters)
+        .order_by(ChatInteraction.timestamp.desc(), ChatInteraction.id.desc())
+        .yield_per(EXPORT_BATCH_SIZE)
+    )
+    for interaction in query:
+        yield interaction
+        session.expunge(interaction)  # Keep the identity map from growing
+
+
+def serialize_conversation(conv: ChatInteraction) -> dict:
+    """
+    JSON-ready representation of an interaction
+    """
+
+    return {
+        "id": conv.id,
+        "message_uuid": conv.message_uuid,
+        "session_id": conv.session_id,
+        "timestamp": conv.timestamp.isoformat(),
+        "category": conv.category,
+        "user_message": conv.user_message,
+        "bot_response": conv.bot_response,
+        "response_time": round(conv.response_time or 0, 2),
+        "tokens_used": conv.tokens_used,
+        "prompt_tokens": conv.prompt_tokens,
+        "completion_tokens": conv.completion_tokens,
+        "error_occurred": bool(conv.error_occurred),
+        "rating": conv.rating,
+    }
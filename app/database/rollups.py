@@ -0,0 +1,222 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..schemas.models import InteractionRollup, StatsFilter
+
+GRANULARITIES = ("hour", "day")
+COUNTERS = (
+    "interactions",
+    "errors",
+    "response_time_sum",
+    "response_time_count",
+    "thumbs_up",
+    "thumbs_down",
+    "neutral",
+    "prompt_tokens_sum",
+    "completion_tokens_sum",
+    "tokens_count",
+)
+RATING_COUNTERS = {1: "thumbs_up", -1: "thumbs_down", 0: "neutral"}
+
+RollupKey = Tuple[str, datetime, str]
+Deltas = Dict[RollupKey, Dict[str, float]]
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _keys(timestamp: datetime, category: Optional[str]) -> Iterable[RollupKey]:
+    for granularity in GRANULARITIES:
+        yield granularity, bucket_start(timestamp, granularity), category or ""
+
+
+def interaction_deltas(rows: Iterable[dict], deltas: Optional[Deltas] = None) -> Deltas:
+    """
+    Rollup increments for new ChatInteraction rows (dicts of column values)
+    """
+
+    deltas = deltas if deltas is not None else defaultdict(lambda: defaultdict(float))
+    for row in rows:
+        for key in _keys(row["timestamp"], row.get("category")):
+            counters = deltas[key]
+            counters["interactions"] += 1
+            counters["errors"] += row.get("error_occurred") or 0
+            if row.get("response_time") is not None:
+                counters["response_time_sum"] += row["response_time"]
+                counters["response_time_count"] += 1
+            if row.get("rating") in RATING_COUNTERS:
+                counters[RATING_COUNTERS[row["rating"]]] += 1
+            if row.get("prompt_tokens") is not None:
+                counters["prompt_tokens_sum"] += row["prompt_tokens"]
+                counters["completion_tokens_sum"] += row.get("completion_tokens") or 0
+                counters["tokens_count"] += 1
+    return deltas
+
+
+def rating_deltas(
+    timestamp: datetime,
+    category: Optional[str],
+    old_rating: Optional[int],
+    new_rating: Optional[int],
+) -> Deltas:
+    """
+    Rollup changes when an interaction's rating changes
+    """
+
+    deltas = defaultdict(lambda: defaultdict(float))
+    if old_rating == new_rating:
+        return deltas
+    for key in _keys(timestamp, category):
+        if old_rating in RATING_COUNTERS:
+            deltas[key][RATING_COUNTERS[old_rating]] -= 1
+        if new_rating in RATING_COUNTERS:
+            deltas[key][RATING_COUNTERS[new_rating]] += 1
+    return deltas
+
+
+def apply_deltas(session: Session, deltas: Deltas) -> None:
+    """
+    Add the increments to the rollup rows in one upsert statement
+    Runs in the caller's transaction, commit together with the source change
+    """
+
+    if not deltas:
+        return
+    rows = [
+        {
+            "granularity": granularity,
+            "bucket": bucket,
+            "category": category,
+            **{name: counters.get(name, 0) for name in COUNTERS},
+        }
+        for (granularity, bucket, category), counters in deltas.items()
+    ]
+
+    table = InteractionRollup.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+
+        statement = insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(
+            {name: table.c[name] + statement.inserted[name] for name in COUNTERS}
+        )
+    else:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        statement = insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["granularity", "bucket", "category"],
+            set_={name: table.c[name] + statement.excluded[name] for name in COUNTERS},
+        )
+    session.execute(statement)
+
+
+def token_usage_summary(
+    prompt_tokens: Optional[float],
+    completion_tokens: Optional[float],
+    interactions: Optional[int],
+) -> dict:
+    """
+    Token totals and per-interaction averages over interactions with usage
+    """
+
+    prompt_tokens = int(prompt_tokens or 0)
+    completion_tokens = int(completion_tokens or 0)
+    interactions = int(interactions or 0)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "interactions_with_usage": interactions,
+        "average_prompt_tokens": (
+            round(prompt_tokens / interactions, 1) if interactions else 0
+        ),
+        "average_completion_tokens": (
+            round(completion_tokens / interactions, 1) if interactions else 0
+        ),
+    }
+
+
+def _granularity(filters: StatsFilter) -> Optional[str]:
+    """
+    Finest rollup granularity the filters can be answered from, None if none can
+    """
+
+    if any(
+        value is not None
+        for value in (filters.session_id, filters.rating, filters.error_occurred)
+    ):
+        return None
+    bounds = [bound for bound in (filters.start, filters.end) if bound is not None]
+    for granularity in ("day", "hour"):
+        if all(bucket_start(bound, granularity) == bound for bound in bounds):
+            return granularity
+    return None
+
+
+def summarize_rollups(session: Session, filters: StatsFilter) -> Optional[dict]:
+    """
+    Aggregate metrics read from the rollup table, O(buckets) instead of O(rows)
+    Returns None when the filters need the raw interactions
+    """
+
+    granularity = _granularity(filters)
+    if granularity is None:
+        return None
+
+    query = session.query(
+        InteractionRollup.category,
+        *[func.sum(getattr(InteractionRollup, name)) for name in COUNTERS],
+    ).filter(InteractionRollup.granularity == granularity)
+    if filters.start is not None:
+        query = query.filter(InteractionRollup.bucket >= filters.start)
+    if filters.end is not None:
+        query = query.filter(InteractionRollup.bucket < filters.end)
+    if filters.category is not None:
+        query = query.filter(InteractionRollup.category == filters.category)
+
+    totals = dict.fromkeys(COUNTERS, 0)
+    category_distribution = {}
+    for category, *sums in query.group_by(InteractionRollup.category).all():
+        for name, value in zip(COUNTERS, sums):
+            totals[name] += value or 0
+        if sums[0]:  # Buckets emptied by re-categorization
+            category_distribution[category or None] = int(sums[0])
+
+    interactions = int(totals["interactions"])
+    rated = int(totals["thumbs_up"] + totals["thumbs_down"] + totals["neutral"])
+    average_response_time = (
+        totals["response_time_sum"] / totals["response_time_count"]
+        if totals["response_time_count"]
+        else 0
+    )
+    error_rate = totals["errors"] / interactions if interactions else 0
+    token_usage = token_usage_summary(
+        totals["prompt_tokens_sum"],
+        totals["completion_tokens_sum"],
+        totals["tokens_count"],
+    )
+
+    return {
+        "total_interactions": interactions,
+        "average_response_time": round(average_response_time, 2),
+        "error_rate": round(error_rate * 100, 2),
+        "rating_distribution": {
+            "thumbs_up": int(totals["thumbs_up"]),
+            "thumbs_down": int(totals["thumbs_down"]),
+            "neutral": int(totals["neutral"]),
+            "no_rating": interactions - rated,
+        },
+        "category_distribution": category_distribution,
+        "token_usage": token_usage,
+    }
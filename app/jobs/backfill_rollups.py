@@ -0,0 +1,102 @@
+# TO REBUILD THE STATS ROLLUPS (run from the project root)
+
+# python -m app.jobs.backfill_rollups
+
+import sys
+import time
+import logging
+import argparse
+from collections import defaultdict
+from typing import List, Optional
+
+from ..database.db import db
+from ..database.rollups import apply_deltas, interaction_deltas
+from ..schemas.models import ChatInteraction, InteractionRollup
+
+# Configure logging to track backfill progress
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+READ_BATCH_SIZE = 5000  # Rows fetched per round trip
+COLUMNS = (
+    ChatInteraction.id,
+    ChatInteraction.timestamp,
+    ChatInteraction.category,
+    ChatInteraction.response_time,
+    ChatInteraction.error_occurred,
+    ChatInteraction.rating,
+    ChatInteraction.prompt_tokens,
+    ChatInteraction.completion_tokens,
+)
+
+
+def _rows(session, after_id: int = 0, until_id: Optional[int] = None):
+    query = session.query(*COLUMNS).filter(ChatInteraction.id > after_id)
+    if until_id is not None:
+        query = query.filter(ChatInteraction.id <= until_id)
+    for row in query.order_by(ChatInteraction.id).yield_per(READ_BATCH_SIZE):
+        yield row._asdict()
+
+
+def backfill() -> dict:
+    """
+    Rebuild the rollup table from the full interaction history
+    Rows are streamed and aggregated in memory per bucket, so memory grows
+    with the number of buckets, not rows. Interactions written while the job
+    runs are re-applied on top, the swap happens in one transaction
+    """
+
+    start_time = time.time()
+    with next(db.get_session()) as session:
+        last_id = (
+            session.query(ChatInteraction.id)
+            .order_by(ChatInteraction.id.desc())
+            .limit(1)
+            .scalar()
+            or 0
+        )
+
+        deltas = defaultdict(lambda: defaultdict(float))
+        rows = 0
+        for row in _rows(session, until_id=last_id):
+            interaction_deltas([row], deltas)
+            rows += 1
+            if rows % 100_000 == 0:
+                logger.info(f"Aggregated {rows} interactions")
+        session.rollback()
+
+        # The writer keeps updating rollups meanwhile: rows above last_id are
+        # counted again after the old rollups are dropped
+        session.query(InteractionRollup).delete()
+        apply_deltas(session, deltas)
+        late_rows = list(_rows(session, after_id=last_id))
+        apply_deltas(session, interaction_deltas(late_rows))
+        session.commit()
+
+    summary = {
+        "interactions": rows + len(late_rows),
+        "buckets": len(deltas),
+        "seconds": round(time.time() - start_time, 2),
+    }
+    logger.info(f"Rollups rebuilt: {summary}")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point
+    """
+
+    argparse.ArgumentParser(
+        description="Rebuild the /stats rollup table from chat_interactions"
+    ).parse_args(argv)
+    backfill()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# TO RE-CATEGORIZE HISTORICAL CHAT INTERACTIONS (run from the project root)
+
+# python -m app.jobs.recategorize --dry-run     # Count the changes only
+# python -m app.jobs.recategorize               # Resumes from the checkpoint
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from collections import Counter
+from typing import List, Optional
+
+from sqlalchemy import update
+
+from ..core.categorizer import Categorizer
+from ..database.db import db
+from ..database.queries import column_equals
+from ..database.rollups import apply_deltas, interaction_deltas
+from ..schemas.models import ChatInteraction
+
+# Configure logging to track re-categorization progress
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000  # Rows read and updated per transaction
+CHECKPOINT_PATH = "data/recategorize_checkpoint.json"
+ERROR_CATEGORY = "error"  # Set for failed requests, not derived from the message
+UPDATE_ATTEMPTS = 3  # Conditional updates of a row changed while being processed
+COLUMNS = (
+    ChatInteraction.id,
+    ChatInteraction.timestamp,
+    ChatInteraction.category,
+    ChatInteraction.user_message,
+    ChatInteraction.response_time,
+    ChatInteraction.error_occurred,
+    ChatInteraction.rating,
+    ChatInteraction.prompt_tokens,
+    ChatInteraction.completion_tokens,
+)
+
+
+def _load_checkpoint(path: str, version: str) -> int:
+    """
+    Last processed id of an interrupted run with the same keywords, else 0
+    """
+
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("version") != version:
+        logger.info("Checkpoint is from other category keywords, starting over")
+        return 0
+    return checkpoint["last_id"]
+
+
+def _save_checkpoint(path: str, version: str, last_id: int) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": version, "last_id": last_id}, f)
+    os.replace(tmp_path, path)
+
+
+def _rollup_changes(rows: List[dict], categories: List[str]):
+    """
+    Rollup deltas moving the rows from their old to their new categories
+    """
+
+    deltas = interaction_deltas(
+        [{**row, "category": c} for row, c in zip(rows, categories)]
+    )
+    for key, counters in interaction_deltas(rows).items():
+        for name, value in counters.items():
+            deltas[key][name] -= value
+    return deltas
+
+
+def _update_categories(session, changed: List[tuple]) -> List[tuple]:
+    """
+    Set the new categories of rows still as they were read
+    A row rated since is read again, locked, and updated from its current
+    values, so the rollup deltas follow the rows actually written
+    Returns the updated rows as written with their new categories
+    """
+
+    updated = []
+    for row, category in changed:
+        for _ in range(UPDATE_ATTEMPTS):
+            result = session.execute(
+                update(ChatInteraction)
+                .where(
+                    ChatInteraction.id == row["id"],
+                    column_equals(ChatInteraction.category, row["category"]),
+                    column_equals(ChatInteraction.rating, row["rating"]),
+                )
+                .values(category=category)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                updated.append((row, category))
+                break
+
+            # A locking read sees the latest commit, also under REPEATABLE READ
+            current = (
+                session.query(*COLUMNS)
+                .filter(ChatInteraction.id == row["id"])
+                .with_for_update()
+                .one_or_none()
+            )
+            if current is None or current.category in (ERROR_CATEGORY, category):
+                break  # Deleted or nothing left to change
+            row = current._asdict()
+        else:
+            logger.warning(f"Interaction {row['id']} kept changing, not updated")
+    return updated
+
+
+def recategorize(
+    batch_size: int = BATCH_SIZE,
+    checkpoint_path: str = CHECKPOINT_PATH,
+    dry_run: bool = False,
+    categorizer: Optional[Categorizer] = None,
+) -> dict:
+    """
+    Re-run the categorizer over the stored interactions
+    Rows are read in id order, batch_size at a time in short transactions, so
+    the live app keeps writing; changed categories and the matching rollup
+    counters are updated together. The checkpoint records the last committed
+    id, an interrupted run continues from there
+    """
+
+    categorizer = categorizer or Categorizer()
+    start_time = time.time()
+    last_id = 0 if dry_run else _load_checkpoint(checkpoint_path, categorizer.version)
+    if last_id:
+        logger.info(f"Resuming after interaction {last_id}")
+
+    scanned, transitions = 0, Counter()
+    while True:
+        with next(db.get_session()) as session:
+            rows = [
+                row._asdict()
+                for row in session.query(*COLUMNS)
+                .filter(ChatInteraction.id > last_id)
+                .order_by(ChatInteraction.id)
+                .limit(batch_size)
+            ]
+            if not rows:
+                break
+
+            categories = categorizer.categorize_many(
+                row["user_message"] for row in rows
+            )
+            changed = [
+                (row, category)
+                for row, category in zip(rows, categories)
+                if row["category"] != ERROR_CATEGORY and category != row["category"]
+            ]
+            if changed and not dry_run:
+                changed = _update_categories(session, changed)
+                apply_deltas(
+                    session,
+                    _rollup_changes(
+                        [row for row, _ in changed], [c for _, c in changed]
+                    ),
+                )
+                session.commit()
+            for row, category in changed:
+                transitions[(row["category"], category)] += 1
+
+        scanned += len(rows)
+        last_id = rows[-1]["id"]
+        if not dry_run:
+            _save_checkpoint(checkpoint_path, categorizer.version, last_id)
+        if scanned % (batch_size * 50) < batch_size:
+            logger.info(f"Scanned {scanned} interactions up to id {last_id}")
+
+    summary = {
+        "scanned": scanned,
+        "changed": sum(transitions.values()),
+        "transitions": {
+            f"{old} -> {new}": count for (old, new), count in transitions.items()
+        },
+        "dry_run": dry_run,
+        "seconds": round(time.time() - start_time, 2),
+    }
+    logger.info(f"Re-categorization finished: {summary}")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Re-run the message categorizer over chat_interactions"
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report the changes without writing"
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore the checkpoint of a previous run"
+    )
+    args = parser.parse_args(argv)
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    recategorize(args.batch_size, args.checkpoint, args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,6 +20,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
 from .core.chatbot import ChatbotConfig, CoreChatbot
+from .database.db import db
 from .routers import endpoints
 from .const.constants import VERSION
 
@@ -65,10 +66,18 @@ app.add_middleware(
 # Serve React app static files
 app.mount("/assets", StaticFiles(directory="ui/dist/assets"), name="react-assets")
 
-# Chatbot initialization
+# Schema migrations: local SQLite is upgraded on start, Heroku runs them
+# in the release phase (Procfile) before any web dyno starts
+migrations_start = time.perf_counter()
+if db.is_sqlite:
+    db.upgrade()
+migrations_time = time.perf_counter() - migrations_start
+
+# Chatbot initialization, models and index load on startup (see startup_event)
 try:
     config = ChatbotConfig()
     chatbot = CoreChatbot(config)
+    chatbot.startup_phases["migrations"] = round(migrations_time, 3)
 except Exception as e:
     logger.error(f"Failed to initialize chatbot: {str(e)}")
     raise
@@ -89,3 +98,20 @@ async def startup_event():
     logger.info(
         "🚀 Hokej Logic Chatbot API starting up locally at: http://127.0.0.1:8000"
     )
+    chatbot.startup_phases["app_init"] = round(time.time() - START_TIME, 3)
+
+    # Returns at once, the port is bound while the models and index load
+    chatbot.start_warm_up()
+    # Quick option answers are generated once the models are loaded
+    chatbot.start_prewarm()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Application shutdown event
+    """
+
+    # Write the chat interactions still waiting in the write-behind queue
+    chatbot.writer.close()
+    logger.info("Hokej Logic Chatbot API shut down")
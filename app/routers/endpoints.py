@@ -1,21 +1,43 @@
 import os
+import io
+import csv
+import json
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException, Request, Depends, Security
-from fastapi.responses import JSONResponse, FileResponse
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Depends, Query, Security
+from fastapi.responses import (
+    JSONResponse,
+    FileResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 from fastapi.security import APIKeyHeader
-from sqlalchemy import func
 from datetime import datetime
 import time
-import psutil
+
+from sqlalchemy import update
 
 from ..database.db import db
+from ..database.rollups import apply_deltas, rating_deltas
+from ..database.queries import (
+    EXPORT_FIELDS,
+    column_equals,
+    iter_conversations,
+    list_conversations,
+    serialize_conversation,
+    summarize,
+)
 from ..schemas.models import (
     ChatInteraction,
     ChatRequest,
     ChatResponse,
+    ClearRequest,
     ClearResponse,
     RatingRequest,
     RatingResponse,
+    ConversationPage,
+    StatsFilter,
 )
 from ..const.constants import VERSION
 
@@ -28,6 +50,13 @@ router = APIRouter(tags=["Admin section"])
 # Admin security initialization
 api_key_header = APIKeyHeader(name="X-API-Key")
 
+# Conversations per /stats page
+STATS_PAGE_SIZE = 50
+STATS_MAX_PAGE_SIZE = 500
+
+# Conditional rating updates retried when another request changed the row
+RATE_MAX_ATTEMPTS = 5
+
 
 # Initialize router with required dependencies
 def init_router(config_instance, chatbot_instance, start_time):
@@ -80,10 +109,10 @@ async def chat(request: ChatRequest):
     try:
         # Use provided session_id from frontend
         session_id = request.session_id
-        response, message_id = chatbot.get_response(request.message, session_id)
+        response, message_id = await chatbot.get_response(request.message, session_id)
         return ChatResponse(
             response=response,
-            conversation_history=chatbot.get_conversation_history(),
+            conversation_history=await chatbot.get_conversation_history(session_id),
             message_id=message_id,
         )
     except Exception as e:
@@ -91,14 +120,62 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+def _sse_event(event: str, data: dict) -> str:
+    """
+    Format a server-sent event
+    """
+
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Send a message to the chatbot and stream the response as server-sent events
+    Emits "token" events while the answer is generated and a final "done" event
+    with the cleaned answer, message_id and conversation history
+    """
+
+    session_id = request.session_id
+
+    async def event_stream():
+        try:
+            async for event, data in chatbot.stream_response(
+                request.message, session_id
+            ):
+                if event == "token":
+                    yield _sse_event("token", {"token": data})
+                else:
+                    history = await chatbot.get_conversation_history(session_id)
+                    yield _sse_event(
+                        "done",
+                        {
+                            **data,
+                            "conversation_history": [
+                                message.model_dump() for message in history
+                            ],
+                        },
+                    )
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {str(e)}")
+            yield _sse_event("error", {"detail": "Internal server error"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/clear", response_model=ClearResponse)
-async def clear_conversation():
+async def clear_conversation(request: Optional[ClearRequest] = None):
     """
-    Clear the conversation history
+    Clear the conversation history of the given session
     """
 
     try:
-        chatbot.clear_conversation()
+        session_id = request.session_id if request else ""
+        await chatbot.clear_conversation(session_id)
         return ClearResponse(
             message="Conversation history cleared successfully", status=True
         )
@@ -115,32 +192,33 @@ async def rate_message(request: RatingRequest):
     Rate a message with thumbs up (+1), thumbs down (-1), or neutral (0)
     """
 
+    # Message UUIDs come from /chat, database IDs from older clients and /stats
+    if isinstance(request.message_id, int) or request.message_id.isdigit():
+        message_filter = ChatInteraction.id == int(request.message_id)
+    else:
+        message_filter = ChatInteraction.message_uuid == request.message_id
+
     try:
-        with next(db.get_session()) as session:
-            # Find the chat interaction by message_id
-            interaction = (
-                session.query(ChatInteraction)
-                .filter(ChatInteraction.id == request.message_id)
-                .first()
+        rated = await asyncio.to_thread(_rate, message_filter, request.rating)
+        if not rated:
+            # The row may still be waiting in the write-behind queue, the
+            # lookup's connection is back in the pool while the writer flushes
+            await asyncio.to_thread(chatbot.writer.flush, 5.0)
+            rated = await asyncio.to_thread(_rate, message_filter, request.rating)
+
+        if not rated:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Message with ID {request.message_id} not found",
             )
 
-            if not interaction:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Message with ID {request.message_id} not found",
-                )
-
-            # Update the rating
-            interaction.rating = request.rating
-            session.commit()
-
-            logger.info(f"Message {request.message_id} rated as {request.rating}")
+        logger.info(f"Message {request.message_id} rated as {request.rating}")
 
-            return RatingResponse(
-                response_message="Rating successfully updated",
-                message_id=request.message_id,
-                rating=request.rating,
-            )
+        return RatingResponse(
+            response_message="Rating successfully updated",
+            message_id=request.message_id,
+            rating=request.rating,
+        )
 
     except HTTPException:
         raise
@@ -149,101 +227,242 @@ async def rate_message(request: RatingRequest):
         raise HTTPException(status_code=500, detail="Failed to save rating")
 
 
+def _rate(message_filter, rating: int) -> bool:
+    """
+    Set the rating and update the stats rollups in one transaction
+    The update only applies while the rating and category are still the
+    ones read, so concurrent rates (or a re-categorization) of the same
+    message never apply their rollup deltas from the same old value
+    Returns False when the interaction is not in the database (yet)
+    """
+
+    columns = (
+        ChatInteraction.id,
+        ChatInteraction.timestamp,
+        ChatInteraction.category,
+        ChatInteraction.rating,
+    )
+    with next(db.get_session()) as session:
+        for _ in range(RATE_MAX_ATTEMPTS):
+            row = session.query(*columns).filter(message_filter).first()
+            if not row:
+                return False
+
+            result = session.execute(
+                update(ChatInteraction)
+                .where(
+                    ChatInteraction.id == row.id,
+                    column_equals(ChatInteraction.category, row.category),
+                    column_equals(ChatInteraction.rating, row.rating),
+                )
+                .values(rating=rating)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                apply_deltas(
+                    session,
+                    rating_deltas(row.timestamp, row.category, row.rating, rating),
+                )
+                session.commit()
+                return True
+
+            # Changed since it was read, read it again in a new transaction
+            session.rollback()
+    raise RuntimeError("Rating kept changing concurrently, gave up")
+
+
 @router.get("/stats")
-async def get_stats(api_key: str = Depends(verify_api_key)):
+async def get_stats(
+    filters: StatsFilter = Depends(), api_key: str = Depends(verify_api_key)
+):
     """
-    Get statistics about chat interactions including full conversation history
+    Get aggregate statistics and the first page of conversations
+    Kept for existing dashboards, see /stats/summary and /stats/conversations
     """
 
     try:
+        return await asyncio.to_thread(_stats, filters)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to retrieve statistics: {str(e)}"
+        )
+
+
+def _stats(filters: StatsFilter) -> dict:
+    with next(db.get_session()) as session:
+        summary = summarize(session, filters)
+        conversations, next_cursor = list_conversations(
+            session, filters, STATS_PAGE_SIZE
+        )
+        return {
+            **summary,
+            "conversations": [serialize_conversation(c) for c in conversations],
+            "next_cursor": next_cursor,
+        }
+
+
+@router.get("/stats/summary")
+async def get_stats_summary(
+    filters: StatsFilter = Depends(), api_key: str = Depends(verify_api_key)
+):
+    """
+    Get aggregate statistics of chat interactions without listing them
+    """
+
+    def summary() -> dict:
         with next(db.get_session()) as session:
-            # Basic statistics
-            total_interactions = session.query(ChatInteraction).count()
-            avg_response_time = session.query(
-                func.avg(ChatInteraction.response_time)
-            ).scalar()
-            error_rate = session.query(
-                func.avg(ChatInteraction.error_occurred)
-            ).scalar()
-
-            # Rating statistics
-            rating_stats = (
-                session.query(ChatInteraction.rating, func.count(ChatInteraction.id))
-                .group_by(ChatInteraction.rating)
-                .all()
-            )
+            return summarize(session, filters)
 
-            rating_distribution = {
-                "thumbs_up": 0,
-                "thumbs_down": 0,
-                "neutral": 0,
-                "no_rating": 0,
-            }
-
-            for rating, count in rating_stats:
-                if rating == 1:
-                    rating_distribution["thumbs_up"] = count
-                elif rating == -1:
-                    rating_distribution["thumbs_down"] = count
-                elif rating == 0:
-                    rating_distribution["neutral"] = count
-                else:  # NULL or None
-                    rating_distribution["no_rating"] = count
-
-            # Category distribution
-            category_counts = (
-                session.query(ChatInteraction.category, func.count(ChatInteraction.id))
-                .group_by(ChatInteraction.category)
-                .all()
-            )
+    try:
+        return await asyncio.to_thread(summary)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to retrieve statistics: {str(e)}"
+        )
+
+
+@router.get("/stats/conversations", response_model=ConversationPage)
+async def get_stats_conversations(
+    filters: StatsFilter = Depends(),
+    limit: int = Query(STATS_PAGE_SIZE, ge=1, le=STATS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    api_key: str = Depends(verify_api_key),
+):
+    """
+    Get one page of conversations, newest first
+    Pass next_cursor of the previous page as cursor to get the following one
+    """
 
-            # Get all conversations with full details
-            conversations = (
-                session.query(ChatInteraction)
-                .order_by(ChatInteraction.timestamp.desc())
-                .all()
+    def page() -> ConversationPage:
+        with next(db.get_session()) as session:
+            conversations, next_cursor = list_conversations(
+                session, filters, limit, cursor
+            )
+            return ConversationPage(
+                conversations=[serialize_conversation(c) for c in conversations],
+                next_cursor=next_cursor,
             )
 
-            # Format conversations for response
-            conversation_history = [
-                {
-                    "id": conv.id,
-                    "session_id": conv.session_id,
-                    "timestamp": conv.timestamp.isoformat(),
-                    "category": conv.category,
-                    "user_message": conv.user_message,
-                    "bot_response": conv.bot_response,
-                    "response_time": round(conv.response_time, 2),
-                    "tokens_used": conv.tokens_used,
-                    "error_occurred": bool(conv.error_occurred),
-                    "rating": conv.rating,
-                }
-                for conv in conversations
-            ]
-
-            return {
-                "total_interactions": total_interactions,
-                "average_response_time": (
-                    round(avg_response_time, 2) if avg_response_time else 0
-                ),
-                "error_rate": round(error_rate * 100, 2) if error_rate else 0,
-                "rating_distribution": rating_distribution,
-                "category_distribution": dict(category_counts),
-                "conversations": conversation_history,
-            }
+    try:
+        return await asyncio.to_thread(page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
-            status_code=500, detail=f"Failed to retrieve statistics: {str(e)}"
+            status_code=500, detail=f"Failed to retrieve conversations: {str(e)}"
         )
 
 
+@router.get("/stats/export")
+async def export_stats(
+    filters: StatsFilter = Depends(),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    api_key: str = Depends(verify_api_key),
+):
+    """
+    Stream all filtered conversations as NDJSON or CSV
+    Rows are read in batches while the response is sent, memory stays flat
+    """
+
+    def ndjson_rows():
+        with next(db.get_session()) as session:
+            for conv in iter_conversations(session, filters):
+                yield json.dumps(
+                    serialize_conversation(conv), ensure_ascii=False
+                ) + "\n"
+
+    def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        with next(db.get_session()) as session:
+            for conv in iter_conversations(session, filters):
+                writer.writerow(serialize_conversation(conv))
+                if buffer.tell() >= 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        yield buffer.getvalue()
+
+    if format == "csv":
+        content, media_type = csv_rows(), "text/csv"
+    else:
+        content, media_type = ndjson_rows(), "application/x-ndjson"
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=chat_interactions.{format}"
+        },
+    )
+
+
+@router.post("/cache/invalidate")
+async def invalidate_cache(
+    prewarm: bool = True, api_key: str = Depends(verify_api_key)
+):
+    """
+    Drop all cached answers, e.g. after the website content changed
+    The quick questions are answered again in the background unless prewarm=false
+    """
+
+    await chatbot.ensure_ready()
+    try:
+        removed = {
+            "response_cache": await chatbot.response_cache.invalidate(),
+            "semantic_cache": chatbot.semantic_cache.invalidate(),
+        }
+    except Exception as e:
+        logger.error(f"Error in cache invalidation endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to invalidate caches")
+
+    if prewarm:
+        chatbot.start_prewarm()
+    return {"removed": removed, "prewarm": prewarm and config.response_cache_prewarm}
+
+
+@router.get("/health/live")
+async def liveness():
+    """
+    Liveness probe: the process serves requests, models may still be loading
+    """
+
+    return {"status": "alive", "uptime_seconds": round(time.time() - START_TIME, 2)}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 200 once the models and vector store are loaded, else 503
+    """
+
+    startup = chatbot.startup_status()
+    return JSONResponse(
+        status_code=200 if startup["state"] == "ready" else 503,
+        content={"status": startup["state"], "startup": startup},
+    )
+
+
 @router.get("/health")
 async def health_check():
     """
     Health check endpoint that monitors critical system components and chatbot status
     """
 
+    if not chatbot.ready:
+        startup = chatbot.startup_status()
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": startup["state"],
+                "timestamp": datetime.utcnow().isoformat(),
+                "startup": startup,
+            },
+        )
+
     try:
+        import psutil  # Imported on first use, keeps app startup fast
+
         # Check if OpenAI integration is working
         openai_status = chatbot.config.openai_api_key is not None
 
@@ -251,9 +470,13 @@ async def health_check():
         vector_store_status = chatbot.vector_store is not None
 
         # Get application metrics
-        memory_usage = psutil.Process().memory_info().rss / 1024 / 1024  # MB
+        memory_info = psutil.Process().memory_info()
+        memory_usage = memory_info.rss / 1024 / 1024  # MB
+        memory_shared = (
+            getattr(memory_info, "shared", 0) / 1024 / 1024
+        )  # MB, Linux only
         uptime = time.time() - START_TIME
-        conversation_count = len(chatbot.conversation_history)
+        conversation_count = await chatbot.sessions.active_count()
 
         # Check templates directory
         templates_status = os.path.exists("app/templates") and os.path.exists(
@@ -271,11 +494,20 @@ async def health_check():
             },
             "metrics": {
                 "memory_usage_mb": round(memory_usage, 2),
+                "memory_shared_mb": round(memory_shared, 2),
                 "uptime_seconds": round(uptime, 2),
                 "active_conversations": conversation_count,
                 "model_name": chatbot.config.model_name,
                 "max_history": chatbot.config.max_history,
             },
+            "semantic_cache": chatbot.semantic_cache.stats(),
+            "response_cache": await chatbot.response_cache.stats(),
+            "embedding_cache": chatbot.embeddings_model.stats(),
+            "query_batching": chatbot.query_batcher.stats(),
+            "db_writer": chatbot.writer.stats(),
+            "latency": chatbot.metrics.summary(),
+            "context": chatbot.context_builder.stats(),
+            "startup": chatbot.startup_status(),
             "config": {
                 "temperature": chatbot.config.temperature,
                 "chunk_size": chatbot.config.chunk_size,
@@ -292,3 +524,15 @@ async def health_check():
                 "error": str(e),
             },
         )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Per-stage latency histograms and p50/p95/p99 in Prometheus text format
+    """
+
+    return PlainTextResponse(
+        chatbot.metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
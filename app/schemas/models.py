@@ -1,7 +1,8 @@
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, DateTime, Float, Text
-from typing import List, Optional
-from pydantic import BaseModel
+from sqlalchemy import Index, UniqueConstraint
+from typing import List, Optional, Union
+from pydantic import BaseModel, Field
 
 from ..database.database import Base
 
@@ -12,21 +13,56 @@ class ChatInteraction(Base):
     """
 
     __tablename__ = "chat_interactions"
+    __table_args__ = (
+        Index("ix_chat_interactions_category_timestamp", "category", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True)
-    session_id = Column(String(36), nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    message_uuid = Column(
+        String(36), unique=True, index=True
+    )  # Assigned at request time, rows are written in batches
+    session_id = Column(String(36), nullable=False, index=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     user_message = Column(Text, nullable=False)
     bot_response = Column(Text, nullable=False)
     response_time = Column(Float)
     category = Column(String(50))
-    tokens_used = Column(Integer)
+    tokens_used = Column(Integer)  # prompt_tokens + completion_tokens
+    prompt_tokens = Column(Integer)  # System prompt, context, history and question
+    completion_tokens = Column(Integer)
     error_occurred = Column(Integer, default=0)
     rating = Column(
         Integer, nullable=True
     )  # +1 for thumbs up, -1 for thumbs down, 0 not rated
 
 
+class InteractionRollup(Base):
+    """
+    Precomputed aggregates of chat interactions per time bucket and category
+    Maintained incrementally by the interaction writer and /rate
+    """
+
+    __tablename__ = "interaction_rollups"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket", "category", name="uq_rollup_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String(5), nullable=False)  # "hour" or "day"
+    bucket = Column(DateTime, nullable=False)  # Bucket start, UTC
+    category = Column(String(50), nullable=False)
+    interactions = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    response_time_sum = Column(Float, nullable=False, default=0.0)
+    response_time_count = Column(Integer, nullable=False, default=0)
+    thumbs_up = Column(Integer, nullable=False, default=0)
+    thumbs_down = Column(Integer, nullable=False, default=0)
+    neutral = Column(Integer, nullable=False, default=0)
+    prompt_tokens_sum = Column(Integer, nullable=False, default=0)
+    completion_tokens_sum = Column(Integer, nullable=False, default=0)
+    tokens_count = Column(Integer, nullable=False, default=0)
+
+
 # Chat Related Models (pydantic models for request/response validation)
 class Message(BaseModel):
     role: str
@@ -35,13 +71,17 @@ class Message(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
-    session_id: str = ""
+    session_id: str = Field("", max_length=36)  # Length of the database column
 
 
 class ChatResponse(BaseModel):
     response: str
     conversation_history: List[Message]
-    message_id: Optional[int] = None
+    message_id: Optional[str] = None
+
+
+class ClearRequest(BaseModel):
+    session_id: str = Field("", max_length=36)
 
 
 class ClearResponse(BaseModel):
@@ -50,11 +90,26 @@ class ClearResponse(BaseModel):
 
 
 class RatingRequest(BaseModel):
-    message_id: int
+    message_id: Union[int, str]  # Database ID or message UUID
     rating: int  # +1 for thumbs up, -1 for thumbs down, 0 for neutral
 
 
 class RatingResponse(BaseModel):
     response_message: str
-    message_id: int
+    message_id: Union[int, str]
     rating: int
+
+
+# Stats Related Models
+class StatsFilter(BaseModel):
+    start: Optional[datetime] = None  # Inclusive, UTC
+    end: Optional[datetime] = None  # Exclusive, UTC
+    category: Optional[str] = None
+    session_id: Optional[str] = None
+    rating: Optional[int] = None  # 1, -1 or 0
+    error_occurred: Optional[bool] = None
+
+
+class ConversationPage(BaseModel):
+    conversations: List[dict]
+    next_cursor: Optional[str] = None
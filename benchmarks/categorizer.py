@@ -0,0 +1,109 @@
+# MICROBENCHMARK OF THE MESSAGE CATEGORIZER (run from the project root)
+
+# python -m benchmarks.categorizer
+# python -m benchmarks.categorizer --messages 200000
+
+# Compares the compiled Categorizer with the per-call implementation it
+# replaced (reproduced below) on synthetic questions, and checks that both
+# assign the same categories
+
+import sys
+import time
+import random
+import argparse
+from typing import Callable, List, Optional
+
+from app.core.categorizer import CATEGORIES, Categorizer
+
+QUESTIONS = [
+    "Kde najdu statistiky hráčů?",
+    "Jak funguje porovnání střelců v extralize?",
+    "Které formace mají nejlepší Corsi?",
+    "Ukažte mi heatmapu střel a přihrávky",
+    "Jak si vedou brankáři při nájezdech?",
+    "Kde je report posledního zápasu?",
+    "Jaké jsou statistiky týmů za sezónu?",
+    "Co znamená zkratka P.En?",
+    "Dobrý den, mohli byste mi poradit s navigací na webu hokejlogic.cz?",
+    "Kde je gamelog Davida Pastrňáka a jeho trend produktivity za posledních deset utkání?",
+]
+
+
+def legacy_remove_diacritics(text: str) -> str:
+    replacements = {
+        "á": "a",
+        "č": "c",
+        "ď": "d",
+        "é": "e",
+        "ě": "e",
+        "í": "i",
+        "ň": "n",
+        "ó": "o",
+        "ř": "r",
+        "š": "s",
+        "ť": "t",
+        "ú": "u",
+        "ů": "u",
+        "ý": "y",
+        "ž": "z",
+    }
+    return "".join(replacements.get(c.lower(), c.lower()) for c in text)
+
+
+def legacy_categorize(message: str) -> str:
+    categories = {category: list(keywords) for category, keywords in CATEGORIES}
+    message_normalized = legacy_remove_diacritics(message).lower()
+    for category, keywords in categories.items():
+        if any(keyword in message_normalized for keyword in keywords):
+            return category
+    return "ostatni"
+
+
+def timed(function: Callable, argument) -> float:
+    started_at = time.perf_counter()
+    function(argument)
+    return time.perf_counter() - started_at
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark message categorization")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    # Suffixes keep most messages distinct, like real traffic
+    messages = [
+        f"{random.choice(QUESTIONS)} {random.randrange(args.messages)}"
+        for _ in range(args.messages)
+    ]
+
+    categorizer = Categorizer()
+    expected = [legacy_categorize(message) for message in messages]
+    assert categorizer.categorize_many(messages) == expected, "Categories differ"
+
+    results = {
+        "legacy per message": timed(
+            lambda batch: [legacy_categorize(m) for m in batch], messages
+        ),
+        "compiled per message": timed(
+            lambda batch: [categorizer.categorize(m) for m in batch], messages
+        ),
+        "compiled batch": timed(categorizer.categorize_many, messages),
+        "compiled batch, repeats": timed(
+            categorizer.categorize_many, QUESTIONS * 10_000
+        ),
+    }
+
+    baseline = results["legacy per message"]
+    print(f"{'implementation':<26} {'us/message':>11} {'speedup':>8}")
+    for name, seconds in results.items():
+        count = len(QUESTIONS) * 10_000 if "repeats" in name else len(messages)
+        per_message = seconds / count * 1e6
+        speedup = baseline / len(messages) * 1e6 / per_message
+        print(f"{name:<26} {per_message:>11.2f} {speedup:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# BENCHMARK OF QUERY EMBEDDING BATCHING (run from the project root)
+
+# python -m benchmarks.query_batching
+# python -m benchmarks.query_batching --concurrency 64 --latency 0.08
+
+# Runs bursts of concurrent retrievals through the QueryBatcher against the
+# local vector store, with a stub embedding provider that costs a fixed
+# latency per call plus a small per-text cost and a limit of parallel calls
+# (like the provider's rate limits), batched and unbatched (max_batch_size=1,
+# every query is its own embedding call and FAISS search)
+
+import sys
+import time
+import asyncio
+import argparse
+from typing import List, Optional
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from pydantic import PrivateAttr
+
+from app.core.batching import QueryBatcher
+from app.core.vector_store import VECTOR_STORE_PATH, load_vector_store
+
+
+class RemoteEmbeddings(DeterministicFakeEmbedding):
+    latency: float = 0.05
+    per_text: float = 0.0005
+    parallel_calls: int = 8
+    calls: int = 0
+    _semaphore: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.parallel_calls)
+        async with self._semaphore:
+            self.calls += 1
+            await asyncio.sleep(self.latency + self.per_text * len(texts))
+        return self.embed_documents(texts)
+
+
+async def burst(batcher: QueryBatcher, concurrency: int, rounds: int) -> List[float]:
+    latencies = []
+
+    async def one(i: int) -> None:
+        started_at = time.perf_counter()
+        await batcher.search(f"Kde najdu statistiky hráčů? {i}", k=10)
+        latencies.append(time.perf_counter() - started_at)
+
+    for r in range(rounds):
+        await asyncio.gather(*(one(r * concurrency + c) for c in range(concurrency)))
+    return sorted(latencies)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark query batching")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--parallel-calls", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    vector_store = load_vector_store(
+        VECTOR_STORE_PATH, DeterministicFakeEmbedding(size=1)
+    )
+    print(
+        f"{args.concurrency} concurrent queries, {args.latency * 1000:.0f} ms per call, "
+        f"{args.parallel_calls} calls in parallel"
+    )
+    print(f"{'mode':<10} {'queries/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'calls':>6}")
+    for name, batch_size in (("unbatched", 1), ("batched", args.batch_size)):
+        embeddings = RemoteEmbeddings(
+            size=vector_store.index.d,
+            latency=args.latency,
+            parallel_calls=args.parallel_calls,
+        )
+        batcher = QueryBatcher(
+            lambda: embeddings, lambda: vector_store, max_batch_size=batch_size
+        )
+        started_at = time.perf_counter()
+        latencies = asyncio.run(burst(batcher, args.concurrency, args.rounds))
+        elapsed = time.perf_counter() - started_at
+        print(
+            f"{name:<10} {len(latencies) / elapsed:>10.1f} "
+            f"{latencies[len(latencies) // 2] * 1000:>8.1f} "
+            f"{latencies[int(len(latencies) * 0.99)] * 1000:>8.1f} {embeddings.calls:>6}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+# APP WITH LOCAL STUB MODELS FOR THE THROUGHPUT BENCHMARK
+
+# gunicorn benchmarks.stub_app:app    # Started by benchmarks/throughput.py
+
+# Same app, warmed up at import, with the OpenAI chat and embedding models
+# replaced by local stubs, so the benchmark measures the server and not the API
+# The prompt building and local token counting are the app's own; the chat
+# stub waits BENCH_LLM_DELAY seconds and burns BENCH_LLM_CPU seconds of CPU
+# per answer, the share a worker spends on a real streamed response
+
+import os
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.core.embeddings import CachedEmbeddings
+from app.main import app, chatbot  # noqa: F401
+from benchmarks.stubs import SlowChatModel
+
+chatbot.wait_ready()
+chatbot.chat_model = SlowChatModel(
+    delay=float(os.getenv("BENCH_LLM_DELAY", "0.05")),
+    cpu_time=float(os.getenv("BENCH_LLM_CPU", "0.01")),
+)
+chatbot.embeddings_model = CachedEmbeddings(
+    DeterministicFakeEmbedding(size=chatbot.vector_store.index.d),
+    cache_path=os.getenv("BENCH_EMBEDDING_CACHE", "/tmp/bench_embedding_cache.sqlite"),
+    namespace="stub",
+)
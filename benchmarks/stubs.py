@@ -0,0 +1,78 @@
+# LOCAL STUB MODELS SHARED BY THE TESTS AND THE BENCHMARKS
+
+import time
+import asyncio
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def busy(seconds: float) -> None:
+    """
+    Hold the CPU for the given time, like work that does not release the GIL
+    """
+
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class SlowChatModel(BaseChatModel):
+    """
+    Stubbed chat model that simulates LLM latency without calling OpenAI
+    cpu_time stands for the CPU a real response costs the worker (decoding
+    and validating the streamed chunks), spread over the chunks
+    """
+
+    answer: str = "Statistiky hráčů najdete v sekci Hráči."
+    delay: float = 0.2
+    cpu_time: float = 0.0
+    usage: Optional[dict] = None  # usage_metadata of the last chunk, like OpenAI
+    tokens: Optional[List[str]] = (
+        None  # Streamed chunks, answer split at spaces if unset
+    )
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-stub"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self.delay)
+        busy(self.cpu_time)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(self.answer))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        busy(self.cpu_time)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(self.answer))])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs: Any
+    ):
+        words = self.answer.split(" ")
+        tokens = self.tokens or [
+            word if i == 0 else " " + word for i, word in enumerate(words)
+        ]
+        for token in tokens:
+            await asyncio.sleep(self.delay / len(tokens))
+            busy(self.cpu_time / len(tokens))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        if self.usage:
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(content="", usage_metadata=self.usage)
+            )
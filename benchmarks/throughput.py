@@ -0,0 +1,179 @@
+# BENCHMARK OF /chat THROUGHPUT BY WORKER COUNT (run from the project root)
+
+# python -m benchmarks.throughput                         # 1, 2 and 4 workers
+# python -m benchmarks.throughput --workers 1 2 4 8 --concurrency 64
+
+# Starts gunicorn with gunicorn.conf.py (preloaded app) on benchmarks.stub_app,
+# whose models are local stubs, and posts distinct first-turn questions from
+# concurrent clients, spread over --client-processes so the load generator is
+# not the bottleneck. Interactions go to a scratch SQLite database
+
+# What to expect: a request costs a worker about 10 ms of CPU in the stub
+# model (BENCH_LLM_CPU) plus the prompt building and token counting, so one
+# worker tops out below 100 req/s however many clients wait on the 50 ms
+# simulated latency. Throughput grows about linearly with the workers while
+# workers + client processes fit in the CPUs and stays flat beyond, so on a
+# single CPU every worker count gives the same number
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import argparse
+import statistics
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import httpx
+
+QUESTIONS = [
+    "Kde najdu statistiky hráčů?",
+    "Které formace mají nejlepší Corsi?",
+    "Jak si vedou brankáři při nájezdech?",
+    "Kde je report posledního zápasu?",
+    "Co znamená zkratka P.En?",
+]
+
+
+def start_server(workers: int, port: int, database_path: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        "JAWSDB_URL": f"sqlite:///{database_path}",
+    }
+    env.pop("REDIS_URL", None)  # Distinct sessions, the in-process store is enough
+    env["ALLOW_LOCAL_SESSIONS"] = "1"
+    return subprocess.Popen(
+        ["gunicorn", "benchmarks.stub_app:app", "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def wait_ready(url: str, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{url}/health/ready")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"Server at {url} not ready after {timeout}s")
+
+
+async def load(url: str, concurrency: int, duration: float, offset: int = 0) -> dict:
+    """
+    Post questions from concurrency clients for duration seconds
+    """
+
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client_id: int, client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        i = 0
+        while time.monotonic() < deadline:
+            # Distinct text per request, no semantic cache hits
+            message = f"{QUESTIONS[i % len(QUESTIONS)]} ({client_id}-{i})"
+            started_at = time.perf_counter()
+            response = await client.post(
+                f"{url}/chat",
+                json={"message": message, "session_id": f"bench-{client_id}-{i}"},
+            )
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started_at)
+            else:
+                errors += 1
+            i += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        started_at = time.monotonic()
+        await asyncio.gather(
+            *(client_loop(offset + c, client) for c in range(concurrency))
+        )
+        elapsed = time.monotonic() - started_at
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+
+def _load_process(url: str, concurrency: int, duration: float, offset: int) -> dict:
+    return asyncio.run(load(url, concurrency, duration, offset))
+
+
+def run_load(url: str, concurrency: int, duration: float, processes: int) -> dict:
+    """
+    Split the clients over several processes and merge their results
+    """
+
+    shares = [
+        concurrency // processes + (p < concurrency % processes)
+        for p in range(processes)
+    ]
+    with ProcessPoolExecutor(processes) as pool:
+        parts = list(
+            pool.map(
+                _load_process,
+                [url] * processes,
+                shares,
+                [duration] * processes,
+                [sum(shares[:p]) for p in range(processes)],
+            )
+        )
+
+    latencies = sorted(latency for part in parts for latency in part["latencies"])
+    elapsed = max(part["elapsed"] for part in parts)
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+        "errors": sum(part["errors"] for part in parts),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark /chat by worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--client-processes", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    cpus = os.cpu_count()
+    print(
+        f"{cpus} CPUs, {args.concurrency} concurrent clients "
+        f"in {args.client_processes} processes"
+    )
+    print(
+        f"{'workers':>7} {'CPUs':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'errors':>7}"
+    )
+    for workers in args.workers:
+        url = f"http://127.0.0.1:{args.port}"
+        database_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        server = start_server(workers, args.port, database_path)
+        try:
+            asyncio.run(wait_ready(url))
+            # Warm up
+            run_load(url, args.concurrency, min(3, args.duration), 1)
+            result = run_load(
+                url, args.concurrency, args.duration, args.client_processes
+            )
+        finally:
+            server.terminate()
+            server.wait(30)
+        note = "  (more processes than CPUs, little gain expected)"
+        print(
+            f"{workers:>7} {cpus:>5} {result['rps']:>8.1f} {result['p50_ms']:>8.1f} "
+            f"{result['p99_ms']:>8.1f} {result['errors']:>7}"
+            + (note if workers + args.client_processes > cpus else "")
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
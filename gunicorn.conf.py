@@ -0,0 +1,69 @@
+# MULTI-WORKER SERVING (Procfile web process)
+
+# gunicorn app.main:app                   # Reads this file from the project root
+# WEB_CONCURRENCY=4 gunicorn app.main:app
+
+# The app is imported and warmed up once in the master process: the FAISS
+# index (memory-mapped), the docstore and the BM25 index, the prompt
+# template and the clients are shared copy-on-write by the forked workers.
+# Sessions must live in Redis (REDIS_URL) when more than one worker runs,
+# without it a single worker is started and more refuse to start
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2" if os.getenv("REDIS_URL") else "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120  # Streamed answers can take a while
+graceful_timeout = 30  # Time for the interaction writer to flush on shutdown
+keepalive = 5
+
+
+def check_shared_state(workers: int) -> None:
+    """
+    Refuse several workers with per-process sessions and cached answers,
+    a follow-up question would often reach a worker without its history
+    """
+
+    # The throughput benchmark opts out, its clients never send a second turn
+    if workers > 1 and not (
+        os.getenv("REDIS_URL") or os.getenv("ALLOW_LOCAL_SESSIONS")
+    ):
+        raise RuntimeError(
+            f"{workers} workers need REDIS_URL for shared chat sessions, "
+            "set it or run with WEB_CONCURRENCY=1"
+        )
+
+
+def on_starting(server):
+    """
+    Check the configuration before the app is loaded
+    """
+
+    check_shared_state(server.cfg.workers)
+
+
+def when_ready(server):
+    """
+    Load the models and indexes in the master before any worker is forked
+    """
+
+    from app.main import chatbot
+
+    chatbot.wait_ready()
+    # Objects allocated so far are never collected, so the collector does
+    # not write to their pages and break the sharing with the workers
+    gc.freeze()
+    server.log.info(f"Chatbot warmed up in the master: {chatbot.startup_phases}")
+
+
+def post_fork(server, worker):
+    """
+    Drop database connections inherited from the master
+    """
+
+    from app.database.db import db
+
+    db.engine.dispose(close=False)
@@ -0,0 +1,63 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.database.database import Base, database_url
+from app.schemas import models  # noqa: F401 (registers the tables on Base)
+
+# Alembic configuration
+config = context.config
+
+# Models metadata for autogenerate
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """
+    Emit the migration SQL without connecting (alembic upgrade head --sql)
+    """
+
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """
+    Apply the migrations on the application's connection (Database.upgrade)
+    or on a new one when run from the alembic command line
+    """
+
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    engine = create_engine(database_url())
+    with engine.begin() as connection:
+        _run(connection)
+
+
+def _run(connection) -> None:
+    # Batch mode lets SQLite alter tables by copying them
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
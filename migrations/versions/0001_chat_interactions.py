@@ -0,0 +1,36 @@
+"""Chat interactions table
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-01-06 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "chat_interactions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.String(length=36), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=True),
+        sa.Column("user_message", sa.Text(), nullable=False),
+        sa.Column("bot_response", sa.Text(), nullable=False),
+        sa.Column("response_time", sa.Float(), nullable=True),
+        sa.Column("category", sa.String(length=50), nullable=True),
+        sa.Column("tokens_used", sa.Integer(), nullable=True),
+        sa.Column("error_occurred", sa.Integer(), nullable=True),
+        sa.Column("rating", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("chat_interactions")
@@ -0,0 +1,64 @@
+"""Message UUIDs and stats rollups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-06 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases started before migrations may already have these objects
+    if op.get_context().as_sql:
+        columns, indexes, tables = set(), set(), []
+    else:
+        inspector = sa.inspect(op.get_bind())
+        columns = {c["name"] for c in inspector.get_columns("chat_interactions")}
+        indexes = {i["name"] for i in inspector.get_indexes("chat_interactions")}
+        tables = inspector.get_table_names()
+
+    if "message_uuid" not in columns:
+        with op.batch_alter_table("chat_interactions") as batch_op:
+            batch_op.add_column(sa.Column("message_uuid", sa.String(length=36)))
+    if "ix_chat_interactions_message_uuid" not in indexes:
+        op.create_index(
+            "ix_chat_interactions_message_uuid",
+            "chat_interactions",
+            ["message_uuid"],
+            unique=True,
+        )
+
+    if "interaction_rollups" not in tables:
+        op.create_table(
+            "interaction_rollups",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("granularity", sa.String(length=5), nullable=False),
+            sa.Column("bucket", sa.DateTime(), nullable=False),
+            sa.Column("category", sa.String(length=50), nullable=False),
+            sa.Column("interactions", sa.Integer(), nullable=False),
+            sa.Column("errors", sa.Integer(), nullable=False),
+            sa.Column("response_time_sum", sa.Float(), nullable=False),
+            sa.Column("response_time_count", sa.Integer(), nullable=False),
+            sa.Column("thumbs_up", sa.Integer(), nullable=False),
+            sa.Column("thumbs_down", sa.Integer(), nullable=False),
+            sa.Column("neutral", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint(
+                "granularity", "bucket", "category", name="uq_rollup_bucket"
+            ),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("interaction_rollups")
+    op.drop_index("ix_chat_interactions_message_uuid", table_name="chat_interactions")
+    with op.batch_alter_table("chat_interactions") as batch_op:
+        batch_op.drop_column("message_uuid")
@@ -0,0 +1,39 @@
+"""Indexes for the stats and session queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-06 00:00:00
+"""
+
+from alembic import op
+
+# Revision identifiers, used by Alembic
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Latest conversations and keyset pages: ORDER BY timestamp DESC, id DESC
+    op.create_index(
+        "ix_chat_interactions_timestamp", "chat_interactions", ["timestamp"]
+    )
+    # Per-session lookups
+    op.create_index(
+        "ix_chat_interactions_session_id", "chat_interactions", ["session_id"]
+    )
+    # Category filters over a date range
+    op.create_index(
+        "ix_chat_interactions_category_timestamp",
+        "chat_interactions",
+        ["category", "timestamp"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_chat_interactions_category_timestamp", table_name="chat_interactions"
+    )
+    op.drop_index("ix_chat_interactions_session_id", table_name="chat_interactions")
+    op.drop_index("ix_chat_interactions_timestamp", table_name="chat_interactions")
@@ -0,0 +1,40 @@
+"""Prompt and completion token usage
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-01-07 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# Revision identifiers, used by Alembic
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+ROLLUP_COLUMNS = ("prompt_tokens_sum", "completion_tokens_sum", "tokens_count")
+
+
+def upgrade() -> None:
+    # Rows written before this revision keep NULL usage (tokens_used were words)
+    with op.batch_alter_table("chat_interactions") as batch_op:
+        batch_op.add_column(sa.Column("prompt_tokens", sa.Integer()))
+        batch_op.add_column(sa.Column("completion_tokens", sa.Integer()))
+
+    with op.batch_alter_table("interaction_rollups") as batch_op:
+        for name in ROLLUP_COLUMNS:
+            batch_op.add_column(
+                sa.Column(name, sa.Integer(), nullable=False, server_default="0")
+            )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("interaction_rollups") as batch_op:
+        for name in ROLLUP_COLUMNS:
+            batch_op.drop_column(name)
+
+    with op.batch_alter_table("chat_interactions") as batch_op:
+        batch_op.drop_column("completion_tokens")
+        batch_op.drop_column("prompt_tokens")
@@ -0,0 +1,167 @@
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Deque, Iterable, List, Optional, Tuple
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+from langchain.schema import Document
+
+from app.core.embeddings import CachedEmbeddings
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Provider errors worth another attempt
+RETRYABLE_ERRORS = (
+    RateLimitError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+)
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at rate_per_minute
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float) -> None:
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class EmbeddingExecutor:
+    """
+    Rate-limit-aware embedding pipeline for building the vector store
+    Sends batches concurrently within the provider's request and token limits,
+    retries transient errors with exponential backoff and commits every batch
+    to the on-disk embedding cache, which is the checkpoint a failed build
+    resumes from: texts embedded before the failure are not sent again
+    """
+
+    def __init__(
+        self,
+        embeddings: CachedEmbeddings,
+        max_concurrency: int = 4,
+        requests_per_minute: float = 3000,
+        tokens_per_minute: float = 1_000_000,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+    ):
+        self.embeddings = embeddings
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.embedded = 0  # Texts sent to the provider
+        self.cached = 0  # Texts served from the cache (resumed or unchanged)
+        self.batches = 0
+        self.retries = 0
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._started_at = time.monotonic()
+        self._encoding = self._load_encoding()
+
+    @staticmethod
+    def _load_encoding():
+        try:
+            import tiktoken
+
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, estimating tokens: {str(e)}")
+            return None
+
+    def count_tokens(self, texts: List[str]) -> int:
+        if self._encoding is None:
+            return sum(len(text) // 4 + 1 for text in texts)
+        return sum(len(tokens) for tokens in self._encoding.encode_batch(texts))
+
+    async def _embed_with_retry(self, texts: List[str]) -> None:
+        for attempt in range(self.max_retries + 1):
+            await self.request_bucket.acquire(1)
+            await self.token_bucket.acquire(self.count_tokens(texts))
+            try:
+                await self.embeddings.aembed_documents(texts)
+                return
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.base_delay * 2**attempt * (1 + random.random())
+                self.retries += 1
+                logger.warning(
+                    f"Embedding batch failed ({type(e).__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def _embed_batch(self, documents: List[Document]) -> List[List[float]]:
+        texts = [document.page_content for document in documents]
+        missing = self.embeddings.missing(texts)
+        if missing:
+            async with self._semaphore:
+                await self._embed_with_retry(missing)
+
+        self.embedded += len(missing)
+        self.cached += len(texts) - len(missing)
+        self.batches += 1
+        elapsed = time.monotonic() - self._started_at
+        logger.info(
+            f"Embedded batch {self.batches}: {self.embedded} new, {self.cached} cached, "
+            f"{(self.embedded + self.cached) / elapsed:.1f} chunks/s"
+        )
+        return await self.embeddings.aembed_documents(texts)
+
+    async def embed_batches(
+        self, batches: Iterable[List[Document]]
+    ) -> AsyncIterator[Tuple[List[Document], List[List[float]]]]:
+        """
+        Embed document batches concurrently, yielding them in input order
+        The input is read in a worker thread and at most twice max_concurrency
+        batches are pending, so memory stays bounded
+        """
+
+        batches = iter(batches)
+        pending: Deque = deque()
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            pending.append((batch, asyncio.create_task(self._embed_batch(batch))))
+            if len(pending) >= self.max_concurrency * 2:
+                batch, task = pending.popleft()
+                yield batch, await task
+        while pending:
+            batch, task = pending.popleft()
+            yield batch, await task
+
+    def stats(self) -> dict:
+        return {
+            "embedded": self.embedded,
+            "cached": self.cached,
+            "batches": self.batches,
+            "retries": self.retries,
+        }
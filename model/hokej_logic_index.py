@@ -0,0 +1,234 @@
+import math
+import time
+import asyncio
+import logging
+from typing import List, Optional
+
+import faiss
+import numpy as np
+from langchain.schema import Document
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from app.core.embeddings import CachedEmbeddings
+from app.core.vector_store import set_search_params
+from model.hokej_logic_embed import EmbeddingExecutor
+
+# Logger
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq")
+HNSW_NEIGHBORS = 32  # Graph degree (M) of HNSW indexes
+PQ_MAX_SUBQUANTIZERS = 64  # Bytes per vector of IVF-PQ codes
+MAX_TRAINING_POINTS = 100_000  # Vectors sampled to train IVF/PQ quantizers
+REEMBED_BATCH_SIZE = 100  # Chunks per request when lossy vectors are re-embedded
+
+
+def index_factory_string(index: str, ntotal: int, dimension: int) -> str:
+    """
+    FAISS index factory string for an index type, sized for the corpus
+    Anything that is not one of INDEX_TYPES is taken as a factory string as is
+    """
+
+    if index not in INDEX_TYPES:
+        return index
+    if index == "flat":
+        return "Flat"
+    if index == "hnsw":
+        return f"HNSW{HNSW_NEIGHBORS}"
+
+    # ~4 * sqrt(N) lists, with at least 39 training points per list
+    nlist = max(1, min(int(4 * math.sqrt(ntotal)), ntotal // 39))
+    if index == "ivf":
+        return f"IVF{nlist},Flat"
+    subquantizers = max(
+        m for m in range(1, PQ_MAX_SUBQUANTIZERS + 1) if dimension % m == 0
+    )
+    return f"IVF{nlist},PQ{subquantizers}"
+
+
+def reconstruct_vectors(index: faiss.Index) -> Optional[np.ndarray]:
+    """
+    Exact vectors of an index that stores them losslessly, in index order
+    Flat, IVF-Flat and HNSW-Flat indexes qualify, None for compressed ones
+    """
+
+    if isinstance(index, faiss.IndexFlat):
+        return index.reconstruct_n(0, index.ntotal)
+    if isinstance(index, faiss.IndexIVFFlat):
+        index.make_direct_map()  # Position -> (list, offset) lookup for reconstruct
+        return index.reconstruct_n(0, index.ntotal)
+    if isinstance(index, faiss.IndexHNSW):
+        storage = faiss.downcast_index(index.storage)
+        if isinstance(storage, faiss.IndexFlat):
+            return storage.reconstruct_n(0, storage.ntotal)
+    return None
+
+
+async def _reembed(
+    texts: List[str], embeddings: CachedEmbeddings, embedding_options: dict
+) -> np.ndarray:
+    executor = EmbeddingExecutor(embeddings, **embedding_options)
+    batches = (
+        [Document(page_content=text) for text in texts[i : i + REEMBED_BATCH_SIZE]]
+        for i in range(0, len(texts), REEMBED_BATCH_SIZE)
+    )
+    vectors = []
+    async for _, batch_vectors in executor.embed_batches(batches):
+        vectors.extend(batch_vectors)
+    logger.info(f"Re-embedding summary: {executor.stats()}")
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def store_vectors(
+    vector_store: FAISS,
+    embeddings: CachedEmbeddings,
+    embedding_options: Optional[dict] = None,
+) -> np.ndarray:
+    """
+    Exact vectors of the store in index order
+    Read back from the index where it keeps them (see reconstruct_vectors),
+    PQ codes cannot be decoded losslessly, those chunks are embedded again
+    through the rate-limited EmbeddingExecutor, cached chunks are not sent
+    """
+
+    index = vector_store.index
+    vectors = reconstruct_vectors(index)
+    if vectors is not None:
+        return vectors
+
+    logger.warning(
+        f"{type(index).__name__} does not store exact vectors, re-embedding {index.ntotal} chunks"
+    )
+    texts = [
+        vector_store.docstore.search(vector_store.index_to_docstore_id[i]).page_content
+        for i in range(index.ntotal)
+    ]
+    return asyncio.run(_reembed(texts, embeddings, embedding_options or {}))
+
+
+def to_flat(
+    vector_store: FAISS,
+    embeddings: CachedEmbeddings,
+    embedding_options: Optional[dict] = None,
+) -> FAISS:
+    """
+    Swap an approximate index for an exact flat one
+    The builder updates the flat index and derives the ANN index from it,
+    HNSW graphs for example do not support removing vectors
+    """
+
+    if isinstance(vector_store.index, faiss.IndexFlat):
+        return vector_store
+    vectors = store_vectors(vector_store, embeddings, embedding_options)
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    vector_store.index = flat
+    return vector_store
+
+
+def build_ann_index(vectors: np.ndarray, factory: str, seed: int = 0) -> faiss.Index:
+    """
+    Create, train and fill an index from a factory string
+    """
+
+    ntotal, dimension = vectors.shape
+    index = faiss.index_factory(dimension, factory)
+    if not index.is_trained:
+        start_time = time.time()
+        rng = np.random.default_rng(seed)
+        sample = vectors[
+            rng.choice(ntotal, min(ntotal, MAX_TRAINING_POINTS), replace=False)
+        ]
+        index.train(sample)
+        logger.info(
+            f"Trained {factory} on {len(sample)} vectors in {time.time() - start_time:.2f}s"
+        )
+    index.add(vectors)
+    return index
+
+
+def with_index(vector_store: FAISS, index: str, embeddings: Embeddings) -> FAISS:
+    """
+    Copy of a flat vector store using the requested index type
+    """
+
+    vectors = store_vectors(vector_store, embeddings)
+    factory = index_factory_string(index, *vectors.shape)
+    if factory == "Flat":
+        return vector_store
+    return FAISS(
+        embeddings,
+        build_ann_index(vectors, factory),
+        vector_store.docstore,
+        dict(vector_store.index_to_docstore_id),
+    )
+
+
+def _timed_search(index: faiss.Index, queries: np.ndarray, k: int):
+    """
+    Search one query at a time, as the chatbot does
+    Returns the result ids and the per-query latencies in milliseconds
+    """
+
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, query in enumerate(queries):
+        start_time = time.perf_counter()
+        _, ids[i] = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    return ids, np.asarray(latencies)
+
+
+def _report_row(name: str, latencies: np.ndarray, recall: float) -> dict:
+    return {
+        "index": name,
+        "recall": round(recall, 4),
+        "mean_ms": round(float(latencies.mean()), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def evaluate(
+    vectors: np.ndarray,
+    indexes: List[str],
+    k: int = 3,
+    query_count: int = 200,
+    nprobes: Optional[List[int]] = None,
+    ef_searches: Optional[List[int]] = None,
+    seed: int = 0,
+) -> List[dict]:
+    """
+    Recall@k and latency of approximate indexes against the exact flat baseline
+    Queries are midpoints of random pairs of stored vectors, so they resemble
+    real questions without being exact copies of a stored chunk
+    """
+
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, len(vectors), size=(query_count, 2))
+    queries = (vectors[pairs[:, 0]] + vectors[pairs[:, 1]]) / 2
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    truth, latencies = _timed_search(flat, queries, k)
+    report = [_report_row("Flat", latencies, 1.0)]
+
+    for index in indexes:
+        factory = index_factory_string(index, *vectors.shape)
+        ann = build_ann_index(vectors, factory, seed=seed)
+        if faiss.try_extract_index_ivf(ann) is not None:
+            settings = [{"nprobe": n} for n in nprobes or [1, 4, 16, 64]]
+        elif hasattr(ann, "hnsw"):
+            settings = [{"ef_search": ef} for ef in ef_searches or [16, 32, 64, 128]]
+        else:
+            settings = [{}]
+
+        for params in settings:
+            set_search_params(ann, **params)
+            ids, latencies = _timed_search(ann, queries, k)
+            hits = sum(len(set(found) & set(exact)) for found, exact in zip(ids, truth))
+            label = " ".join(
+                [factory] + [f"{key}={value}" for key, value in params.items()]
+            )
+            report.append(_report_row(label, latencies, hits / truth.size))
+    return report
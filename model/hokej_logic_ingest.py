@@ -0,0 +1,143 @@
+import os
+import logging
+from collections import deque
+from itertools import groupby
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+from PyPDF2 import PdfReader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
+
+# Logger
+logger = logging.getLogger(__name__)
+
+PAGES_PER_TASK = 8  # Pages extracted by one worker task
+SPLIT_BUFFER_CHUNKS = 10  # Text buffered before splitting, in multiples of chunk_size
+
+
+def extract_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract the text of pages [start, stop) of a PDF
+    Runs inside a worker process
+    """
+
+    pdf_reader = PdfReader(file_path)
+    return [pdf_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def page_count(file_path: str) -> int:
+    return len(PdfReader(file_path).pages)
+
+
+def iter_pages(
+    file_paths: List[str],
+    executor: Optional[Executor] = None,
+    max_in_flight: int = 16,
+) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yield (file_path, page_texts) batches in document order
+    Page ranges of all files are extracted concurrently by the executor, at most
+    max_in_flight ranges are pending so memory stays bounded
+    """
+
+    tasks = (
+        (file_path, start, min(start + PAGES_PER_TASK, count))
+        for file_path in file_paths
+        for count in [page_count(file_path)]
+        for start in range(0, count, PAGES_PER_TASK)
+    )
+
+    if executor is None:
+        for file_path, start, stop in tasks:
+            yield file_path, extract_pages(file_path, start, stop)
+        return
+
+    pending: Deque = deque()
+    for file_path, start, stop in tasks:
+        pending.append(
+            (file_path, executor.submit(extract_pages, file_path, start, stop))
+        )
+        if len(pending) >= max_in_flight:
+            file_path, future = pending.popleft()
+            yield file_path, future.result()
+    while pending:
+        file_path, future = pending.popleft()
+        yield file_path, future.result()
+
+
+def split_stream(
+    page_texts: Iterable[str], chunk_size: int, chunk_overlap: int
+) -> Iterator[str]:
+    """
+    Split a stream of page texts into chunks lazily
+    Only a few chunks worth of text are buffered, the last unfinished chunk
+    is carried over to the next pages so chunks still span page breaks
+    """
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len
+    )
+    threshold = chunk_size * SPLIT_BUFFER_CHUNKS
+    buffer: List[str] = []
+    buffered = 0
+
+    for text in page_texts:
+        buffer.append(text + "\n")
+        buffered += len(text) + 1
+        if buffered < threshold:
+            continue
+        chunks = text_splitter.split_text("".join(buffer))
+        yield from chunks[:-1]
+        buffer = chunks[-1:]
+        buffered = sum(len(chunk) for chunk in buffer)
+
+    if buffer:
+        yield from text_splitter.split_text("".join(buffer))
+
+
+def iter_documents(
+    file_paths: List[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    executor: Optional[Executor] = None,
+) -> Iterator[Document]:
+    """
+    Yield chunk documents of all files, file by file, without holding
+    a whole document's text in memory
+    """
+
+    pages = iter_pages(file_paths, executor)
+    for file_path, group in groupby(pages, key=lambda item: item[0]):
+        source = os.path.basename(file_path)
+        page_texts = (text for _, texts in group for text in texts)
+        for text in split_stream(page_texts, chunk_size, chunk_overlap):
+            yield Document(page_content=text, metadata={"source": source})
+
+
+def iter_batches(
+    documents: Iterable[Document], batch_size: int
+) -> Iterator[List[Document]]:
+    """
+    Group documents into lists of at most batch_size
+    """
+
+    batch: List[Document] = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def create_executor(workers: Optional[int]) -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool for page extraction, None runs everything in-process
+    """
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        return None
+    logger.info(f"Extracting PDF pages with {workers} worker processes")
+    return ProcessPoolExecutor(max_workers=workers)
@@ -1,75 +1,461 @@
+# TO BUILD THE VECTOR STORE (run from the project root)
+
+# python -m model.hokej_logic_load build          # re-index changed PDFs only
+# python -m model.hokej_logic_load build --full   # rebuild from scratch
+# python -m model.hokej_logic_load status         # show what a build would change
+# python -m model.hokej_logic_load convert        # move an index.pkl store to docstore.sqlite
+# python -m model.hokej_logic_load build --index ivf   # approximate index (ivf, hnsw, ivfpq)
+# python -m model.hokej_logic_load evaluate       # recall and latency of ANN indexes vs flat
+
 import os
-from typing import List
-from openai import OpenAI
-from PyPDF2 import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import sys
+import asyncio
+import json
+import time
+import hashlib
+import logging
+import argparse
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional
 from langchain.schema import Document
 from langchain_community.vectorstores import FAISS
 from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
 
-# Initialize OpenAI client
-os.getcwd()
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from app.core.embeddings import CachedEmbeddings
+from app.core.vector_store import (
+    VECTOR_STORE_PATH,
+    load_vector_store_for_update,
+    save_vector_store,
+)
+from model.hokej_logic_embed import EmbeddingExecutor
+from model.hokej_logic_index import (
+    INDEX_TYPES,
+    evaluate,
+    store_vectors,
+    to_flat,
+    with_index,
+)
+from model.hokej_logic_ingest import create_executor, iter_batches, iter_documents
 
-# Load OpenAI embedding model to create vector store
-embeddings_model = OpenAIEmbeddings(
-    model="text-embedding-ada-002",  # default model
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
+# Configure logging to track indexing progress
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
 )
+logger = logging.getLogger(__name__)
 
+PDF_FILES = [  # add new documents here
+    "data/pdf/test.pdf",
+    "data/pdf/napoveda.pdf",
+    "data/pdf/hl_mapa_aplikace_v1.pdf",
+    "data/pdf/hl_chatbot_metriky_v2.pdf",
+]
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_CACHE_PATH = "data/embedding_cache.sqlite"
+EMBED_BATCH_SIZE = 256  # Chunks sent to the embedder at once
+
+# Per-file content hashes and chunk IDs of the indexed documents
+MANIFEST_FILE = "manifest.json"
 
-# Load pdf
-def load_pdf_document(file_path: str) -> List[Document]:
-    pdf_reader = PdfReader(file_path)
-    text_content = ""
-    for page in pdf_reader.pages:
-        text_content += page.extract_text() + "\n"
 
-    # Split the text into smaller chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000, chunk_overlap=200, length_function=len
+def create_embeddings_model() -> CachedEmbeddings:
+    """
+    OpenAI embedding model, cached by content hash so unchanged chunks
+    are never embedded twice
+    """
+
+    load_dotenv()
+    return CachedEmbeddings(
+        OpenAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+        ),
+        cache_path=EMBEDDING_CACHE_PATH,
+        namespace=EMBEDDING_MODEL,
     )
-    texts = text_splitter.split_text(text_content)
 
-    return [
-        Document(page_content=t, metadata={"source": os.path.basename(file_path)})
-        for t in texts
-    ]
+
+# Load pdf
+def load_pdf_document(file_path: str) -> List[Document]:
+    return list(iter_documents([file_path], CHUNK_SIZE, CHUNK_OVERLAP))
 
 
 # Load pdfs to create embeddings
 def load_multiple_pdfs(file_paths: List[str]) -> List[Document]:
-    documents = []
-    for file_path in file_paths:
-        document = load_pdf_document(file_path)
-        documents.extend(document)
-    return documents
-
-
-# List all pdf files in the directory
-directory = "../data/pdf"
-for file in os.listdir(directory):
-    if os.path.isfile(os.path.join(directory, file)):
-        print(file)
-
-pdf_files = [  # add new documents here
-    "../data/pdf/test.pdf",
-    "../data/pdf/napoveda.pdf",
-    "../data/pdf/hl_mapa_aplikace_v1.pdf",
-    "../data/pdf/hl_chatbot_metriky_v2.pdf",
-]
+    return list(iter_documents(file_paths, CHUNK_SIZE, CHUNK_OVERLAP))
 
-documents = load_multiple_pdfs(pdf_files)
 
-# Create FAISS vector store
-# vector_store = FAISS.from_documents(documents, embeddings_model)
+def file_hash(file_path: str) -> str:
+    """
+    SHA-256 of the file content
+    """
 
-# Save FAISS vector store
-# vector_store.save_local("../data/vector_store")
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-# TESTING OF THE LOAD
-vector_store = FAISS.load_local(
-    "../data/vector_store", embeddings_model, allow_dangerous_deserialization=True
-)
+
+def with_chunk_ids(
+    documents: Iterable[Document], hashes: Dict[str, str], files: Dict[str, dict]
+) -> Iterator[Document]:
+    """
+    Tag streamed chunks with stable IDs and record them per file in the manifest
+    IDs change whenever the file does
+    """
+
+    for source, group in groupby(documents, key=lambda d: d.metadata["source"]):
+        ids = files[source]["chunks"]
+        for i, document in enumerate(group):
+            chunk_id = f"{source}:{hashes[source][:12]}:{i}"
+            document.metadata["chunk_id"] = chunk_id
+            ids.append(chunk_id)
+            yield document
+
+
+def load_manifest(store_path: str) -> Optional[dict]:
+    path = os.path.join(store_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(store_path: str, manifest: dict) -> None:
+    path = os.path.join(store_path, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def plan_changes(file_paths: List[str], manifest: Optional[dict]) -> dict:
+    """
+    Compare the PDFs on disk with the manifest
+    Returns the new file hashes and the changed and deleted sources
+    """
+
+    indexed = (manifest or {}).get("files", {})
+    hashes = {os.path.basename(path): file_hash(path) for path in file_paths}
+    changed = [
+        source
+        for source, content_hash in hashes.items()
+        if indexed.get(source, {}).get("sha256") != content_hash
+    ]
+    deleted = [source for source in indexed if source not in hashes]
+    return {"hashes": hashes, "changed": changed, "deleted": deleted}
+
+
+def index_settings() -> dict:
+    """
+    Settings that invalidate every chunk when they change
+    """
+
+    return {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embedding_model": EMBEDDING_MODEL,
+    }
+
+
+def manifest_matches_settings(manifest: Optional[dict]) -> bool:
+    return bool(manifest) and manifest.get("settings") == index_settings()
+
+
+async def index_batches(
+    vector_store: Optional[FAISS],
+    batches: Iterable[List[Document]],
+    embedding_executor: EmbeddingExecutor,
+) -> Optional[FAISS]:
+    """
+    Embed the batches concurrently and add them to the vector store in order
+    """
+
+    async for batch, vectors in embedding_executor.embed_batches(batches):
+        texts = [document.page_content for document in batch]
+        metadatas = [document.metadata for document in batch]
+        ids = [document.metadata["chunk_id"] for document in batch]
+        if vector_store is None:
+            vector_store = FAISS.from_embeddings(
+                zip(texts, vectors),
+                embedding_executor.embeddings,
+                metadatas=metadatas,
+                ids=ids,
+            )
+        else:
+            vector_store.add_embeddings(
+                zip(texts, vectors), metadatas=metadatas, ids=ids
+            )
+    return vector_store
+
+
+def build(
+    file_paths: List[str],
+    store_path: str,
+    full: bool = False,
+    workers: Optional[int] = None,
+    batch_size: int = EMBED_BATCH_SIZE,
+    embedding_options: Optional[dict] = None,
+    index: Optional[str] = None,
+) -> dict:
+    """
+    Update the vector store with the changed PDFs only
+    Chunks of changed and deleted files are removed, chunks of changed files
+    are re-embedded and upserted, unchanged files are not touched
+    Pages are extracted in worker processes and chunks reach the embedder in
+    batches, so memory does not grow with the size of the documents
+    A failed build can simply be re-run, embedded batches come from the cache
+    Updates are applied to an exact flat index, an approximate index (see
+    INDEX_TYPES) is then trained from it; the index type is kept in the manifest
+    """
+
+    start_time = time.time()
+    manifest = load_manifest(store_path)
+    index = index or (manifest or {}).get("index", "flat")
+    if not full and not manifest_matches_settings(manifest):
+        logger.info("No compatible manifest found, falling back to a full rebuild")
+        full = True
+    if full:
+        manifest = None
+
+    plan = plan_changes(file_paths, manifest)
+    paths = {os.path.basename(path): path for path in file_paths}
+    embeddings_model = create_embeddings_model()
+
+    files = {} if full else dict(manifest["files"])
+    vector_store = None
+    if not full:
+        vector_store = to_flat(
+            load_vector_store_for_update(store_path, embeddings_model),
+            embeddings_model,
+            embedding_options,
+        )
+        stale_ids = [
+            chunk_id
+            for source in plan["changed"] + plan["deleted"]
+            for chunk_id in files.get(source, {}).get("chunks", [])
+        ]
+        if stale_ids:
+            vector_store.delete(stale_ids)
+            logger.info(f"Removed {len(stale_ids)} stale chunks")
+        for source in plan["deleted"]:
+            files.pop(source, None)
+
+    for source in plan["changed"]:
+        files[source] = {"sha256": plan["hashes"][source], "chunks": []}
+
+    executor = create_executor(workers)
+    try:
+        documents = iter_documents(
+            [paths[source] for source in plan["changed"]],
+            CHUNK_SIZE,
+            CHUNK_OVERLAP,
+            executor,
+        )
+        batches = iter_batches(
+            with_chunk_ids(documents, plan["hashes"], files), batch_size
+        )
+        embedding_executor = EmbeddingExecutor(
+            embeddings_model, **(embedding_options or {})
+        )
+        vector_store = asyncio.run(
+            index_batches(vector_store, batches, embedding_executor)
+        )
+        logger.info(f"Embedding summary: {embedding_executor.stats()}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if vector_store is None:
+        raise ValueError("Nothing to index, the PDF list is empty")
+
+    vector_store = with_index(vector_store, index, embeddings_model)
+    save_vector_store(vector_store, store_path)
+    save_manifest(
+        store_path,
+        {"settings": index_settings(), "index": index, "files": files},
+    )
+
+    summary = {
+        "changed": plan["changed"],
+        "deleted": plan["deleted"],
+        "chunks": vector_store.index.ntotal,
+        "index": index,
+        "seconds": round(time.time() - start_time, 2),
+    }
+    logger.info(f"Vector store updated: {summary}")
+    return summary
+
+
+def convert(store_path: str) -> int:
+    """
+    Rewrite a store saved by FAISS.save_local (index.pkl) into the
+    memory-mappable layout without re-embedding anything
+    """
+
+    vector_store = load_vector_store_for_update(store_path, create_embeddings_model())
+    save_vector_store(vector_store, store_path)
+    return vector_store.index.ntotal
+
+
+def evaluate_indexes(
+    store_path: str,
+    indexes: List[str],
+    k: int,
+    query_count: int,
+    nprobes: Optional[List[int]] = None,
+    ef_searches: Optional[List[int]] = None,
+) -> List[dict]:
+    """
+    Compare approximate index types with the flat baseline on the stored vectors
+    """
+
+    embeddings_model = create_embeddings_model()
+    vector_store = load_vector_store_for_update(store_path, embeddings_model)
+    vectors = store_vectors(vector_store, embeddings_model)
+    logger.info(f"Evaluating {indexes} on {len(vectors)} vectors, k={k}")
+    return evaluate(vectors, indexes, k, query_count, nprobes, ef_searches)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point
+    """
+
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument(
+        "--store", default=VECTOR_STORE_PATH, help="vector store directory"
+    )
+    options.add_argument(
+        "--pdf",
+        nargs="+",
+        default=PDF_FILES,
+        help="PDF files to index (default: the PDF_FILES list)",
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Build the Hokej Logic knowledge base (FAISS vector store)"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser(
+        "build", parents=[options], help="index new and changed PDFs"
+    )
+    build_parser.add_argument(
+        "--full", action="store_true", help="rebuild the whole index from scratch"
+    )
+    build_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="page extraction processes (default: CPU count)",
+    )
+    build_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=EMBED_BATCH_SIZE,
+        help="chunks per embedding batch",
+    )
+    build_parser.add_argument(
+        "--concurrency", type=int, default=4, help="parallel embedding requests"
+    )
+    build_parser.add_argument(
+        "--rpm", type=float, default=3000, help="embedding requests per minute"
+    )
+    build_parser.add_argument(
+        "--tpm", type=float, default=1_000_000, help="embedding tokens per minute"
+    )
+    build_parser.add_argument(
+        "--max-retries", type=int, default=6, help="retries per failed batch"
+    )
+    build_parser.add_argument(
+        "--index",
+        default=None,
+        help=f"index type {INDEX_TYPES} or a FAISS factory string (default: as last built)",
+    )
+    commands.add_parser(
+        "status", parents=[options], help="show what a build would change"
+    )
+    evaluate_parser = commands.add_parser(
+        "evaluate",
+        parents=[options],
+        help="recall and latency of approximate indexes against the flat baseline",
+    )
+    evaluate_parser.add_argument(
+        "--index",
+        nargs="+",
+        default=["ivf", "hnsw", "ivfpq"],
+        help="index types or FAISS factory strings to evaluate",
+    )
+    evaluate_parser.add_argument("-k", type=int, default=3, help="results per query")
+    evaluate_parser.add_argument(
+        "--queries", type=int, default=200, help="number of sampled queries"
+    )
+    evaluate_parser.add_argument(
+        "--nprobe", type=int, nargs="+", default=None, help="IVF nprobe values"
+    )
+    evaluate_parser.add_argument(
+        "--ef-search", type=int, nargs="+", default=None, help="HNSW efSearch values"
+    )
+    commands.add_parser(
+        "convert",
+        parents=[options],
+        help="convert an index.pkl store to the memory-mappable layout",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        logger.info(f"Converted {convert(args.store)} vectors in {args.store}")
+        return 0
+
+    if args.command == "evaluate":
+        report = evaluate_indexes(
+            args.store, args.index, args.k, args.queries, args.nprobe, args.ef_search
+        )
+        print(
+            f"{'index':<32} {'recall@' + str(args.k):>10} {'mean ms':>9} {'p95 ms':>9}"
+        )
+        for row in report:
+            print(
+                f"{row['index']:<32} {row['recall']:>10.4f} {row['mean_ms']:>9.3f} {row['p95_ms']:>9.3f}"
+            )
+        return 0
+
+    missing = [path for path in args.pdf if not os.path.isfile(path)]
+    if missing:
+        logger.error(f"PDF files not found: {missing}")
+        return 1
+
+    if args.command == "status":
+        manifest = load_manifest(args.store)
+        if not manifest_matches_settings(manifest):
+            print("No compatible manifest, the next build is a full rebuild")
+        plan = plan_changes(args.pdf, manifest)
+        print(json.dumps({k: plan[k] for k in ("changed", "deleted")}, indent=2))
+        return 0
+
+    os.makedirs(args.store, exist_ok=True)
+    build(
+        args.pdf,
+        args.store,
+        full=args.full,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        embedding_options={
+            "max_concurrency": args.concurrency,
+            "requests_per_minute": args.rpm,
+            "tokens_per_minute": args.tpm,
+            "max_retries": args.max_retries,
+        },
+        index=args.index,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
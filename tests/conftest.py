@@ -0,0 +1,31 @@
+# TEST FIXTURES
+
+import asyncio
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from benchmarks.stubs import SlowChatModel
+
+
+@pytest.fixture
+def stub_chatbot(tmp_path):
+    """
+    Swap the chatbot's chat and embedding models for local stubs
+    """
+
+    from app.core.embeddings import CachedEmbeddings
+    from app.main import chatbot
+
+    chatbot.wait_ready()
+    original = (chatbot.chat_model, chatbot.embeddings_model)
+    chatbot.chat_model = SlowChatModel()
+    chatbot.embeddings_model = CachedEmbeddings(
+        DeterministicFakeEmbedding(size=chatbot.vector_store.index.d),
+        cache_path=str(tmp_path / "embedding_cache.sqlite"),
+        namespace="stub",
+    )
+    yield chatbot
+    chatbot.chat_model, chatbot.embeddings_model = original
+    chatbot.semantic_cache.invalidate()
+    asyncio.run(chatbot.response_cache.invalidate())
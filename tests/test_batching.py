@@ -0,0 +1,121 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_batching.py -v --disable-warnings
+
+import time
+import asyncio
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.core import batching
+from app.core.batching import QueryBatcher
+from app.core.metrics import StageMetrics
+
+TEXTS = [f"Kapitola {i}: statistiky hráčů a formací" for i in range(20)]
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: list = []
+
+    async def aembed_documents(self, texts):
+        self.calls.append(list(texts))
+        return self.embed_documents(texts)
+
+
+@pytest.fixture
+def stores():
+    embeddings = CountingEmbeddings(size=32, calls=[])
+    return embeddings, FAISS.from_texts(TEXTS, embeddings)
+
+
+def test_concurrent_queries_share_one_batch(stores):
+    embeddings, vector_store = stores
+    metrics = StageMetrics()
+    batcher = QueryBatcher(
+        lambda: embeddings, lambda: vector_store, max_wait=0.05, metrics=metrics
+    )
+    queries = [TEXTS[i] for i in range(6)] + [TEXTS[0]]
+
+    async def search_all():
+        return await asyncio.gather(
+            *(batcher.search(query, k=2 + i % 2) for i, query in enumerate(queries))
+        )
+
+    results = asyncio.run(search_all())
+
+    assert embeddings.calls == [TEXTS[:6]]  # One call, repeated query embedded once
+    assert batcher.stats()["batches"] == 1
+    assert batcher.stats()["largest_batch"] == 7
+    assert metrics.summary()["embedding"]["count"] == 1
+    for i, (query, (vector, documents)) in enumerate(zip(queries, results)):
+        expected = vector_store.similarity_search_by_vector(vector, k=2 + i % 2)
+        assert vector == embeddings.embed_query(query)
+        assert [d.page_content for d in documents] == [d.page_content for d in expected]
+        assert documents[0].page_content == query
+
+
+def test_full_batch_flushes_without_waiting(stores):
+    embeddings, vector_store = stores
+    batcher = QueryBatcher(
+        lambda: embeddings, lambda: vector_store, max_batch_size=4, max_wait=10
+    )
+
+    async def search_all():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.search(text, k=1) for text in TEXTS[:8])), 5
+        )
+
+    results = asyncio.run(search_all())
+
+    assert [len(texts) for texts in embeddings.calls] == [4, 4]
+    assert [documents[0].page_content for _, documents in results] == TEXTS[:8]
+
+
+def test_failed_batch_raises_in_every_request(stores):
+    _, vector_store = stores
+
+    class FailingEmbeddings(DeterministicFakeEmbedding):
+        async def aembed_documents(self, texts):
+            raise RuntimeError("provider down")
+
+    batcher = QueryBatcher(lambda: FailingEmbeddings(size=32), lambda: vector_store)
+
+    async def search_all():
+        return await asyncio.gather(
+            *(batcher.search(text, k=1) for text in TEXTS[:3]), return_exceptions=True
+        )
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(search_all()))
+
+
+def test_search_runs_off_the_event_loop(stores, monkeypatch):
+    embeddings, vector_store = stores
+    original = batching.search_by_vectors
+
+    def slow_search(*args):
+        time.sleep(0.2)  # A large FAISS search with many docstore reads
+        return original(*args)
+
+    monkeypatch.setattr(batching, "search_by_vectors", slow_search)
+    batcher = QueryBatcher(lambda: embeddings, lambda: vector_store)
+
+    async def search_while_ticking():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        _, documents = await batcher.search(TEXTS[3], k=1)
+        ticker.cancel()
+        return ticks, documents
+
+    ticks, documents = asyncio.run(search_while_ticking())
+    assert documents[0].page_content == TEXTS[3]
+    assert ticks >= 5  # The loop kept serving while the search ran
@@ -0,0 +1,35 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_categorizer.py -v --disable-warnings
+
+from app.core.categorizer import Categorizer, remove_diacritics
+
+categorizer = Categorizer()
+
+
+def test_remove_diacritics():
+    """
+    Test that Czech text is lowercased and folded to ASCII
+    """
+
+    assert remove_diacritics("Žluťoučký KŮŇ úpěl ďábelské ódy") == (
+        "zlutoucky kun upel dabelske ody"
+    )
+
+
+def test_categories_in_priority_order():
+    """
+    Test keyword matching on normalized text, earlier categories winning
+    """
+
+    assert categorizer.categorize("Kde najdu statistiky HRÁČŮ?") == "hraci"
+    assert categorizer.categorize("Mapa střel brankářů") == "brankari"
+    assert categorizer.categorize("Střelci týmu v zápase") == "hraci"
+    assert categorizer.categorize("Report zápasu týmu") == "zapasy"
+    assert categorizer.categorize("Co znamená P.En?") == "ostatni"
+    assert categorizer.categorize_many(["Formace", "Týmy", "Formace"]) == [
+        "formace",
+        "tymy",
+        "formace",
+    ]
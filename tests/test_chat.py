@@ -6,9 +6,10 @@
 
 import logging
 import sqlite3
+from datetime import datetime
 from starlette import status
 from fastapi.testclient import TestClient
-from app.main import app
+from app.main import app, chatbot
 
 # Configure logging for tests
 logging.basicConfig(level=logging.INFO)
@@ -57,6 +58,7 @@ def test_chat_endpoint_success():
     # Cleanup: Delete test data from database after test
     try:
         # Clean up from sqlite database
+        chatbot.writer.flush()
         conn = sqlite3.connect("app/database/chatbot.db")
         cursor = conn.cursor()
 
@@ -75,3 +77,106 @@ def test_chat_endpoint_success():
         )
     except Exception as e:
         logger.warning(f"Failed to clean up test data: {e}")
+
+
+def test_keyword_query_skips_embedding(stub_chatbot):
+    """
+    Test that a keyword query covered by BM25 is answered without an embedding call
+    """
+
+    embedding_misses = stub_chatbot.embeddings_model.misses
+
+    response = client.post(
+        "/chat", json={"message": "nájezdy", "session_id": "test_keyword"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["response"]) > 0
+    assert stub_chatbot.embeddings_model.misses == embedding_misses
+
+    response = client.post(
+        "/chat",
+        json={"message": "Kde najdu statistiky hráčů?", "session_id": "test_hybrid"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert stub_chatbot.embeddings_model.misses == embedding_misses + 1
+
+    stub_chatbot.writer.flush()
+    conn = sqlite3.connect("app/database/chatbot.db")
+    conn.execute(
+        "DELETE FROM chat_interactions WHERE session_id IN (?, ?)",
+        ("test_keyword", "test_hybrid"),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_token_usage_recorded(stub_chatbot):
+    """
+    Test that reported token usage is stored, with a local count as fallback
+    """
+
+    stub_chatbot.chat_model.usage = {
+        "input_tokens": 1200,
+        "output_tokens": 8,
+        "total_tokens": 1208,
+    }
+    client.post(
+        "/chat", json={"message": "Kde najdu formace?", "session_id": "test_usage_1"}
+    )
+    stub_chatbot.chat_model.usage = None
+    client.post(
+        "/chat", json={"message": "Kde najdu brankáře?", "session_id": "test_usage_2"}
+    )
+
+    stub_chatbot.writer.flush()
+    conn = sqlite3.connect("app/database/chatbot.db")
+    rows = dict(
+        (session_id, (prompt, completion, total))
+        for session_id, prompt, completion, total in conn.execute(
+            "SELECT session_id, prompt_tokens, completion_tokens, tokens_used "
+            "FROM chat_interactions WHERE session_id LIKE 'test_usage_%'"
+        )
+    )
+    assert rows["test_usage_1"] == (1200, 8, 1208)
+    prompt, completion, total = rows["test_usage_2"]
+    assert prompt > 100  # System prompt and context are counted
+    assert 0 < completion and total == prompt + completion
+
+    conn.execute("DELETE FROM chat_interactions WHERE session_id LIKE 'test_usage_%'")
+    conn.commit()
+    conn.close()
+
+
+def test_bad_row_does_not_drop_its_batch():
+    """
+    Test that a row the database rejects is the only one lost from its batch,
+    and that session ids longer than the column are refused up front
+    """
+
+    response = client.post("/chat", json={"message": "Ahoj", "session_id": "x" * 37})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    writer = chatbot.writer
+    written, dropped = writer.written, writer.dropped
+    rows = [
+        {
+            "message_uuid": f"test-writer-{i}",
+            "session_id": session_id,
+            "timestamp": datetime.utcnow(),
+            "user_message": "Ahoj",
+            "bot_response": "Dobrý den",
+            "category": "ostatni",
+            "error_occurred": 0,
+        }
+        for i, session_id in enumerate(["test_writer", None, "test_writer"])
+    ]
+    writer._write(rows)  # session_id is NOT NULL
+    assert (writer.written - written, writer.dropped - dropped) == (2, 1)
+
+    conn = sqlite3.connect("app/database/chatbot.db")
+    assert conn.execute(
+        "SELECT COUNT(*) FROM chat_interactions WHERE session_id = 'test_writer'"
+    ).fetchone() == (2,)
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_writer'")
+    conn.commit()
+    conn.close()
@@ -0,0 +1,91 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_chat_stream.py -v --disable-warnings
+
+import json
+import asyncio
+import sqlite3
+from starlette import status
+from fastapi.testclient import TestClient
+from app.main import app
+from benchmarks.stubs import SlowChatModel
+
+client = TestClient(app)
+
+
+def _parse_events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_chat_stream_endpoint(stub_chatbot):
+    """
+    Test that /chat/stream emits tokens followed by the cleaned final answer
+    """
+
+    stub_chatbot.chat_model.answer = "Dobrý den, statistiky najdete v sekci Hráči."
+
+    response = client.post(
+        "/chat/stream",
+        json={"message": "Kde najdu statistiky?", "session_id": "test_stream_1"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_events(response.text)
+    tokens = [data["token"] for event, data in events if event == "token"]
+    event, done = events[-1]
+
+    assert event == "done"
+    assert len(tokens) > 1
+    assert "".join(tokens) == done["response"]
+    assert done["response"] == "Statistiky najdete v sekci Hráči."
+    assert done["message_id"] is not None
+    assert len(done["conversation_history"]) == 2
+
+    stub_chatbot.writer.flush()
+    conn = sqlite3.connect("app/database/chatbot.db")
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_stream_1'")
+    conn.commit()
+    conn.close()
+
+
+def test_greeting_ending_at_token_boundary(stub_chatbot):
+    """
+    Test that a greeting streamed as a whole token leaves no stray comma
+    """
+
+    assert stub_chatbot._clean_stream_prefix("Dobrý den, ") == ""
+    assert stub_chatbot._clean_stream_prefix("Dobrý den, statistiky ") == "Statistiky "
+
+    stub_chatbot.chat_model.tokens = ["Dobrý den, ", "statistiky", " najdete v sekci."]
+    response = client.post(
+        "/chat/stream",
+        json={"message": "Kde najdu statistiky?", "session_id": "test_stream_2"},
+    )
+    events = _parse_events(response.text)
+    tokens = [data["token"] for event, data in events if event == "token"]
+
+    assert "".join(tokens) == "Statistiky najdete v sekci."
+    assert events[-1][1]["response"] == "Statistiky najdete v sekci."
+
+    stub_chatbot.writer.flush()
+    conn = sqlite3.connect("app/database/chatbot.db")
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_stream_2'")
+    conn.commit()
+    conn.close()
+
+
+def test_stub_model_answers_sync_and_async():
+    """
+    Test that the shared stub model serves the sync and async call paths
+    """
+
+    model = SlowChatModel(delay=0.01, cpu_time=0.001)
+    assert model.invoke("Ahoj").content == model.answer
+    assert asyncio.run(model.ainvoke("Ahoj")).content == model.answer
+    assert "".join(chunk.content for chunk in model.stream("Ahoj")) == model.answer
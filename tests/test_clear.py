@@ -4,6 +4,7 @@
 # pytest --disable-warnings --log-cli-level=INFO
 # pytest tests/test_clear.py -v --disable-warnings
 
+import asyncio
 import logging
 from starlette import status
 from fastapi.testclient import TestClient
@@ -30,3 +31,21 @@ def test_clear_endpoint_success():
     assert data["status"] is True
     assert "cleared" in data["message"].lower()
     logger.info(f"Clear response: {data['message']}")
+
+
+def test_clear_endpoint_only_clears_given_session():
+    """
+    Test that clearing one session keeps the history of other sessions
+    """
+
+    from app.main import chatbot
+
+    asyncio.run(chatbot.sessions.append("test_clear_a", "user", "Ahoj"))
+    asyncio.run(chatbot.sessions.append("test_clear_b", "user", "Ahoj"))
+
+    response = client.post("/clear", json={"session_id": "test_clear_a"})
+    assert response.status_code == status.HTTP_200_OK
+    assert asyncio.run(chatbot.get_conversation_history("test_clear_a")) == []
+    assert len(asyncio.run(chatbot.get_conversation_history("test_clear_b"))) == 1
+
+    asyncio.run(chatbot.clear_conversation("test_clear_b"))
@@ -0,0 +1,70 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_context.py -v --disable-warnings
+
+from langchain_core.documents import Document
+from app.core.context import ContextBuilder
+from app.core.tokens import TokenCounter
+
+counter = TokenCounter("gpt-4o-mini")
+
+
+def builder(**kwargs):
+    settings = dict(
+        max_context_tokens=1000,
+        max_history_tokens=1000,
+        recent_messages=2,
+        summary_chars=40,
+    )
+    return ContextBuilder(counter, **{**settings, **kwargs})
+
+
+def test_overlapping_chunks_deduplicated():
+    """
+    Test that text shared by neighbouring chunks appears once in the context
+    """
+
+    text = " ".join(f"slovo{i}" for i in range(300))
+    first, second = text[:1000], text[800:1800]  # 200 characters of overlap
+
+    context = builder().build_context(
+        [Document(page_content=second), Document(page_content=first)]
+    )
+    assert context.count(text[800:1000]) == 1
+    assert builder().build_context([Document(page_content=first)] * 2) == first
+
+
+def test_context_within_budget():
+    """
+    Test that the lowest ranked chunks are truncated or dropped to fit the budget
+    """
+
+    chunks = [Document(page_content=f"kapitola{i} " + "hokej " * 150) for i in range(5)]
+    context_builder = builder(max_context_tokens=400)
+
+    context = context_builder.build_context(chunks)
+    assert counter.count_text(context) <= 400 + 10  # Separators
+    assert "kapitola0" in context and "kapitola4" not in context
+    assert context_builder.stats()["chunks_dropped"] >= 1
+
+
+def test_history_shortened():
+    """
+    Test that older turns are shortened and the latest kept verbatim
+    """
+
+    long_answer = "První věta odpovědi. " + "Další podrobnosti. " * 50
+    messages = [
+        {"role": "user", "content": "Kde najdu hráče?"},
+        {"role": "assistant", "content": long_answer},
+        {"role": "user", "content": "A brankáře?"},
+        {"role": "assistant", "content": long_answer},
+    ]
+
+    history = builder().build_history(messages).split("\n")
+    assert history[1] == "Asistent: První věta odpovědi."
+    assert history[3] == f"Asistent: {long_answer}"
+
+    history = builder(max_history_tokens=60).build_history(messages)
+    assert counter.count_text(history) <= 60
@@ -0,0 +1,63 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_embeddings.py -v --disable-warnings
+
+import asyncio
+import sqlite3
+
+import numpy as np
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.core import connections
+from app.core.embeddings import CachedEmbeddings
+
+
+def test_query_table_keeps_latest_rows(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = CachedEmbeddings(
+        DeterministicFakeEmbedding(size=8),
+        cache_path=path,
+        namespace="stub",
+        memory_size=2,
+        table="queries",
+        max_rows=10,
+    )
+    for i in range(25):
+        asyncio.run(cache.aembed_documents([f"Otázka {i}"]))
+
+    conn = sqlite3.connect(path)
+    (rows,) = conn.execute("SELECT COUNT(*) FROM queries").fetchone()
+    conn.close()
+    assert rows <= 10
+
+    # The latest query is read back from disk once it left the memory tier
+    reopened = CachedEmbeddings(
+        DeterministicFakeEmbedding(size=8),
+        cache_path=path,
+        namespace="stub",
+        table="queries",
+        max_rows=10,
+    )
+    vector = asyncio.run(reopened.aembed_query("Otázka 24"))
+    expected = DeterministicFakeEmbedding(size=8).embed_query("Otázka 24")
+    assert np.allclose(vector, expected, atol=1e-6)  # Stored as float32
+    assert reopened.stats()["disk_hits"] == 1 and reopened.stats()["misses"] == 0
+    assert asyncio.run(reopened.aembed_query("Otázka 0")) and reopened.misses == 1
+
+
+def test_connection_reopened_after_fork(tmp_path, monkeypatch):
+    cache = CachedEmbeddings(
+        DeterministicFakeEmbedding(size=8),
+        cache_path=str(tmp_path / "cache.sqlite"),
+        namespace="stub",
+        memory_size=0,
+    )
+    cache.embed_documents(["Otázka"])
+    inherited = cache._sqlite.connection
+
+    # A forked worker sees another pid and opens its own connection
+    monkeypatch.setattr(connections.os, "getpid", lambda: -1)
+    assert cache._sqlite.connection is not inherited
+    assert cache.embed_documents(["Otázka"]) and cache.disk_hits == 1
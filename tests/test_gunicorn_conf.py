@@ -0,0 +1,46 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_gunicorn_conf.py -v --disable-warnings
+
+import os
+import runpy
+from types import SimpleNamespace
+
+import pytest
+
+CONF_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py"
+)
+
+
+def load_conf(monkeypatch, **env) -> dict:
+    for name in ("WEB_CONCURRENCY", "REDIS_URL", "ALLOW_LOCAL_SESSIONS"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(CONF_PATH)
+
+
+def start(conf: dict) -> None:
+    server = SimpleNamespace(cfg=SimpleNamespace(workers=conf["workers"]))
+    conf["on_starting"](server)
+
+
+def test_single_worker_without_redis(monkeypatch):
+    conf = load_conf(monkeypatch)
+    assert conf["workers"] == 1
+    start(conf)
+
+    conf = load_conf(monkeypatch, REDIS_URL="redis://localhost:6379/0")
+    assert conf["workers"] == 2
+    start(conf)
+
+
+def test_several_workers_need_redis(monkeypatch):
+    conf = load_conf(monkeypatch, WEB_CONCURRENCY="4")
+    with pytest.raises(RuntimeError, match="REDIS_URL"):
+        start(conf)
+
+    start(load_conf(monkeypatch, WEB_CONCURRENCY="4", REDIS_URL="redis://r:6379"))
+    start(load_conf(monkeypatch, WEB_CONCURRENCY="4", ALLOW_LOCAL_SESSIONS="1"))
@@ -3,9 +3,11 @@
 # pytest --disable-warnings
 # pytest tests/test_health.py -v --disable-warnings
 
+import asyncio
+import sqlite3
 from starlette import status
 from fastapi.testclient import TestClient
-from app.main import app
+from app.main import app, chatbot
 
 client = TestClient(app)
 
@@ -15,7 +17,58 @@ def test_health_check():
     Test the /health endpoint for correct status and version
     """
 
+    chatbot.wait_ready()
     response = client.get("/health")
     assert response.status_code == status.HTTP_200_OK
     assert response.json()["version"] == "1.0.0"
     assert response.json()["status"] == "healthy"
+    assert "memory_shared_mb" in response.json()["metrics"]
+
+
+def test_liveness_and_readiness():
+    """
+    Test the probes: alive at once, ready with startup timings after warm-up
+    """
+
+    response = client.get("/health/live")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "alive"
+
+    chatbot.wait_ready()
+    response = client.get("/health/ready")
+    assert response.status_code == status.HTTP_200_OK
+    startup = response.json()["startup"]
+    assert startup["state"] == "ready"
+    assert {"migrations", "tokenizer", "vector_store", "warm_up"} <= set(
+        startup["phases"]
+    )
+    assert chatbot.token_counter._loaded  # Never loaded by the first request
+
+
+def test_health_reports_semantic_cache_hits(stub_chatbot):
+    """
+    Test that a repeated first-turn question is answered from the semantic cache
+    """
+
+    before = client.get("/health").json()["semantic_cache"]["hits"]
+
+    for session_id in ("test_cache_1", "test_cache_2"):
+        # Exact repeats are answered by the response cache before the semantic one
+        asyncio.run(stub_chatbot.response_cache.invalidate())
+        response = client.post(
+            "/chat",
+            json={"message": "Kde najdu statistiky hráčů?", "session_id": session_id},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    after = client.get("/health").json()["semantic_cache"]
+    assert after["hits"] == before + 1
+    assert after["size"] >= 1
+
+    stub_chatbot.writer.flush()
+    conn = sqlite3.connect("app/database/chatbot.db")
+    conn.execute(
+        "DELETE FROM chat_interactions WHERE session_id IN ('test_cache_1', 'test_cache_2')"
+    )
+    conn.commit()
+    conn.close()
@@ -0,0 +1,62 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_import_time.py -v --disable-warnings
+
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded with the models in the background warm-up, never by importing the app
+HEAVY_MODULES = [
+    "langchain",
+    "langchain_core",
+    "langchain_community",
+    "langchain_openai",
+    "openai",
+    "faiss",
+    "numpy",
+    "tiktoken",
+    "psutil",
+]
+# Cumulative import time of app.main relative to that of fastapi in the same
+# run, so the budget holds on slow machines; about 2x with lazy imports, the
+# chat model dependencies alone would add another 2.5x
+IMPORT_BUDGET_RATIO = 3.0
+
+
+def test_app_import_is_light():
+    """
+    Test with python -X importtime that app.main defers the heavy dependencies
+    """
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import sys, app.main; "
+            f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+    cumulative_us = {
+        line.split("|")[2].strip(): int(line.split("|")[1])
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and line.split("|")[1].strip().isdigit()
+    }
+    ratio = cumulative_us["app.main"] / cumulative_us["fastapi"]
+    print(
+        f"app.main imported in {cumulative_us['app.main'] / 1e6:.2f}s, "
+        f"{ratio:.1f}x fastapi"
+    )
+    assert ratio < IMPORT_BUDGET_RATIO
@@ -0,0 +1,96 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_load.py -v --disable-warnings --log-cli-level=INFO
+
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import List
+
+import httpx
+from starlette import status
+from app.main import app, chatbot
+
+# Configure logging for tests
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONCURRENCY = 20
+
+
+async def _send_chats(count: int) -> List:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        requests = [
+            client.post(
+                "/chat",
+                json={
+                    "message": f"Kde najdu statistiky hráčů? ({i})",
+                    "session_id": f"load_{i}",
+                },
+            )
+            for i in range(count)
+        ]
+        return await asyncio.gather(*requests)
+
+
+async def _health_during_chat() -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        chat = asyncio.create_task(
+            client.post("/chat", json={"message": "Ahoj", "session_id": "load_health"})
+        )
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        health = await client.get("/health")
+        elapsed = time.perf_counter() - start
+        await chat
+        assert health.status_code == status.HTTP_200_OK
+        return elapsed
+
+
+def _cleanup():
+    try:
+        chatbot.writer.flush()
+        conn = sqlite3.connect("app/database/chatbot.db")
+        conn.execute("DELETE FROM chat_interactions WHERE session_id LIKE 'load_%'")
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        logger.warning(f"Failed to clean up test data: {e}")
+
+
+def test_chat_concurrency_scaling(stub_chatbot):
+    """
+    Concurrent chats against a stubbed model should overlap instead of queueing
+    """
+
+    delay = stub_chatbot.chat_model.delay
+
+    start = time.perf_counter()
+    asyncio.run(_send_chats(1))
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    responses = asyncio.run(_send_chats(CONCURRENCY))
+    concurrent = time.perf_counter() - start
+    _cleanup()
+
+    assert all(r.status_code == status.HTTP_200_OK for r in responses)
+    logger.info(
+        f"1 request: {single:.2f}s, {CONCURRENCY} concurrent requests: {concurrent:.2f}s"
+    )
+    # Serial execution would take CONCURRENCY * delay
+    assert concurrent < CONCURRENCY * delay / 4
+
+
+def test_health_not_blocked_by_chat(stub_chatbot):
+    """
+    /health must answer while an LLM call is in flight
+    """
+
+    elapsed = asyncio.run(_health_during_chat())
+    _cleanup()
+    assert elapsed < stub_chatbot.chat_model.delay
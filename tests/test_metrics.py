@@ -0,0 +1,58 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_metrics.py -v --disable-warnings
+
+import sqlite3
+from starlette import status
+from fastapi.testclient import TestClient
+from app.core.metrics import LogLinearHistogram
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_histogram_percentiles():
+    """
+    Test that the log-linear histogram estimates percentiles within a bucket
+    """
+
+    histogram = LogLinearHistogram()
+    for ms in range(1, 1001):
+        histogram.observe(ms / 1000)
+
+    assert histogram.count == 1000
+    assert abs(histogram.percentile(0.5) - 0.5) < 0.025
+    assert abs(histogram.percentile(0.99) - 0.99) < 0.05
+    assert histogram.percentile(1.0) == 1.0
+
+
+def test_metrics_endpoint(stub_chatbot):
+    """
+    Test that a chat request is timed per stage and exported for Prometheus
+    """
+
+    response = client.post(
+        "/chat",
+        json={"message": "Kde najdu statistiky hráčů?", "session_id": "test_metrics"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    stub_chatbot.writer.flush()
+
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    for stage in ("llm_total", "db_write", "total"):
+        assert (
+            f'chatbot_stage_duration_seconds_count{{stage="{stage}"}}' in response.text
+        )
+    assert 'stage="total",quantile="0.99"' in response.text
+
+    latency = client.get("/health").json()["latency"]
+    assert latency["total"]["count"] >= 1
+    assert latency["total"]["p50"] <= latency["total"]["p99"]
+
+    conn = sqlite3.connect("app/database/chatbot.db")
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_metrics'")
+    conn.commit()
+    conn.close()
@@ -0,0 +1,144 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_rate.py -v --disable-warnings
+
+import logging
+import sqlite3
+from starlette import status
+from fastapi.testclient import TestClient
+from app.main import app
+
+# Configure logging for tests
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+client = TestClient(app)
+
+
+def test_rate_message_right_after_chat(stub_chatbot):
+    """
+    Test that a message can be rated by its UUID while its row is still queued
+    """
+
+    chat = client.post(
+        "/chat", json={"message": "Co je gamelog?", "session_id": "test_rate_1"}
+    )
+    assert chat.status_code == status.HTTP_200_OK
+    message_id = chat.json()["message_id"]
+    assert isinstance(message_id, str)
+
+    response = client.post("/rate", json={"message_id": message_id, "rating": 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["message_id"] == message_id
+    assert response.json()["rating"] == 1
+
+    conn = sqlite3.connect("app/database/chatbot.db")
+    rating, database_id = conn.execute(
+        "SELECT rating, id FROM chat_interactions WHERE message_uuid = ?",
+        (message_id,),
+    ).fetchone()
+    assert rating == 1
+
+    # Database IDs (as listed by /stats) are accepted too
+    response = client.post("/rate", json={"message_id": database_id, "rating": -1})
+    assert response.status_code == status.HTTP_200_OK
+
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_rate_1'")
+    conn.commit()
+    conn.close()
+
+
+def test_rate_unknown_message():
+    """
+    Test that rating a message that does not exist returns 404
+    """
+
+    response = client.post(
+        "/rate",
+        json={"message_id": "00000000-0000-0000-0000-000000000000", "rating": 1},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_rate_releases_connection_while_flushing(stub_chatbot, monkeypatch):
+    """
+    Test that no database connection is held while waiting for the writer
+    """
+
+    from app.database.db import db
+
+    checked_out = []
+    flush = stub_chatbot.writer.flush
+
+    def recording_flush(timeout=None):
+        checked_out.append(db.engine.pool.checkedout())
+        return flush(timeout)
+
+    monkeypatch.setattr(stub_chatbot.writer, "flush", recording_flush)
+    chat = client.post(
+        "/chat", json={"message": "Co je gamelog?", "session_id": "test_rate_2"}
+    )
+    response = client.post(
+        "/rate", json={"message_id": chat.json()["message_id"], "rating": 1}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert checked_out == [0]
+
+    conn = sqlite3.connect("app/database/chatbot.db")
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_rate_2'")
+    conn.commit()
+    conn.close()
+
+
+def _thumbs(conn) -> tuple:
+    return conn.execute(
+        "SELECT SUM(thumbs_up), SUM(thumbs_down) FROM interaction_rollups WHERE granularity = 'day'"
+    ).fetchone()
+
+
+def test_rate_applies_deltas_from_the_current_rating(stub_chatbot, monkeypatch):
+    """
+    Test that a rating changed between the read and the update is re-read,
+    so the rollup counters follow the rating actually replaced
+    """
+
+    from app.routers import endpoints
+
+    chat = client.post(
+        "/chat", json={"message": "Co je gamelog?", "session_id": "test_rate_3"}
+    )
+    message_id = chat.json()["message_id"]
+    stub_chatbot.writer.flush()
+
+    # /rate runs its query in a worker thread
+    conn = sqlite3.connect("app/database/chatbot.db", check_same_thread=False)
+    calls = []
+    original_update = endpoints.update
+
+    def racing_update(table):
+        if not calls:
+            # Another request rates the message thumbs down in the meantime
+            conn.execute(
+                "UPDATE chat_interactions SET rating = -1 WHERE message_uuid = ?",
+                (message_id,),
+            )
+            conn.commit()
+        calls.append(table)
+        return original_update(table)
+
+    monkeypatch.setattr(endpoints, "update", racing_update)
+    up_before, down_before = _thumbs(conn)
+    response = client.post("/rate", json={"message_id": message_id, "rating": 1})
+    assert response.status_code == status.HTTP_200_OK
+    up_after, down_after = _thumbs(conn)
+
+    assert len(calls) == 2  # The first update matched nothing and was retried
+    assert (up_after - up_before, down_after - down_before) == (1, -1)
+    assert conn.execute(
+        "SELECT rating FROM chat_interactions WHERE message_uuid = ?", (message_id,)
+    ).fetchone() == (1,)
+
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_rate_3'")
+    conn.commit()
+    conn.close()
@@ -0,0 +1,126 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_recategorize.py -v --disable-warnings
+
+import os
+import sqlite3
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.categorizer import Categorizer
+from app.jobs.backfill_rollups import backfill
+from app.jobs.recategorize import recategorize
+
+client = TestClient(app)
+
+
+def test_recategorize_resumable(tmp_path):
+    """
+    Test that stale categories are rewritten, rollups follow and runs resume
+    """
+
+    api_key = os.getenv("ADMIN_API_KEY")
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    def category_counts():
+        response = client.get(
+            "/stats/summary",
+            params={"start": "2024-02-01T00:00:00", "end": "2024-02-02T00:00:00"},
+            headers={"X-API-Key": api_key},
+        )
+        return response.json()["category_distribution"]
+
+    conn = sqlite3.connect("app/database/chatbot.db")
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_recategorize'")
+    conn.executemany(
+        "INSERT INTO chat_interactions (session_id, timestamp, user_message, bot_response, "
+        "category, error_occurred) VALUES ('test_recategorize', '2024-02-01 10:00:00.000000', "
+        "?, 'odpověď', ?, ?)",
+        [
+            ("Kde najdu formace?", "ostatni", 0),
+            ("Statistiky hráčů", "tymy", 0),
+            ("Report zápasu", "zapasy", 0),
+            ("Statistiky hráčů", "error", 1),
+        ],
+    )
+    conn.commit()
+    backfill()
+    assert category_counts() == {"ostatni": 1, "tymy": 1, "zapasy": 1, "error": 1}
+
+    assert (
+        recategorize(batch_size=2, checkpoint_path=checkpoint, dry_run=True)["changed"]
+        == 2
+    )
+    summary = recategorize(batch_size=2, checkpoint_path=checkpoint)
+    assert summary["transitions"]["ostatni -> formace"] == 1
+    assert summary["transitions"]["tymy -> hraci"] == 1
+    assert category_counts() == {"formace": 1, "hraci": 1, "zapasy": 1, "error": 1}
+
+    # Finished run: the checkpoint leaves nothing to rescan, other keywords restart
+    assert recategorize(checkpoint_path=checkpoint)["scanned"] == 0
+    other = Categorizer([("formace", ["formace"])], default="ostatni")
+    assert recategorize(checkpoint_path=checkpoint, categorizer=other)["changed"] >= 2
+
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_recategorize'")
+    conn.commit()
+    conn.close()
+    backfill()
+
+
+def test_recategorize_retries_rows_changed_concurrently(tmp_path):
+    """
+    Test that a row rated between the read and the update is read again and
+    recategorized in the same run
+    """
+
+    conn = sqlite3.connect("app/database/chatbot.db")
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_recategorize'")
+    conn.executemany(
+        "INSERT INTO chat_interactions (session_id, timestamp, user_message, bot_response, "
+        "category, error_occurred) VALUES ('test_recategorize', '2024-02-01 10:00:00.000000', "
+        "?, 'odpověď', 'ostatni', 0)",
+        [("Kde najdu formace?",), ("Statistiky hráčů",)],
+    )
+    conn.commit()
+    backfill()
+
+    class RacingCategorizer(Categorizer):
+        def categorize_many(self, messages):
+            categories = super().categorize_many(messages)
+            # A user rates the formace message while the batch is categorized
+            conn.execute(
+                "UPDATE chat_interactions SET rating = 1 WHERE session_id = "
+                "'test_recategorize' AND user_message = 'Kde najdu formace?'"
+            )
+            conn.commit()
+            return categories
+
+    summary = recategorize(
+        checkpoint_path=str(tmp_path / "checkpoint.json"),
+        categorizer=RacingCategorizer(),
+    )
+    assert summary["transitions"] == {"ostatni -> formace": 1, "ostatni -> hraci": 1}
+    categories = dict(
+        conn.execute(
+            "SELECT user_message, category FROM chat_interactions "
+            "WHERE session_id = 'test_recategorize'"
+        ).fetchall()
+    )
+    assert categories == {"Kde najdu formace?": "formace", "Statistiky hráčů": "hraci"}
+    rollups = dict(
+        conn.execute(
+            "SELECT category, interactions FROM interaction_rollups "
+            "WHERE granularity = 'day' AND bucket LIKE '2024-02-01%'"
+        ).fetchall()
+    )
+    assert rollups == {"ostatni": 0, "formace": 1, "hraci": 1}
+    # The deltas follow the rating read again, not the one of the first read
+    assert conn.execute(
+        "SELECT thumbs_up FROM interaction_rollups WHERE granularity = 'day' "
+        "AND bucket LIKE '2024-02-01%' AND category = 'formace'"
+    ).fetchone() == (1,)
+
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_recategorize'")
+    conn.commit()
+    conn.close()
+    backfill()
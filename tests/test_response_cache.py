@@ -0,0 +1,192 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_response_cache.py -v --disable-warnings
+
+import os
+import asyncio
+import sqlite3
+
+import pytest
+from starlette import status
+from fastapi.testclient import TestClient
+
+from app.core.cache import RedisResponseCache, ResponseCache, normalize_question
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_normalized_exact_match():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+
+    async def scenario():
+        await cache.store("Co znamená zkratka TOI v hokeji?", "v1", "Čas na ledě.")
+
+        assert (
+            await cache.get("co znamena  zkratka TOI v hokeji", "v1") == "Čas na ledě."
+        )
+        assert await cache.get("Co znamená zkratka TOI v hokeji?", "v2") is None
+        assert await cache.get("Co znamená zkratka CF v hokeji?", "v1") is None
+        stats = await cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 2
+
+    asyncio.run(scenario())
+    assert normalize_question(" Kde  najdu Střelce?! ") == "kde najdu strelce"
+
+
+def test_eviction_expiry_and_invalidation():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    expired = ResponseCache(max_entries=2, ttl_seconds=0)
+
+    async def scenario():
+        for question in ("a", "b", "c"):
+            await cache.store(question, "v1", question.upper())
+        # Least recently used
+        assert await cache.missing(["a", "b", "c"], "v1") == ["a"]
+
+        assert await cache.invalidate() == 2
+        assert await cache.get("b", "v1") is None
+
+        await expired.store("a", "v1", "A")
+        assert await expired.missing(["a"], "v1") == ["a"]
+        assert await expired.get("a", "v1") is None
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def redis_cache():
+    fakeredis = pytest.importorskip("fakeredis")
+    cache = RedisResponseCache("redis://localhost:6379/0", 10, ttl_seconds=60)
+    cache.client = fakeredis.FakeAsyncRedis()
+    return cache
+
+
+def test_redis_response_cache(redis_cache):
+    cache = redis_cache
+
+    async def scenario():
+        await cache.store("Kde najdu střelce?", "v1", "V sekci Hráči.")
+        await cache.store("Kde najdu brankáře?", "v1", "V sekci Brankáři.")
+        assert await cache.get("kde najdu strelce", "v1") == "V sekci Hráči."
+        assert await cache.missing(["Kde najdu střelce?", "Jiná otázka"], "v1") == [
+            "Jiná otázka"
+        ]
+        assert 0 < await cache.client.ttl("answer:v1:kde najdu strelce") <= 60
+        assert (await cache.stats())["size"] == 2
+
+        # Entries past their expiry leave the counted size
+        await cache.client.zadd(cache.index_key, {"answer:v1:kde najdu brankare": 0})
+        assert (await cache.stats())["size"] == 1
+
+        assert await cache.invalidate() == 2
+        assert await cache.get("Kde najdu střelce?", "v1") is None
+        assert (await cache.stats())["size"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_redis_prewarm_lock_is_exclusive(redis_cache):
+    cache = redis_cache
+
+    async def scenario():
+        async with cache.prewarm_lock() as first:
+            async with cache.prewarm_lock() as second:
+                assert first and not second
+            assert await cache.client.exists(cache.lock_key)  # Still held
+        assert not await cache.client.exists(cache.lock_key)
+
+        # A lock taken over after expiring is not released by the old holder
+        async with cache.prewarm_lock() as acquired:
+            assert acquired
+            await cache.client.set(cache.lock_key, "other worker")
+        assert await cache.client.get(cache.lock_key) == b"other worker"
+
+    asyncio.run(scenario())
+
+
+def test_repeated_first_question_skips_the_model(stub_chatbot):
+    """
+    Test that an exact repeat of a first question is answered from the cache
+    """
+
+    before = client.get("/health").json()["response_cache"]["hits"]
+    stub_chatbot.chat_model.answer = "Nejlepší střelce najdete v tabulce hráčů."
+    response = client.post(
+        "/chat",
+        json={"message": "Kde najdu nejlepší střelce?", "session_id": "test_rc_1"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    stub_chatbot.chat_model.answer = "Jiná odpověď"  # Must not be generated
+    for session_id in ("test_rc_2", "test_rc_1"):
+        response = client.post(
+            "/chat",
+            json={"message": "kde najdu nejlepsi strelce", "session_id": session_id},
+        )
+        assert response.status_code == status.HTTP_200_OK
+    # Follow-up turns depend on the history and are never served from the cache
+    assert response.json()["response"] == "Jiná odpověď"
+
+    stats = client.get("/health").json()["response_cache"]
+    assert stats["hits"] == before + 1
+
+    stub_chatbot.writer.flush()
+    conn = sqlite3.connect("app/database/chatbot.db")
+    # The cached answer made no model call and records no token usage
+    assert conn.execute(
+        "SELECT prompt_tokens, completion_tokens, tokens_used FROM chat_interactions "
+        "WHERE session_id = 'test_rc_2'"
+    ).fetchone() == (None, None, None)
+    conn.execute("DELETE FROM chat_interactions WHERE session_id LIKE 'test_rc_%'")
+    conn.commit()
+    conn.close()
+
+
+def test_prewarm_and_invalidation(stub_chatbot):
+    """
+    Test that the quick questions are pre-warmed and the admin can drop them
+    """
+
+    questions = stub_chatbot.config.quick_questions
+    assert asyncio.run(stub_chatbot.prewarm_response_cache()) == len(questions)
+    assert asyncio.run(stub_chatbot.prewarm_response_cache()) == 0  # Already cached
+    assert not asyncio.run(
+        stub_chatbot.response_cache.missing(questions, stub_chatbot.answer_version)
+    )
+
+    response = client.post("/cache/invalidate", headers={"X-API-Key": "invalid_key"})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    api_key = os.getenv("ADMIN_API_KEY")
+    if not api_key:
+        pytest.skip("ADMIN_API_KEY not set in environment")
+    response = client.post(
+        "/cache/invalidate", params={"prewarm": False}, headers={"X-API-Key": api_key}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["removed"]["response_cache"] == len(questions)
+    assert asyncio.run(
+        stub_chatbot.response_cache.missing(questions, stub_chatbot.answer_version)
+    ) == list(questions)
+
+
+def test_workers_prewarm_a_shared_cache_once(stub_chatbot, redis_cache, monkeypatch):
+    """
+    Test that with a Redis cache only one of the workers starting together
+    generates the quick question answers
+    """
+
+    monkeypatch.setattr(stub_chatbot, "response_cache", redis_cache)
+    questions = stub_chatbot.config.quick_questions
+
+    async def start_workers():
+        # Each worker runs the pre-warm on startup at the same time
+        return await asyncio.gather(
+            stub_chatbot.prewarm_response_cache(),
+            stub_chatbot.prewarm_response_cache(),
+        )
+
+    assert sorted(asyncio.run(start_workers())) == [0, len(questions)]
+    assert not asyncio.run(redis_cache.missing(questions, stub_chatbot.answer_version))
@@ -0,0 +1,123 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_session_store.py -v --disable-warnings
+
+import asyncio
+
+import pytest
+
+from app.core.session_store import (
+    RedisSessionStore,
+    SessionStore,
+    create_session_store,
+)
+
+
+def test_ring_buffer_keeps_latest_messages():
+    store = SessionStore(
+        max_messages=3, ttl_seconds=60, max_sessions=10, max_chars=1000
+    )
+
+    async def scenario():
+        for i in range(5):
+            await store.append("a", "user", f"Otázka {i}")
+
+        assert [m["content"] for m in await store.get("a")] == [
+            "Otázka 2",
+            "Otázka 3",
+            "Otázka 4",
+        ]
+        assert store._total_chars == 3 * len("Otázka 0")
+        assert await store.clear("a") == 3
+        assert await store.get("a") == [] and store._total_chars == 0
+
+    asyncio.run(scenario())
+
+
+def test_idle_sessions_expire():
+    store = SessionStore(
+        max_messages=3, ttl_seconds=0.05, max_sessions=10, max_chars=1000
+    )
+
+    async def scenario():
+        await store.append("idle", "user", "Ahoj")
+        await asyncio.sleep(0.1)
+        await store.append("active", "user", "Ahoj")
+
+        assert await store.get("idle") == []
+        assert await store.active_count() == 1
+        assert store._total_chars == len("Ahoj")
+
+    asyncio.run(scenario())
+
+
+def test_least_recently_used_sessions_are_evicted():
+    store = SessionStore(max_messages=3, ttl_seconds=60, max_sessions=2, max_chars=20)
+
+    async def scenario():
+        await store.append("a", "user", "Ahoj")
+        await store.append("b", "user", "Ahoj")
+        await store.get("a")  # "b" is now the least recently used
+        await store.append("c", "user", "Ahoj")
+
+        assert await store.get("b") == []
+        assert await store.active_count() == 2
+
+        # Over the character cap the oldest sessions go, never the one written to
+        await store.append("c", "user", "x" * 30)
+        assert await store.get("a") == []
+        assert len(await store.get("c")) == 2
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def store():
+    fakeredis = pytest.importorskip("fakeredis")
+    store = RedisSessionStore(
+        "redis://localhost:6379/0", max_messages=3, ttl_seconds=60
+    )
+    store.client = fakeredis.FakeAsyncRedis()
+    return store
+
+
+def test_redis_append_and_trim(store):
+    async def scenario():
+        for i in range(5):
+            await store.append("a", "user", f"Otázka {i}")
+
+        messages = await store.get("a")
+        assert [m["content"] for m in messages] == ["Otázka 2", "Otázka 3", "Otázka 4"]
+        assert messages[0]["role"] == "user"
+        assert 0 < await store.client.ttl("session:a") <= 60
+
+    asyncio.run(scenario())
+
+
+def test_redis_clear_and_count(store):
+    async def scenario():
+        await store.append("a", "user", "Ahoj")
+        await store.append("a", "assistant", "Dobrý den")
+        await store.append("b", "user", "Ahoj")
+        await store.get("unknown")  # Reading a missing session does not count it
+
+        assert await store.active_count() == 2
+        assert await store.clear("a") == 2
+        assert await store.get("a") == []
+        assert await store.clear("a") == 0
+        assert await store.active_count() == 1
+
+        # Sessions idle for longer than the TTL are no longer counted
+        await store.client.zadd(store.active_key, {"b": 0})
+        assert await store.active_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_factory(monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    assert isinstance(create_session_store(10, 60, 100, 1000), SessionStore)
+
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    assert isinstance(create_session_store(10, 60, 100, 1000), RedisSessionStore)
@@ -4,10 +4,15 @@
 # pytest tests/test_stats.py -v --disable-warnings
 
 import os
+import csv
+import io
+import json
+import sqlite3
 import pytest
 from starlette import status
 from fastapi.testclient import TestClient
 from app.main import app
+from app.jobs.backfill_rollups import backfill
 
 client = TestClient(app)
 
@@ -54,3 +59,139 @@ def test_stats_endpoint_response_types():
     assert isinstance(data["error_rate"], (float, int))
     assert isinstance(data["category_distribution"], dict)
     assert isinstance(data["conversations"], list)
+
+
+@pytest.fixture
+def stats_rows():
+    """
+    Five interactions of one session, with two sharing a timestamp
+    Timestamps are stored in the format SQLAlchemy writes DateTime columns
+    """
+
+    timestamps = ["2024-01-01 10:00:00.000000"] * 2 + [
+        f"2024-01-0{day} 10:00:00.000000" for day in (2, 3, 4)
+    ]
+    conn = sqlite3.connect("app/database/chatbot.db")
+    conn.executemany(
+        "INSERT INTO chat_interactions (session_id, timestamp, user_message, bot_response, "
+        "response_time, category, tokens_used, error_occurred, rating) "
+        "VALUES ('test_stats_page', ?, ?, 'odpověď', 1.0, ?, 10, 0, ?)",
+        [
+            (timestamp, f"otázka {i}", "players" if i % 2 else "general", i % 2 or None)
+            for i, timestamp in enumerate(timestamps)
+        ],
+    )
+    conn.commit()
+    yield
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_stats_page'")
+    conn.commit()
+    conn.close()
+
+
+def test_stats_conversations_pagination(stats_rows):
+    """
+    Test that keyset pages cover every filtered row exactly once, newest first
+    """
+
+    api_key = os.getenv("ADMIN_API_KEY")
+
+    if not api_key:
+        pytest.skip("ADMIN_API_KEY not set in environment")
+
+    messages, cursor = [], None
+    while True:
+        params = {"session_id": "test_stats_page", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(
+            "/stats/conversations", params=params, headers={"X-API-Key": api_key}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert len(page["conversations"]) <= 2
+        messages += [conv["user_message"] for conv in page["conversations"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert messages == [f"otázka {i}" for i in (4, 3, 2, 1, 0)]
+
+    response = client.get(
+        "/stats/summary",
+        params={"session_id": "test_stats_page", "category": "players"},
+        headers={"X-API-Key": api_key},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["total_interactions"] == 2
+    assert response.json()["rating_distribution"]["thumbs_up"] == 2
+
+
+def test_stats_export_formats(stats_rows):
+    """
+    Test NDJSON and CSV exports of the filtered conversations
+    """
+
+    api_key = os.getenv("ADMIN_API_KEY")
+
+    if not api_key:
+        pytest.skip("ADMIN_API_KEY not set in environment")
+
+    params = {"session_id": "test_stats_page", "start": "2024-01-02T00:00:00"}
+    response = client.get(
+        "/stats/export", params=params, headers={"X-API-Key": api_key}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["user_message"] for row in rows] == ["otázka 4", "otázka 3", "otázka 2"]
+
+    response = client.get(
+        "/stats/export",
+        params={**params, "format": "csv"},
+        headers={"X-API-Key": api_key},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert len(list(csv.DictReader(io.StringIO(response.text)))) == 3
+
+
+def test_stats_summary_from_rollups(stub_chatbot):
+    """
+    Test that new interactions and ratings reach the rollup-backed summary
+    """
+
+    api_key = os.getenv("ADMIN_API_KEY")
+
+    if not api_key:
+        pytest.skip("ADMIN_API_KEY not set in environment")
+
+    def summary():
+        response = client.get("/stats/summary", headers={"X-API-Key": api_key})
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()
+
+    backfill()  # Rollups of rows other tests deleted directly
+    before = summary()
+    chat = client.post(
+        "/chat",
+        json={"message": "Kde najdu statistiky hráčů?", "session_id": "test_rollup"},
+    )
+    stub_chatbot.writer.flush()
+    client.post("/rate", json={"message_id": chat.json()["message_id"], "rating": 1})
+    after = summary()
+
+    assert after["total_interactions"] == before["total_interactions"] + 1
+    assert (
+        after["rating_distribution"]["thumbs_up"]
+        == before["rating_distribution"]["thumbs_up"] + 1
+    )
+    assert (
+        after["token_usage"]["interactions_with_usage"]
+        == before["token_usage"]["interactions_with_usage"] + 1
+    )
+
+    conn = sqlite3.connect("app/database/chatbot.db")
+    conn.execute("DELETE FROM chat_interactions WHERE session_id = 'test_rollup'")
+    conn.commit()
+    conn.close()
+    backfill()
+    assert summary()["total_interactions"] == before["total_interactions"]
@@ -0,0 +1,63 @@
+# TEST
+
+# pytest --disable-warnings
+# pytest tests/test_vector_store.py -v --disable-warnings
+
+import os
+import shutil
+
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.core import vector_store as vs
+
+TEXTS = [f"Kapitola {i}: statistiky hráčů a formací" for i in range(10)]
+
+
+def test_loader_refuses_an_index_of_another_build(tmp_path, monkeypatch):
+    """
+    Test that an index replaced without its docstore is never served
+    """
+
+    embeddings = DeterministicFakeEmbedding(size=16)
+    old, new = str(tmp_path / "old"), str(tmp_path / "new")
+    vs.save_vector_store(FAISS.from_texts(TEXTS, embeddings), old)
+    vs.save_vector_store(FAISS.from_texts(TEXTS[::-1], embeddings), new)
+
+    store = vs.load_vector_store(old, embeddings)
+    assert store.docstore.meta("index_sha1") == vs.file_sha1(
+        os.path.join(old, vs.INDEX_FILE)
+    )
+    assert store.similarity_search(TEXTS[3], k=1)[0].page_content == TEXTS[3]
+
+    # A loader between the two replacements of save_vector_store
+    shutil.copy(os.path.join(new, vs.INDEX_FILE), os.path.join(old, vs.INDEX_FILE))
+    monkeypatch.setattr(vs.time, "sleep", lambda seconds: None)
+    with pytest.raises(RuntimeError, match="do not match"):
+        vs.load_vector_store(old, embeddings)
+
+
+def test_bm25_reads_hits_from_the_docstore(tmp_path):
+    """
+    Test that the BM25 index keeps no chunk text and resolves hits by position
+    """
+
+    from app.core.lexical import BM25Index
+
+    embeddings = DeterministicFakeEmbedding(size=16)
+    vs.save_vector_store(FAISS.from_texts(TEXTS, embeddings), str(tmp_path))
+    store = vs.load_vector_store(str(tmp_path), embeddings)
+
+    resolved = []
+
+    def resolve(position):
+        resolved.append(position)
+        return vs.store_document(store, position)
+
+    index = BM25Index(vs.iter_store_documents(store), resolve=resolve)
+    assert len(index) == len(TEXTS) and not hasattr(index, "documents")
+
+    results = index.search("kapitola 7", k=2)
+    assert results[0][0].page_content == TEXTS[7]
+    assert len(resolved) == 2
@@ -69,8 +69,26 @@ const Chat = () => {
             setIsLoading(true);
         }, 10);
 
+        const streamId = `stream_${Date.now()}`;
+        let streamedContent = '';
+
         try {
-            const response = await chatAPI.sendMessage(message, sessionId);
+            const response = await chatAPI.streamMessage(message, sessionId, (token) => {
+                // Replace the typing indicator with the answer as soon as it starts
+                if (!streamedContent) {
+                    setIsLoading(false);
+                    setMessages(prev => [...prev, {
+                        id: streamId,
+                        content: '',
+                        isUser: false,
+                        timestamp: new Date().toISOString(),
+                    }]);
+                }
+                streamedContent += token;
+                setMessages(prev => prev.map(msg =>
+                    msg.id === streamId ? { ...msg, content: streamedContent } : msg
+                ));
+            });
 
             const botMessage = {
                 id: response.message_id, // Use database ID
@@ -79,7 +97,10 @@ const Chat = () => {
                 timestamp: new Date().toISOString(),
             };
 
-            setMessages(prev => [...prev, botMessage]);
+            setMessages(prev => streamedContent
+                ? prev.map(msg => msg.id === streamId ? botMessage : msg)
+                : [...prev, botMessage]
+            );
         } catch (err) {
             setError(err.message);
             console.error('Error sending message:', err);
@@ -93,7 +114,7 @@ const Chat = () => {
 
     const clearChat = async () => {
         try {
-            await chatAPI.clearConversation();
+            await chatAPI.clearConversation(sessionId);
             setMessages([]);
             setError(null);
             setHasShownWelcome(false); // Reset welcome message state
@@ -25,10 +25,56 @@ export const chatAPI = {
         }
     },
 
-    // Clear conversation history
-    clearConversation: async () => {
+    // Send a message and receive the answer token by token (server-sent events)
+    streamMessage: async (message, sessionId = '', onToken = () => {}) => {
+        const response = await fetch(`${api.defaults.baseURL}/chat/stream`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ message, session_id: sessionId }),
+        });
+        if (!response.ok || !response.body) {
+            throw new Error('Failed to send message');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let result = null;
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            for (const rawEvent of events) {
+                const lines = Object.fromEntries(
+                    rawEvent.split('\n').map(line => [line.slice(0, line.indexOf(':')), line.slice(line.indexOf(':') + 2)])
+                );
+                const data = JSON.parse(lines.data);
+                if (lines.event === 'token') {
+                    onToken(data.token);
+                } else if (lines.event === 'done') {
+                    result = data;
+                } else if (lines.event === 'error') {
+                    throw new Error(data.detail || 'Failed to send message');
+                }
+            }
+        }
+
+        if (!result) {
+            throw new Error('Failed to send message');
+        }
+        return result;
+    },
+
+    // Clear conversation history of the session
+    clearConversation: async (sessionId = '') => {
         try {
-            const response = await api.post('/clear');
+            const response = await api.post('/clear', {
+                session_id: sessionId,
+            });
             return response.data;
         } catch (error) {
             console.error('Error clearing conversation:', error);